@@ -10,11 +10,16 @@ from error import *
 from position import *
 from lexer import *
 from nodes import *
+from parse import *
 from rtresult import *
 from valuenode import *
 from context import *
 from symboltable import *
 from interpreter import *
+from optimizer import *
+from closures import *
+from bytecode import *
+from transpiler import *
 
 ########################################################
 ##	RUN
@@ -25,44 +30,81 @@ global_symbol_table.set("NULL", Number.null)
 global_symbol_table.set("FALSE", Number.false)
 global_symbol_table.set("TRUE", Number.true)
 global_symbol_table.set("MATH_PI", Number.math_PI)
-global_symbol_table.set("PRINT", BuiltInFunction.print)
-global_symbol_table.set("PRINT_RET", BuiltInFunction.print_ret)
-global_symbol_table.set("INPUT", BuiltInFunction.input)
-global_symbol_table.set("INPUT_INT", BuiltInFunction.input_int)
-global_symbol_table.set("CLEAR", BuiltInFunction.clear)
-global_symbol_table.set("CLS", BuiltInFunction.clear)
-global_symbol_table.set("IS_NUM", BuiltInFunction.is_number)
-global_symbol_table.set("IS_STR", BuiltInFunction.is_string)
-global_symbol_table.set("IS_LIST", BuiltInFunction.is_list)
-global_symbol_table.set("IS_FUN", BuiltInFunction.is_function)
-global_symbol_table.set("APPEND", BuiltInFunction.append)
-global_symbol_table.set("POP", BuiltInFunction.pop)
-global_symbol_table.set("EXTEND", BuiltInFunction.extend)
-global_symbol_table.set("LEN", BuiltInFunction.len)
-global_symbol_table.set("RUN", BuiltInFunction.run)
-
-def run(fn, text):
+global_symbol_table.set("PRINT", BUILTINS['print'])
+global_symbol_table.set("PRINT_RET", BUILTINS['print_ret'])
+global_symbol_table.set("INPUT", BUILTINS['input'])
+global_symbol_table.set("INPUT_INT", BUILTINS['input_int'])
+global_symbol_table.set("CLEAR", BUILTINS['clear'])
+global_symbol_table.set("CLS", BUILTINS['clear'])
+global_symbol_table.set("IS_NUM", BUILTINS['is_number'])
+global_symbol_table.set("IS_STR", BUILTINS['is_string'])
+global_symbol_table.set("IS_LIST", BUILTINS['is_list'])
+global_symbol_table.set("IS_FUN", BUILTINS['is_function'])
+global_symbol_table.set("APPEND", BUILTINS['append'])
+global_symbol_table.set("POP", BUILTINS['pop'])
+global_symbol_table.set("EXTEND", BUILTINS['extend'])
+global_symbol_table.set("LEN", BUILTINS['len'])
+global_symbol_table.set("RUN", BUILTINS['run'])
+global_symbol_table.set("MEMO", BUILTINS['memo'])
+global_symbol_table.set("MEMO_RESIZE", BUILTINS['memo_resize'])
+global_symbol_table.set("MEMO_STATS", BUILTINS['memo_stats'])
+
+LEXERS = {'classic': Lexer, 'regex': RegexLexer} ##lexer engines run can choose from, both produce the same tokens
+ENGINES = { ##ways run can execute the tree, each gives the RTResult for the program in context
+	'tree': run_tree, ##walks the nodes
+	'signals': run_signals, ##walks the nodes, values are returned and RETURN, BREAK, CONTINUE and errors raised
+	'closures': run_compiled, ##compiles every node into a Python closure first, see closures.py
+	'vm': run_bytecode, ##compiles the tree to bytecode for a stack machine, see bytecode.py
+	'python': run_transpiled, ##writes the tree out as Python source and runs that, see transpiler.py
+}
+
+def run(fn, text, lexer='regex', stream=False, buffer=False, packrat=False, pratt=True, optimize=False, resolve=True, engine='tree', values=True):
 
 	##Generate tokens using Lexer 
-	lexer = Lexer(fn, text)
-	tokens,error = lexer.make_tokens()
-	if error : 
-		return None,error
+	lexer = LEXERS[lexer](fn, text)
+	if stream: ##the parser pulls tokens from the lexer as it needs them
+		tokens = TokenStream(lexer.generate_tokens())
+	elif buffer: ##packed arrays instead of a Token object per lexeme
+		tokens,error = lexer.make_token_buffer()
+		if error :
+			return None,error
+	else:
+		tokens,error = lexer.make_tokens()
+		if error : 
+			return None,error
 
 	##Generate Abstract Syntax Tree using Parser
-	parser = Parser(tokens)
+	parser = Parser(tokens, packrat=packrat, pratt=pratt)
 	ast = parser.parse()
+	if stream:
+		tokens.drain() ##a lexing error after the point where the parser stopped still wins, just like make_tokens
+		if lexer.error:
+			return None, lexer.error
 	if ast.error:
 		return None, ast.error
 
+	##Fold constants before running, optimize can be an Optimizer to read its counts from afterwards
+	if optimize:
+		optimizer = optimize if isinstance(optimize, Optimizer) else Optimizer()
+		ast.node = optimizer.optimize(ast.node, global_symbol_table)
+
+	##Give variables slots in their frames, resolve=False looks every name up through the symbol table chain
+	if resolve:
+		Resolver(global_symbol_table).resolve(ast.node)
+
+	##values=False runs the program's statements for what they do, no List of their values is made and None is given back
+	if not values:
+		ast.node.discard_values()
+
+	##Calls whose value the function they are in returns run without growing the Python stack
+	mark_tail_calls(ast.node)
 
 	##Run the Program 
-	interpreter = Interpreter()
 	context = Context('<program>')
 	context.symbol_table = global_symbol_table
-	result = interpreter.visit(ast.node, context)
+	result = ENGINES[engine](ast.node, context)
 
-	return result.value,result.error 
+	return (result.value if values else None),result.error 
 
 
 
@@ -0,0 +1,460 @@
+########################################################
+##	IMPORTS
+########################################################
+import sys
+import re
+import time
+import tracemalloc
+from lexer import *
+from parse import *
+from flatast import *
+import basic
+from interpreter import *
+from context import *
+from optimizer import *
+from operators import *
+import transpiler
+
+########################################################
+##	BENCHMARKS
+########################################################
+
+##run with python benchmark.py [name ...], no names runs all of them
+
+def timed(fn, repeat=3): ##best wall time of a few runs, in seconds
+	best = None
+	for _ in range(repeat):
+		start = time.perf_counter()
+		fn()
+		elapsed = time.perf_counter() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+def parse_only(text, **options):
+	tokens, error = RegexLexer('<bench>', text).make_tokens()
+	res = Parser(tokens, **options).parse()
+	if res.error:
+		raise Exception(res.error.as_string())
+	return res
+
+##programs that make the parser back up over the same tokens
+def nested_if(depth): return 'IF 1 THEN\n' * depth + '1\n' + 'END\n' * depth
+def nested_for(depth): return 'FOR i = 0 TO 1 THEN\n' * depth + 'i\n' + 'END\n' * depth
+def nested_fun(depth): return ''.join('FUN f%d()\n' % i for i in range(depth)) + '1\n' + 'END\n' * depth
+def nested_inline_if(depth): return 'IF 1 THEN ' * depth + '1' + ' ELSE 2' * depth
+def nested_parens(depth): return '(' * depth + '1' + ')' * depth
+
+def bench_packrat(): ##time per level stays flat as the depth doubles when the parse is linear
+	for name, make in (('if', nested_if), ('for', nested_for), ('fun', nested_fun), ('inline if', nested_inline_if), ('parens', nested_parens)):
+		for depth in (1000, 2000, 4000, 8000):
+			text = make(depth)
+			plain = timed(lambda: parse_only(text))
+			packrat = timed(lambda: parse_only(text, packrat=True))
+			print('packrat %-9s depth %5d   plain %8.2fms %6.1fus/level   packrat %8.2fms %6.1fus/level' % (
+				name, depth, plain * 1000, plain * 1e6 / depth, packrat * 1000, packrat * 1e6 / depth))
+
+def expression_file(lines): ##arithmetic and comparisons, the shape the precedence climbing parser is for
+	line = 'VAR x = (a + b * 2 - c / 4) ^ 2 >= f(a, b - 1) * -3 AND NOT x == y OR [1, 2 + 3] == 10'
+	return '\n'.join([line] * lines)
+
+def bench_pratt():
+	for lines in (100, 1000, 10000):
+		text = expression_file(lines)
+		classic = timed(lambda: parse_only(text, pratt=False))
+		pratt = timed(lambda: parse_only(text))
+		print('pratt   %6d lines   classic %8.2fms   pratt %8.2fms   %.1fx' % (lines, classic * 1000, pratt * 1000, classic / pratt))
+	text = ' + '.join(['1'] * 20000) ##one long expression
+	classic = timed(lambda: parse_only(text, pratt=False))
+	pratt = timed(lambda: parse_only(text))
+	print('pratt   long sum     classic %8.2fms   pratt %8.2fms   %.1fx' % (classic * 1000, pratt * 1000, classic / pratt))
+
+def bench_nesting(): ##the parser keeps its rules on an explicit stack, none of these may hit the recursion limit
+	depth = 100000
+	programs = (
+		('if blocks', nested_if(depth)),
+		('inline if', nested_inline_if(depth)),
+		('for blocks', nested_for(depth)),
+		('functions', nested_fun(depth)),
+		('parens', nested_parens(depth)),
+		('lists', '[' * depth + ']' * depth),
+		('calls', 'f(' * depth + '1' + ')' * depth),
+		('signs', '-' * depth + '1'),
+		('powers', ' ^ '.join(['2'] * depth)),
+		('long sum', ' + '.join(['1'] * depth)),
+		('if error', 'IF 1 THEN\n' * depth + '1 +\n' + 'END\n' * depth),
+		('paren error', '(' * depth + '1'),
+	)
+	for name, text in programs:
+		tokens, error = RegexLexer('<bench>', text).make_tokens()
+		start = time.perf_counter()
+		res = Parser(tokens).parse()
+		elapsed = time.perf_counter() - start
+		outcome = 'syntax error' if res.error else 'parsed'
+		print('nesting %-11s depth %d   %-12s %8.2fs   %9.0f tokens/s' % (name, depth, outcome, elapsed, len(tokens) / elapsed))
+
+def bench_throughput(): ##tokens per second of plain parsing, the number the explicit stack must not make worse
+	program = '\n'.join([
+		'FUN fact(n)',
+		'	IF n <= 1 THEN RETURN 1',
+		'	RETURN n * fact(n - 1)',
+		'END',
+		'VAR total = 0',
+		'FOR i = 0 TO 100 THEN',
+		'	IF i / 2 == 0 THEN',
+		'		VAR total = total + fact(i)',
+		'	ELSE',
+		'		VAR total = total - 1',
+		'	END',
+		'END',
+		'WHILE total > 0 THEN VAR total = total - 1',
+		'PRINT([1, 2, 3, "a" + "b"])',
+		'',
+	])
+	for name, text in (('statements', program * 300), ('expressions', expression_file(2000))):
+		tokens, error = RegexLexer('<bench>', text).make_tokens()
+		for options in ({}, {'pratt': False}):
+			elapsed = timed(lambda: Parser(tokens, **options).parse(), repeat=5)
+			print('throughput %-11s %-8s %8.2fms   %9.0f tokens/s' % (name, 'classic' if options else 'pratt', elapsed * 1000, len(tokens) / elapsed))
+
+def retained(fn): ##bytes still allocated after fn returns, and what it returned
+	tracemalloc.start()
+	result = fn()
+	size = tracemalloc.get_traced_memory()[0]
+	tracemalloc.stop()
+	return size, result
+
+def bench_tokens(): ##a token list against a TokenBuffer: memory of the tokens and of the tree made from them, lex and parse time
+	text = expression_file(5000)
+	for name, lex in (('list', lambda: RegexLexer('<bench>', text).make_tokens()[0]), ('buffer', lambda: RegexLexer('<bench>', text).make_token_buffer()[0])):
+		token_size, tokens = retained(lex)
+		tree_size, ast = retained(lambda: Parser(lex()).parse()) ##the tokens the nodes keep are counted too
+		print('tokens  %-6s %d tokens %8.0f KB   parsed tree %8.0f KB' % (name, len(tokens), token_size / 1024, tree_size / 1024))
+		print('tokens  %-6s lex %8.2fms   parse %8.2fms   advance %8.2fms' % (name, timed(lex) * 1000,
+			timed(lambda: Parser(tokens).parse()) * 1000, timed(lambda: advance_all(tokens)) * 1000))
+
+def advance_all(tokens): ##every Parser.advance of a parse with none of the rules
+	parser = Parser(tokens)
+	for _ in range(len(tokens) - 1):
+		parser.advance()
+
+def walk_nodes(node): ##visit every node object of a tree, the way a tree walking pass would
+	count = 0
+	stack = [node]
+	while stack:
+		node = stack.pop()
+		count += 1
+		for name in type(node).__slots__:
+			value = getattr(node, name)
+			if type(value) in NODE_KIND_CODES:
+				stack.append(value)
+			elif type(value) is list:
+				for item in value:
+					if type(item) is tuple:
+						stack.extend(child for child in item if type(child) in NODE_KIND_CODES)
+					else:
+						stack.append(item)
+			elif type(value) is tuple:
+				stack.extend(child for child in value if type(child) in NODE_KIND_CODES)
+	return count
+
+def bench_ast(): ##memory of a parsed program as node objects and as a FlatAST, and how long one walk over each takes
+	text = expression_file(2000)
+	size, ast = retained(lambda: parse_only(text).node) ##the tokens the nodes keep are counted too
+	flat_size, flat = retained(lambda: flatten(ast))
+	print('ast     nodes %d   node objects %8.0f KB   flat arrays %8.0f KB' % (len(flat), size / 1024, flat_size / 1024))
+	tree_walk = timed(lambda: walk_nodes(ast))
+	flat_walk = timed(lambda: sum(1 for kind in flat.kinds))
+	print('ast     walk   node objects %8.2fms   flat arrays %8.2fms' % (tree_walk * 1000, flat_walk * 1000))
+	print('ast     rebuild from flat arrays %8.2fms' % (timed(flat.to_node) * 1000))
+
+def bench_fold(): ##a loop body full of constant expressions, run as written and after the optimizer folded them
+	program = '\n'.join([
+		'FOR i = 0 TO %d THEN',
+		'	VAR circle = 2 * MATH_PI * 10 + i',
+		'	VAR seconds = 60 * 60 * 24 * 7 - i',
+		'	VAR label = "week" + " " + "total"',
+		'	VAR flag = (1 < 2) * 1 AND NOT 0',
+		'END',
+	])
+	for count in (10000, 50000):
+		text = program % count
+		plain = timed(lambda: basic.run('<bench>', text), repeat=1)
+		optimizer = Optimizer()
+		folded = timed(lambda: basic.run('<bench>', text, optimize=optimizer), repeat=1)
+		print('fold    %6d iterations   plain %8.2fms   optimized %8.2fms   %.1fx   %s' % (count, plain * 1000, folded * 1000, plain / folded, optimizer.report()))
+
+def bench_resolve(): ##builtin and global lookups from deep inside recursive calls, through slots and through the symbol table chain
+	program = '\n'.join([
+		'VAR items = [1, 2, 3]',
+		'FUN down(n) -> IF n == 0 THEN 0 ELSE down(n - 1) + LEN(items) + LEN(items)',
+		'FOR i = 0 TO 300 THEN down(%d)',
+	])
+	for depth in (10, 40, 80):
+		text = program % depth
+		chain = timed(lambda: basic.run('<bench>', text, resolve=False), repeat=1)
+		slots = timed(lambda: basic.run('<bench>', text), repeat=1)
+		print('resolve call depth %3d   chain %8.2fms   slots %8.2fms   %.1fx' % (depth, chain * 1000, slots * 1000, chain / slots))
+
+def bench_dispatch(): ##cost of finding the handler for one node, by method name (the old visit) and through Interpreter.handlers
+	interpreter = Interpreter()
+	context = Context('<bench>')
+	nodes = parse_only('1 + "a" * x - [f(2), -3]').node.element_nodes * 50000
+	nodes = [node for node in nodes for node in (node, node.left_node, node.right_node)] ##a mix of node types
+	def by_name():
+		for node in nodes:
+			getattr(interpreter, f'visit_{type(node).__name__}')
+	def table():
+		handlers = interpreter.handlers
+		for node in nodes:
+			handlers.get(type(node))
+	def loop_only():
+		for node in nodes:
+			type(node)
+	empty = timed(loop_only)
+	for name, fn in (('by name', by_name), ('table', table)):
+		print('dispatch %-8s %6.1fns per node' % (name, (timed(fn) - empty) / len(nodes) * 1e9))
+	class ByName(Interpreter): ##the old visit, for running a whole loop both ways
+		def visit(self, node, context):
+			return getattr(self, f'visit_{type(node).__name__}')(node, context)
+	tree = parse_only('VAR total = 0\nFOR i = 0 TO 20000 THEN VAR total = total + i * 2 - 1').node
+	context.symbol_table = basic.global_symbol_table
+	for name, cls in (('by name', ByName), ('table', Interpreter)):
+		print('dispatch %-8s loop of 20000   %8.2fms' % (name, timed(lambda: cls().visit(tree, context)) * 1000))
+
+ENGINE_PROGRAMS = { ##programs every engine in basic.ENGINES runs, for comparing them
+	'loop': 'VAR total = 0\nFOR i = 0 TO 50000 THEN\n\tVAR total = total + i * 2 - 1\nEND\ntotal',
+	'fib': 'FUN fib(n)\n\tIF n < 2 THEN RETURN n\n\tRETURN fib(n - 1) + fib(n - 2)\nEND\nfib(18)',
+	'while': 'VAR i = 0\nVAR counted = 0\nWHILE i < 30000 THEN\n\tVAR i = i + 1\n\tIF i > 25000 THEN CONTINUE\n\tVAR counted = counted + 1\nEND\ncounted',
+	'lists': 'VAR l = []\nFOR i = 0 TO 20000 THEN\n\tAPPEND(l, i * i)\nEND\nVAR s = ""\nFOR i = 0 TO 5000 THEN\n\tVAR s = s + "ab"\nEND\nLEN(l)',
+}
+
+def bench_engines(): ##the same programs on every engine run can pick, with the result each one gave
+	for name, text in ENGINE_PROGRAMS.items():
+		times = []
+		for engine in basic.ENGINES:
+			result = []
+			times.append((engine, timed(lambda: result.append(basic.run('<bench>', text, engine=engine)), repeat=1), result[-1]))
+		tree = times[0][1]
+		print('engines %-6s ' % name + '   '.join('%s %8.2fms %.1fx' % (engine, elapsed * 1000, tree / elapsed) for engine, elapsed, result in times), '  result', times[0][2][0].elements[-1])
+
+def bench_operators(): ##one operation on two values, through the Value method found by name and through the operator table
+	context = Context('<bench>')
+	for node in parse_only('1 + 2\n1 < 2\n1 * 2.5\n"a" + "b"\n[1] + 2').node.element_nodes:
+		left = Interpreter().visit(node.left_node, context).value
+		right = Interpreter().visit(node.right_node, context).value
+		name = binary_name(node.op_tok)
+		operations = binary_operations(node)
+		def by_method():
+			for _ in range(100000):
+				getattr(left, name)(right)
+		def by_table():
+			for _ in range(100000):
+				operations[type(left), type(right)](left, right)
+		print('operators %-14s method %6.1fns   table %6.1fns' % (f'{left!r} {node.op_tok.value or node.op_tok.type} {right!r}', timed(by_method) * 1e4, timed(by_table) * 1e4))
+
+def bench_transpile(): ##a run that writes and compiles the Python source against one that finds the code object in the cache
+	for copies in (1, 10, 100):
+		text = re.sub(r'\d\d+', '5', '\n'.join(ENGINE_PROGRAMS.values()) + '\n') * copies ##loops of 5 so the run is mostly the compile
+		def cold():
+			transpiler.CODE_CACHE.clear()
+			basic.run('<bench>', text, engine='python')
+		uncached = timed(cold)
+		cached = timed(lambda: basic.run('<bench>', text, engine='python'))
+		print('transpile %5d lines   compiled %8.2fms   cached %8.2fms   %.1fx' % (text.count('\n') + 1, uncached * 1000, cached * 1000, uncached / cached))
+
+TAIL_PROGRAMS = { ##a tail call as a function's auto returned body and after a RETURN
+	'countdown': 'FUN count(n, acc) -> IF n == 0 THEN acc ELSE count(n - 1, acc + n)\ncount(%d, 0)',
+	'walker': 'FUN walk(l, i, acc)\n\tIF i == LEN(l) THEN RETURN acc\n\tRETURN walk(l, i + 1, acc + l/i)\nEND\nVAR xs = []\nFOR i = 0 TO %d THEN APPEND(xs, i)\nwalk(xs, 0, 0)',
+}
+
+def bench_tailcalls(): ##recursion depths that used to stop at Python's recursion limit, per engine
+	for name, text in TAIL_PROGRAMS.items():
+		for depth in (1000, 10000, 100000):
+			cells = []
+			for engine in basic.ENGINES:
+				try:
+					result = []
+					elapsed = timed(lambda: result.append(basic.run('<bench>', text % depth, engine=engine)), repeat=1)
+					cells.append('%s %8.2fms' % (engine, elapsed * 1000))
+				except RecursionError:
+					cells.append('%s %10s' % (engine, 'recursion'))
+			print('tailcalls %-9s %6d deep   ' % (name, depth) + '   '.join(cells))
+
+CALL_PROGRAMS = { ##calls of globals and builtins from the top level and from recursion
+	'loop': 'VAR items = [1, 2]\nFUN sq(x) -> x * x\nVAR s = 0\nFOR i = 0 TO 20000 THEN\n\tVAR s = s + sq(i) + LEN(items)\nEND\ns',
+	'recursion': 'VAR items = [1, 2]\nFUN down(n) -> IF n == 0 THEN 0 ELSE down(n - 1) + LEN(items)\nFOR i = 0 TO 200 THEN down(50)',
+}
+
+def bench_callsites(): ##tree walker with the call site caches and with every call looking its function up
+	for engine in ('tree', 'signals'):
+		for name, text in CALL_PROGRAMS.items():
+			call_sites.reset()
+			cached = timed(lambda: basic.run('<bench>', text, engine=engine))
+			report = call_sites.report()
+			call_sites.lookup = lambda node, context: None
+			call_sites.fill = lambda node, value, context: None
+			try:
+				uncached = timed(lambda: basic.run('<bench>', text, engine=engine))
+			finally:
+				del call_sites.lookup, call_sites.fill
+			print('callsites %-7s %-9s lookup %8.2fms   cached %8.2fms   %.2fx   %s' % (engine, name, uncached * 1000, cached * 1000, uncached / cached, report))
+
+def bench_values(): ##one variable read: a handle through located against copy, set_span and set_context, and what a handle weighs
+	context = Context('<bench>')
+	node = parse_only('x').node.element_nodes[0]
+	for value in (Number(1), String('ab'), List([Number(1), Number(2)])):
+		def copied():
+			for _ in range(100000):
+				value.copy().set_span(node).set_context(context)
+		def located():
+			for _ in range(100000):
+				value.located(node, context)
+		size, handles = retained(lambda: [value.located(node, context) for _ in range(10000)])
+		print('values %-12s copy %6.1fns   located %6.1fns   %5.1f bytes per handle' % (f'{value!r}', timed(copied) * 1e4, timed(located) * 1e4, size / 10000))
+
+FOR_PROGRAM = 'FOR i = %s TO 10000000 THEN\n\ti\nEND' ##a block FOR, its value is not kept. a start of 0.0 makes it count the general way
+
+def bench_forloops(): ##10M iterations, counted on a range against stepped one Number at a time
+	for engine in basic.ENGINES:
+		general = timed(lambda: basic.run('<bench>', FOR_PROGRAM % '0.0', engine=engine), repeat=1)
+		counted = timed(lambda: basic.run('<bench>', FOR_PROGRAM % '0', engine=engine), repeat=1)
+		print('forloops %-8s general %9.2fms   counted %9.2fms   %.2fx   %5.0fns per iteration' % (engine, general * 1000, counted * 1000, general / counted, counted * 100))
+
+FRAME_PROGRAMS = { ##small functions called over and over, what a frame per call costs most on
+	'add': 'FUN add(a, b) -> a + b\nVAR s = 0\nFOR i = 0 TO 100000 THEN\n\tVAR s = add(s, i)\nEND\ns',
+	'fib': 'FUN fib(n) -> IF n < 2 THEN n ELSE fib(n - 1) + fib(n - 2)\nfib(20)',
+}
+
+def fresh_frame(function, args): ##the Context and SymbolTable every call made before CallFrames
+	exec_ctx = function.generate_new_context(function.scope)
+	res = function.check_and_populate_args(function.arg_names, args, exec_ctx)
+	return (None, res.error) if res.error else (exec_ctx, None)
+
+def bench_frames(): ##calls on pooled CallFrames against a new Context and SymbolTable for every call
+	basic.run('<bench>', 'FUN add(a, b) -> a + b')
+	add = basic.global_symbol_table.get('add').copy().set_context(Context('<bench>')) ##the way a call site hands it over
+	add.context.symbol_table = basic.global_symbol_table
+	args = [Number(1), Number(2)]
+	def made():
+		for _ in range(100000):
+			fresh_frame(add, args)
+	def pooled():
+		for _ in range(100000):
+			frame, error = frame_pool.enter(add, args)
+			frame_pool.leave(frame, Number.null)
+	made, pooled = timed(made), timed(pooled)
+	print('frames one call       new %6.0fns   pooled %6.0fns   %.2fx' % (made * 1e4, pooled * 1e4, made / pooled))
+
+	for engine in basic.ENGINES:
+		for name, text in FRAME_PROGRAMS.items():
+			frame_pool.reset()
+			reused = timed(lambda: basic.run('<bench>', text, engine=engine), repeat=1)
+			report = frame_pool.report()
+			frame_pool.enter = fresh_frame
+			frame_pool.leave = lambda frame, value: None
+			frame_pool.tail = lambda frame, function, args: function
+			try:
+				made = timed(lambda: basic.run('<bench>', text, engine=engine), repeat=1)
+			finally:
+				del frame_pool.enter, frame_pool.leave, frame_pool.tail
+			print('frames %-8s %-4s new %8.2fms   pooled %8.2fms   %.2fx   %s' % (engine, name, made * 1000, reused * 1000, made / reused, report))
+
+SCRIPT = 'VAR x = 0\n' + 'VAR x = x + 1\n' * 50000 ##a long script, the shape RUN loads
+BLOCK_PROGRAM = 'VAR i = 0\nWHILE i < 100000 THEN\n\tVAR i = i + 1\n\tVAR j = i * 2\nEND' ##a block run over and over
+
+def bench_blocks(): ##statement values kept in Lists against blocks that only run their statements
+	for engine in basic.ENGINES:
+		kept, _ = retained(lambda: basic.run('<bench>', SCRIPT, engine=engine)) ##most of a run of it is lexing and parsing, memory is what changes
+		discarded, _ = retained(lambda: basic.run('<bench>', SCRIPT, engine=engine, values=False))
+		print('blocks %-8s script   values %8.0fKB     effect only %8.0fKB     %5.0f bytes less per statement' % (engine, kept / 1024, discarded / 1024, (kept - discarded) / 50000))
+
+		discard_values = ListNode.discard_values
+		ListNode.discard_values = lambda self: self ##every block builds its List again
+		try:
+			listed = timed(lambda: basic.run('<bench>', BLOCK_PROGRAM, engine=engine), repeat=1)
+		finally:
+			ListNode.discard_values = discard_values
+		unlisted = timed(lambda: basic.run('<bench>', BLOCK_PROGRAM, engine=engine), repeat=1)
+		print('blocks %-8s while    values %8.2fms   effect only %8.2fms   %.2fx' % (engine, listed * 1000, unlisted * 1000, listed / unlisted))
+
+BUILTIN_PROGRAM = 'VAR xs = []\nFOR i = 0 TO 30000 THEN\n\tAPPEND(xs, i)\n\tIF IS_NUM(LEN(xs)) THEN 0\nEND\nLEN(xs)' ##three builtin calls an iteration
+
+def context_call(function, args): ##a builtin call the way it went before register_builtin, through a Context and SymbolTable
+	exec_ctx = function.generate_new_context()
+	res = function.check_and_populate_args(function.arg_names, args, exec_ctx)
+	if res.error:
+		raise RTFailure(res.error)
+	result, error = function.implementation(function, *[exec_ctx.symbol_table.get(name) for name in function.arg_names])
+	if error:
+		raise RTFailure(error)
+	return result
+
+def context_execute(function, args):
+	try:
+		return RTResult().success(context_call(function, args))
+	except RTFailure as failure:
+		return RTResult().failure(failure.error)
+
+def bench_builtins(): ##builtins called with their arguments against a Context and SymbolTable made for every call
+	length = BUILTINS['len'].located(None, Context('<bench>')) ##the way a call site hands it over
+	length.context.symbol_table = basic.global_symbol_table
+	args = [List([])]
+	def made():
+		for _ in range(100000):
+			context_call(length, args)
+	def direct():
+		for _ in range(100000):
+			length.call(args)
+	made, direct = timed(made), timed(direct)
+	print('builtins one call       context %6.0fns   direct %6.0fns   %.2fx' % (made * 1e4, direct * 1e4, made / direct))
+
+	for engine in basic.ENGINES:
+		called = timed(lambda: basic.run('<bench>', BUILTIN_PROGRAM, engine=engine), repeat=1)
+		call, execute = BuiltInFunction.call, BuiltInFunction.execute
+		BuiltInFunction.call, BuiltInFunction.execute = context_call, context_execute
+		try:
+			made = timed(lambda: basic.run('<bench>', BUILTIN_PROGRAM, engine=engine), repeat=1)
+		finally:
+			BuiltInFunction.call, BuiltInFunction.execute = call, execute
+		print('builtins %-8s context %8.2fms   direct %8.2fms   %.2fx' % (engine, made * 1000, called * 1000, made / called))
+
+MEMO_PROGRAMS = { ##recursions that make the same calls over and over, %s is the function or the memoized one
+	'fib': 'FUN fib(n) -> IF n < 2 THEN n ELSE fib(n - 1) + fib(n - 2)\nVAR fib = %s\nfib(22)',
+	'paths': 'FUN paths(l) -> IF l/0 == 0 THEN 1 ELIF l/1 == 0 THEN 1 ELSE paths([l/0 - 1, l/1]) + paths([l/0, l/1 - 1])\nVAR paths = %s\npaths([8, 8])',
+}
+
+def bench_memo(): ##the recursions above plain and through MEMO, with what the cache saw
+	for engine in basic.ENGINES:
+		for name, text in MEMO_PROGRAMS.items():
+			plain = timed(lambda: basic.run('<bench>', text % name, engine=engine), repeat=1)
+			memoized = timed(lambda: basic.run('<bench>', text % f'MEMO({name})', engine=engine), repeat=1)
+			report = basic.global_symbol_table.get(name).cache.report()
+			print('memo %-8s %-5s plain %8.2fms   memoized %8.2fms   %6.1fx   %s' % (engine, name, plain * 1000, memoized * 1000, plain / memoized, report))
+
+BENCHMARKS = {
+	'packrat': bench_packrat,
+	'pratt': bench_pratt,
+	'nesting': bench_nesting,
+	'throughput': bench_throughput,
+	'tokens': bench_tokens,
+	'ast': bench_ast,
+	'fold': bench_fold,
+	'resolve': bench_resolve,
+	'dispatch': bench_dispatch,
+	'engines': bench_engines,
+	'transpile': bench_transpile,
+	'operators': bench_operators,
+	'tailcalls': bench_tailcalls,
+	'callsites': bench_callsites,
+	'values': bench_values,
+	'forloops': bench_forloops,
+	'blocks': bench_blocks,
+	'frames': bench_frames,
+	'builtins': bench_builtins,
+	'memo': bench_memo,
+}
+
+if __name__ == '__main__':
+	for name in sys.argv[1:] or BENCHMARKS:
+		BENCHMARKS[name]()
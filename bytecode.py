@@ -0,0 +1,582 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from rtresult import *
+from valuenode import *
+from context import *
+from symboltable import *
+from resolver import *
+from operators import *
+
+########################################################
+##	OPCODES
+########################################################
+
+##a CodeObject's ops is one flat list of (opcode, argument) pairs, the argument of most opcodes indexes the
+##CodeObject's consts, where the node the instruction came from is kept for spans and error positions
+
+NUMBER = 0 ##push a new Number, consts[arg] = (value, node)
+STRING = 1 ##push a new String, consts[arg] = (value, node)
+LOAD_LOCAL = 2 ##push a variable from the running frame's slot, consts[arg] = (name, slot, node)
+LOAD_GLOBAL = 3 ##push a variable from the global table's slot, the frames are searched if the name is shadowed
+LOAD_NAME = 4 ##push a variable looked up by name through the symbol tables
+STORE_LOCAL = 5 ##set the running frame's slot to the top of the stack, leaves it there, consts[arg] = (name, slot)
+STORE_NAME = 6 ##set a variable by name
+BINARY = 7 ##pop right and left, push the result, consts[arg] = (operator table, Number fast path, divides, node)
+NEGATE = 8 ##unary -, consts[arg] = (operator table, node), the same for NOT and PLUS
+NOT = 9
+PLUS = 10 ##unary +
+BUILD_LIST = 11 ##pop count values into a new List, consts[arg] = (count, node)
+POP = 12
+PUSH_NULL = 13
+JUMP = 14 ##arg is the new position in ops
+JUMP_IF_FALSE = 15 ##pop a condition, jump to arg if it is not true
+SETUP_LOOP = 16 ##start a WHILE loop, consts[arg] = (continue label, body label, break label)
+FOR_PREP = 17 ##pop start, end (and step) and start a FOR loop, consts[arg] = (variable name, has step, continue label, break label)
+FOR_ITER = 18 ##set the FOR variable and step it, jump to arg once the loop is done
+LOOP_APPEND = 19 ##pop the body's value into the loop's list
+END_LOOP = 20 ##end the innermost loop and push its value, consts[arg] = (should return null, node)
+BREAK = 21 ##jump out of the innermost loop, out of the running function first if it has none
+CONTINUE = 22 ##jump to the next iteration of the innermost loop, the same way
+MAKE_FUNCTION = 23 ##push a new function, consts[arg] = (name, argument names, auto return, scope, CodeObject, node)
+CALLEE = 24 ##replace the value to call with the copy the call uses, before the arguments are evaluated, consts[arg] = node
+CALL = 25 ##pop count arguments and the value to call, push what it returns, consts[arg] = (count, node), a tail call may replace the running frame
+RETURN = 26 ##pop the value the running function returns
+END = 27 ##end of the code, pop its value
+BINARY_CONST = 28 ##BINARY with a number literal on the right, consts[arg] = (operator table, fast path, divides, node, literal)
+
+OPNAMES = ['NUMBER', 'STRING', 'LOAD_LOCAL', 'LOAD_GLOBAL', 'LOAD_NAME', 'STORE_LOCAL', 'STORE_NAME', 'BINARY', 'NEGATE',
+	'NOT', 'PLUS', 'BUILD_LIST', 'POP', 'PUSH_NULL', 'JUMP', 'JUMP_IF_FALSE', 'SETUP_LOOP', 'FOR_PREP', 'FOR_ITER',
+	'LOOP_APPEND', 'END_LOOP', 'BREAK', 'CONTINUE', 'MAKE_FUNCTION', 'CALLEE', 'CALL', 'RETURN', 'END', 'BINARY_CONST']
+
+########################################################
+##	COMPILER
+########################################################
+
+class CodeObject:
+	__slots__ = ('name', 'ops', 'consts')
+
+	def __init__(self, name):
+		self.name = name
+		self.ops = []
+		self.consts = []
+
+	def __repr__(self):
+		return f'<code {self.name}>'
+
+class Label: ##a position in ops that is only known once the code after the jump to it has been emitted
+	__slots__ = ('position',)
+
+	def __init__(self):
+		self.position = None
+
+class BytecodeCompiler:
+	def compile(self, node, name='<program>'): ##CodeObject for the tree under node, function bodies get their own
+		code = CodeObject(name)
+		pending = [(node, code)] ##function bodies are compiled after the code they are in, never inside it
+		while pending:
+			body, body_code = pending.pop()
+			self.compile_code(body, body_code, pending)
+		return code
+
+	def compile_code(self, node, code, pending):
+		self.code = code
+		self.pending = pending
+		fixups = [] ##(index in ops, Label) for jumps emitted before their label was placed
+		work = [(END, None), node]
+		while work: ##without recursion, trees can be nested far deeper than Python's stack
+			item = work.pop()
+			if isinstance(item, Node):
+				work.extend(reversed(getattr(self, f'compile_{type(item).__name__}')(item)))
+			elif isinstance(item, Label):
+				item.position = len(code.ops)
+			else:
+				op, arg = item
+				if isinstance(arg, Label):
+					fixups.append((len(code.ops) + 1, arg))
+				code.ops.append(op)
+				code.ops.append(arg)
+		for index, label in fixups:
+			code.ops[index] = label.position
+
+	def const(self, value):
+		self.code.consts.append(value)
+		return len(self.code.consts) - 1
+
+	##every compile_ returns what to emit in order: nodes to compile, (opcode, argument) pairs and Labels to place
+
+	def compile_NumberNode(self, node):
+		return [(NUMBER, self.const((node.tok.value, node)))]
+
+	def compile_StringNode(self, node):
+		return [(STRING, self.const((node.tok.value, node)))]
+
+	def compile_BinOpNode(self, node):
+		operations = binary_operations(node)
+		fast = NUMBER_OPS[operations.name]
+		if isinstance(node.right_node, NumberNode) and not (operations.name == 'dived_by' and node.right_node.tok.value == 0): ##x + 1, n - 1, n == 0 ...
+			return [node.left_node, (BINARY_CONST, self.const((operations, fast, False, node, node.right_node)))]
+		return [node.left_node, node.right_node, (BINARY, self.const((operations, fast, operations.name == 'dived_by', node)))]
+
+	def compile_UnaryOpNode(self, node):
+		operations = unary_operations(node)
+		op = {'negated': NEGATE, 'notted': NOT}.get(operations.name, PLUS)
+		return [node.node, (op, self.const((operations, node)))]
+
+	def compile_VarAccessNode(self, node):
+		op = {LOCAL: LOAD_LOCAL, GLOBAL: LOAD_GLOBAL}.get(node.depth, LOAD_NAME)
+		return [(op, self.const((node.var_name_tok.value, node.slot, node)))]
+
+	def compile_VarAssignNode(self, node):
+		op = STORE_LOCAL if node.depth == LOCAL else STORE_NAME
+		return [node.value_node, (op, self.const((node.var_name_tok.value, node.slot)))]
+
+	def compile_ListNode(self, node):
+		if node.effect_only: ##each statement's value is popped as soon as it is made
+			if not node.element_nodes:
+				return [(PUSH_NULL, None)]
+			items = []
+			for element_node in node.element_nodes[:-1]:
+				items += [element_node, (POP, None)]
+			return items + [node.element_nodes[-1]] ##stands in for the block's NULL, whatever runs the block drops it
+		return node.element_nodes + [(BUILD_LIST, self.const((len(node.element_nodes), node)))]
+
+	def compile_IfNode(self, node):
+		end = Label()
+		items = []
+		for condition, expr, should_return_null in node.cases:
+			next_case = Label()
+			items += [condition, (JUMP_IF_FALSE, next_case), expr]
+			if should_return_null:
+				items += [(POP, None), (PUSH_NULL, None)]
+			items += [(JUMP, end), next_case]
+		if node.else_case:
+			expr, should_return_null = node.else_case
+			items.append(expr)
+			if should_return_null:
+				items += [(POP, None), (PUSH_NULL, None)]
+		else:
+			items.append((PUSH_NULL, None))
+		return items + [end]
+
+	def compile_ForNode(self, node):
+		next_iteration, done = Label(), Label()
+		items = [node.start_value_node, node.end_value_node]
+		if node.step_value_node:
+			items.append(node.step_value_node)
+		return items + [
+			(FOR_PREP, self.const((node.var_name_tok.value, node.step_value_node is not None, next_iteration, done))),
+			next_iteration,
+			(FOR_ITER, done),
+			node.body_node,
+			(POP if node.should_return_null else LOOP_APPEND, None), ##the list is thrown away otherwise
+			(JUMP, next_iteration),
+			done,
+			(END_LOOP, self.const((node.should_return_null, node))),
+		]
+
+	def compile_WhileNode(self, node):
+		next_iteration, body, done = Label(), Label(), Label()
+		return [
+			(SETUP_LOOP, self.const((next_iteration, body, done))),
+			next_iteration,
+			node.condition_node,
+			(JUMP_IF_FALSE, done),
+			body,
+			node.body_node,
+			(POP if node.should_return_null else LOOP_APPEND, None),
+			(JUMP, next_iteration),
+			done,
+			(END_LOOP, self.const((node.should_return_null, node))),
+		]
+
+	def compile_FuncDefNode(self, node):
+		func_name = node.var_name_tok.value if node.var_name_tok else None
+		body_code = CodeObject(func_name or '<anonymous>')
+		self.pending.append((node.body_node, body_code))
+		arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+		return [(MAKE_FUNCTION, self.const((func_name, arg_names, node.should_auto_return, node.scope, body_code, node)))]
+
+	def compile_CallNode(self, node):
+		return [node.node_to_call, (CALLEE, self.const(node))] + node.arg_nodes + [(CALL, self.const((len(node.arg_nodes), node)))]
+
+	def compile_ReturnNode(self, node):
+		return [node.node_to_return or (PUSH_NULL, None), (RETURN, None)]
+
+	def compile_ContinueNode(self, node):
+		return [(CONTINUE, None)]
+
+	def compile_BreakNode(self, node):
+		return [(BREAK, None)]
+
+########################################################
+##	VIRTUAL MACHINE
+########################################################
+
+##runs CodeObjects on a value stack per frame, calling a function pushes a Frame instead of recursing in Python
+##every Value method the Interpreter calls is called the same way, so results, errors and crashes stay the same
+
+class VMFunction(Function):
+	__slots__ = ('code',)
+
+	def __init__(self, name, body_node, arg_names, should_auto_return, scope, code):
+		super().__init__(name, body_node, arg_names, should_auto_return, scope)
+		self.code = code ##CodeObject of the body
+
+	def execute(self, args): ##for the Interpreter and anything else that calls it from outside a VM
+		return VM().call(self, args)
+
+	def copy(self):
+		copy = VMFunction(self.name, self.body_node, self.arg_names, self.should_auto_return, self.scope, self.code)
+		copy.set_context(self.context)
+		copy.set_span(self.span)
+		return copy
+
+class Frame:
+	__slots__ = ('code', 'pc', 'context', 'stack', 'loops', 'function', 'call_node', 'memo')
+
+	def __init__(self, code, context, function=None, call_node=None):
+		self.code = code
+		self.pc = 0 ##position of the next instruction in code.ops
+		self.context = context
+		self.stack = []
+		self.loops = [] ##Loop of every loop the frame is inside, innermost last
+		self.function = function ##VMFunction the frame runs, None for a program
+		self.call_node = call_node ##CallNode whose span the returned value gets
+		self.memo = None ##(MemoCache, key) the returned value is kept under, for a call of a MEMO function
+
+class Loop:
+	__slots__ = ('height', 'next_iteration', 'body', 'done', 'elements', 'steps')
+
+	def __init__(self, height, next_iteration, body, done):
+		self.height = height ##stack height to go back to on BREAK and CONTINUE
+		self.next_iteration = next_iteration
+		self.body = body ##BREAK and CONTINUE only belong to the loop between body and done, not to a WHILE's condition
+		self.done = done
+		self.elements = []
+
+class VM:
+	def run(self, code, context): ##the RTResult Interpreter.visit gives for the program
+		return self.execute([Frame(code, context)])
+
+	def call(self, function, args): ##the RTResult Function.execute gives
+		exec_ctx, error = frame_pool.enter(function, args)
+		if error:
+			return RTResult().failure(error)
+		return self.execute([Frame(function.code, exec_ctx, function)])
+
+	def execute(self, frames):
+		try:
+			return self.loop(frames)
+		except RTFailure as failure:
+			return RTResult().failure(failure.error)
+
+	def loop(self, frames):
+		frame = frames[-1]
+		while True: ##one pass per frame switch, the locals below are the running frame's
+			ops = frame.code.ops
+			consts = frame.code.consts
+			context = frame.context
+			stack = frame.stack
+			pc = frame.pc
+
+			while True:
+				op = ops[pc]
+				arg = ops[pc + 1]
+				pc += 2
+
+				if op == LOAD_LOCAL:
+					name, slot, node = consts[arg]
+					table = context.symbol_table
+					value = table.values[slot]
+					if value is None and table.parent: ##not set in this frame (yet), the chain decides
+						value = table.parent.get(name)
+					if value is None:
+						raise RTFailure(RTError(node.pos_start, node.pos_end, f'{name} is not defined', context))
+					stack.append(value.located(node, context))
+
+				elif op == BINARY_CONST:
+					operations, fast, divides, node, right_node = consts[arg]
+					left = stack[-1]
+					if type(left) is Number:
+						result = Number(fast(left.value, right_node.tok.value))
+						result.context = left.context
+						result.span = node
+					else: ##the literal's Number is only made when the operator table needs it
+						right = Number(right_node.tok.value)
+						right.context = context
+						right.span = right_node
+						result, error = operations[type(left), Number](left, right)
+						if error:
+							raise RTFailure(error)
+						result.set_span(node)
+					stack[-1] = result
+
+				elif op == NUMBER:
+					value, node = consts[arg]
+					result = Number(value)
+					result.context = context
+					result.span = node
+					stack.append(result)
+
+				elif op == BINARY:
+					operations, fast, divides, node = consts[arg]
+					right = stack.pop()
+					left = stack[-1]
+					if type(left) is Number and type(right) is Number and not (divides and right.value == 0):
+						result = Number(fast(left.value, right.value))
+						result.context = left.context
+						result.span = node
+					else:
+						result, error = operations[type(left), type(right)](left, right)
+						if error:
+							raise RTFailure(error)
+						result.set_span(node)
+					stack[-1] = result
+
+				elif op == STORE_LOCAL:
+					context.symbol_table.store(consts[arg][1], stack[-1])
+
+				elif op == JUMP_IF_FALSE:
+					if not stack.pop().is_true():
+						pc = arg
+
+				elif op == JUMP:
+					pc = arg
+
+				elif op == FOR_ITER:
+					if next(frame.loops[-1].steps, None) is None: ##bound the variable otherwise
+						pc = arg
+
+				elif op == BUILD_LIST:
+					count, node = consts[arg]
+					elements = stack[len(stack) - count:]
+					del stack[len(stack) - count:]
+					stack.append(List(elements).set_context(context).set_span(node))
+
+				elif op == LOOP_APPEND:
+					frame.loops[-1].elements.append(stack.pop())
+
+				elif op == POP:
+					stack.pop()
+
+				elif op == LOAD_GLOBAL:
+					name, slot, node = consts[arg]
+					root = context.symbol_table.root
+					value = context.symbol_table.get(name) if name in root.shadowed else root.values[slot]
+					if value is None:
+						raise RTFailure(RTError(node.pos_start, node.pos_end, f'{name} is not defined', context))
+					stack.append(value.located(node, context))
+
+				elif op == CALL:
+					count, node = consts[arg]
+					args = stack[len(stack) - count:]
+					del stack[len(stack) - count:]
+					value_to_call = stack.pop()
+					memo = None
+					if type(value_to_call) is MemoizedFunction and type(value_to_call.function) is VMFunction:
+						##a miss runs on the frame stack like any other call, RETURN puts what it gives in the cache
+						key, value = value_to_call.lookup(args)
+						if value is not None:
+							stack.append(memo_copy(value).located(node, context))
+							continue
+						if key is not None:
+							memo = (value_to_call.cache, key)
+						value_to_call = value_to_call.function.located(value_to_call.span, value_to_call.context)
+					if type(value_to_call) is VMFunction: ##a new frame instead of a Python call
+						call_node = node
+						tail_call = None
+						if node.tail and frame.function is not None and frame.memo is None and memo is None:
+							##the callee may take the running frame's place, unless one of them has a result to keep
+							tail_call = frame_pool.tail(context, value_to_call, args)
+							if tail_call is not None:
+								value_to_call = tail_call
+						exec_ctx, error = frame_pool.enter(value_to_call, args)
+						if error:
+							raise RTFailure(error)
+						if tail_call is not None:
+							frames.pop()
+							call_node = frame.call_node
+						else: ##the running frame waits for the callee, as for any other call
+							frame.pc = pc
+						frame = Frame(value_to_call.code, exec_ctx, value_to_call, call_node)
+						frame.memo = memo
+						frames.append(frame)
+						break
+					if type(value_to_call) is BuiltInFunction: ##no RTResult to look through
+						stack.append(value_to_call.call(args).located(node, context))
+						continue
+					res = value_to_call.execute(args)
+					if res.error:
+						raise RTFailure(res.error)
+					if res.loop_should_break or res.loop_should_continue: ##a BREAK or CONTINUE in a function ends up in the caller's loop
+						frame.pc = pc
+						frame = self.unwind(frames, res.loop_should_break)
+						if frame is None:
+							return RTResult().success_break() if res.loop_should_break else RTResult().success_continue()
+						break
+					stack.append(res.value.located(node, context))
+
+				elif op == CALLEE:
+					stack[-1] = stack[-1].copy().set_span(consts[arg])
+
+				elif op == STRING:
+					value, node = consts[arg]
+					result = String(value)
+					result.context = context
+					result.span = node
+					stack.append(result)
+
+				elif op == LOAD_NAME:
+					name, slot, node = consts[arg]
+					value = context.symbol_table.get(name)
+					if value is None:
+						raise RTFailure(RTError(node.pos_start, node.pos_end, f'{name} is not defined', context))
+					stack.append(value.located(node, context))
+
+				elif op == STORE_NAME:
+					context.symbol_table.set(consts[arg][0], stack[-1])
+
+				elif op == NEGATE:
+					operations, node = consts[arg]
+					number = stack[-1]
+					if type(number) is Number:
+						result = Number(number.value * -1)
+						result.context = number.context
+						result.span = node
+					else:
+						result, error = operations[type(number)](number) ##the Interpreter does not check error either
+						result.set_span(node)
+					stack[-1] = result
+
+				elif op == NOT or op == PLUS:
+					operations, node = consts[arg]
+					number, error = operations[type(stack[-1])](stack[-1])
+					stack[-1] = number.set_span(node)
+
+				elif op == PUSH_NULL:
+					stack.append(Number.null)
+
+				elif op == FOR_PREP:
+					var_name, has_step, next_iteration, done = consts[arg]
+					step = stack.pop() if has_step else Number(1)
+					end = stack.pop()
+					start = stack.pop()
+					loop = Loop(len(stack), next_iteration.position, next_iteration.position + 2, done.position)
+					loop.steps = for_loop(context.symbol_table, var_name, start, end, step)
+					frame.loops.append(loop)
+
+				elif op == SETUP_LOOP:
+					next_iteration, body, done = consts[arg]
+					frame.loops.append(Loop(len(stack), next_iteration.position, body.position, done.position))
+
+				elif op == END_LOOP:
+					should_return_null, node = consts[arg]
+					loop = frame.loops.pop()
+					stack.append(Number.null if should_return_null else List(loop.elements).set_context(context).set_span(node))
+
+				elif op == BREAK or op == CONTINUE:
+					frame.pc = pc
+					frame = self.unwind(frames, op == BREAK)
+					if frame is None: ##no loop anywhere, the program just stops like it does in the Interpreter
+						return RTResult().success_break() if op == BREAK else RTResult().success_continue()
+					break
+
+				elif op == MAKE_FUNCTION:
+					func_name, arg_names, should_auto_return, scope, body_code, node = consts[arg]
+					func_value = VMFunction(func_name, node.body_node, arg_names, should_auto_return, scope, body_code).set_context(context).set_span(node)
+					if func_name:
+						context.symbol_table.set(func_name, func_value)
+					stack.append(func_value)
+
+				elif op == RETURN or op == END:
+					value = stack.pop()
+					function = frame.function
+					if function is None: ##the program itself
+						return RTResult().success_return(value) if op == RETURN else RTResult().success(value)
+					if op == END and not function.should_auto_return:
+						value = Number.null
+					if frame.memo is not None:
+						cache, key = frame.memo
+						cache.put(key, memo_copy(value))
+					frames.pop()
+					if not frames: ##the function VM.call was asked to run
+						return RTResult().success(value)
+					frame_pool.leave(context, value)
+					call_node = frame.call_node
+					frame = frames[-1]
+					frame.stack.append(value.located(call_node, frame.context))
+					break
+
+				else:
+					raise Exception(f'Unknown opcode {op}')
+
+	def unwind(self, frames, is_break): ##the frame whose loop a BREAK or CONTINUE goes to, with its pc moved there
+		while frames:
+			frame = frames[-1]
+			while frame.loops:
+				loop = frame.loops[-1]
+				if loop.body <= frame.pc < loop.done:
+					del frame.stack[loop.height:]
+					frame.pc = loop.done if is_break else loop.next_iteration
+					return frame
+				frame.loops.pop() ##from a WHILE condition, that loop is left and the signal goes on to the one around it
+			frames.pop() ##the function has no loop, the signal goes on to its caller
+		return None
+
+def run_bytecode(node, context): ##compile the tree and run it, gives the RTResult Interpreter.visit would
+	return VM().run(BytecodeCompiler().compile(node), context)
+
+########################################################
+##	DISASSEMBLER
+########################################################
+
+def disassemble(code): ##readable listing of code and of every function body in it
+	lines = []
+	codes = [code]
+	while codes:
+		code = codes.pop(0)
+		lines.append(f'{code.name}:')
+		for pc in range(0, len(code.ops), 2):
+			op, arg = code.ops[pc], code.ops[pc + 1]
+			lines.append('  %4d %-14s %s' % (pc, OPNAMES[op], describe(code, op, arg, codes)))
+		lines.append('')
+	return '\n'.join(lines)
+
+def describe(code, op, arg, codes):
+	if arg is None:
+		return ''
+	if op in (JUMP, JUMP_IF_FALSE, FOR_ITER):
+		return f'-> {arg}'
+	const = code.consts[arg]
+	if op in (NUMBER, STRING):
+		return repr(const[0])
+	if op in (LOAD_LOCAL, LOAD_GLOBAL, STORE_LOCAL):
+		return f'{const[0]} (slot {const[1]})'
+	if op in (LOAD_NAME, STORE_NAME):
+		return const[0]
+	if op == BINARY:
+		return const[3].op_tok.value or const[3].op_tok.type
+	if op == BINARY_CONST:
+		return f'{const[3].op_tok.value or const[3].op_tok.type} {const[4].tok.value!r}'
+	if op in (BUILD_LIST, CALL):
+		return f'{const[0]} values' if op == BUILD_LIST else f'{const[0]} args'
+	if op == SETUP_LOOP:
+		return f'continue -> {const[0].position}, body {const[1].position}, break -> {const[2].position}'
+	if op == FOR_PREP:
+		return f'{const[0]}, continue -> {const[2].position}, break -> {const[3].position}'
+	if op == END_LOOP:
+		return 'null' if const[0] else 'list'
+	if op == MAKE_FUNCTION:
+		codes.append(const[4])
+		return f'{const[4].name}({", ".join(const[1])})'
+	return ''
@@ -0,0 +1,336 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from rtresult import *
+from valuenode import *
+from context import *
+from symboltable import *
+from resolver import *
+from operators import *
+
+########################################################
+##	CLOSURE COMPILER
+########################################################
+
+##turns every node into a Python function of the context once, running the program is calling the root's function
+##each function already knows its node's operator, children and variable slot, so nothing is looked up per node
+##and no RTResult is made per node: a node's function returns its Value and raises RTFailure/ReturnValue/BreakLoop/
+##ContinueLoop (rtresult.py) where the Interpreter would hand back an RTResult with the matching flag
+##every operator goes through the same operator table as the Interpreter (operators.py), so results, errors and crashes
+##stay the same, two Numbers only skip the table where it is sure to give the same Number
+
+class CompiledFunction(Function):
+	__slots__ = ('code',)
+
+	def __init__(self, name, body_node, arg_names, should_auto_return, scope, code):
+		super().__init__(name, body_node, arg_names, should_auto_return, scope)
+		self.code = code ##compiled body
+
+	def call(self, args): ##Function.execute returning the Value, signals other than RETURN go on to the caller
+		function = self
+		while True: ##calls in tail position come back as a TailCall (valuenode.py) and are made here
+			exec_ctx, error = frame_pool.enter(function, args)
+			if error:
+				raise RTFailure(error)
+			try:
+				value = function.code(exec_ctx)
+				value = value if function.should_auto_return else Number.null
+			except ReturnValue as ret:
+				value = ret.value
+			except RecursionError: ##a call that does not fit on Python's stack fails where it was made
+				raise RTFailure(recursion_error(function, function.context)) from None
+			if type(value) is not TailCall:
+				frame_pool.leave(exec_ctx, value)
+				return value
+			function, args = frame_pool.tail(exec_ctx, value.function, value.args) or value.function, value.args ##a frame that stays is left to the garbage collector
+
+	def execute(self, args): ##for the Interpreter and anything else that expects an RTResult
+		try:
+			return RTResult().success(self.call(args))
+		except (RTFailure, BreakLoop, ContinueLoop) as signal:
+			return RTResult().from_signal(signal)
+
+	def copy(self):
+		copy = CompiledFunction(self.name, self.body_node, self.arg_names, self.should_auto_return, self.scope, self.code)
+		copy.set_context(self.context)
+		copy.set_span(self.span)
+		return copy
+
+class ClosureCompiler:
+	def compile(self, node): ##function(context) -> Value for the tree under node
+		order = []
+		stack = [node]
+		while stack: ##without recursion, trees can be nested far deeper than Python's stack
+			current = stack.pop()
+			order.append(current)
+			for name in type(current).__slots__:
+				self.collect(getattr(current, name), stack)
+
+		code = {} ##node -> its function, children are compiled before their parents
+		for current in reversed(order):
+			code[current] = getattr(self, f'compile_{type(current).__name__}')(current, code)
+		return code[node]
+
+	def collect(self, value, stack): ##child nodes in a slot, IF cases and the else case are tuples inside lists
+		if isinstance(value, Node):
+			stack.append(value)
+		elif type(value) in (list, tuple):
+			for item in value:
+				self.collect(item, stack)
+
+	##########################################
+
+	def compile_NumberNode(self, node, code):
+		value = node.tok.value
+		def number(context):
+			result = Number(value)
+			result.context = context
+			result.span = node
+			return result
+		return number
+
+	def compile_StringNode(self, node, code):
+		value = node.tok.value
+		def string(context):
+			result = String(value)
+			result.context = context
+			result.span = node
+			return result
+		return string
+
+	def compile_BinOpNode(self, node, code):
+		left, right = code[node.left_node], code[node.right_node]
+		operations = binary_operations(node)
+		fast = NUMBER_OPS[operations.name]
+		checks_zero = operations.name == 'dived_by'
+
+		def slow(left_value, right_value): ##the Interpreter's way
+			result, error = operations[type(left_value), type(right_value)](left_value, right_value)
+			if error:
+				raise RTFailure(error)
+			return result.set_span(node)
+
+		if isinstance(node.right_node, NumberNode) and not (checks_zero and node.right_node.tok.value == 0):
+			constant = node.right_node.tok.value
+			def binop_constant(context): ##x + 1, n - 1, n == 0 ...
+				left_value = left(context)
+				if type(left_value) is Number:
+					result = Number(fast(left_value.value, constant))
+					result.context = left_value.context
+					result.span = node
+					return result
+				return slow(left_value, right(context))
+			return binop_constant
+
+		def binop(context):
+			left_value = left(context)
+			right_value = right(context)
+			if type(left_value) is Number and type(right_value) is Number and not (checks_zero and right_value.value == 0):
+				result = Number(fast(left_value.value, right_value.value))
+				result.context = left_value.context
+				result.span = node
+				return result
+			return slow(left_value, right_value)
+		return binop
+
+	def compile_UnaryOpNode(self, node, code):
+		operand = code[node.node]
+		operations = unary_operations(node)
+		if operations.name == 'negated':
+			def negate(context):
+				number = operand(context)
+				if type(number) is Number:
+					result = Number(number.value * -1)
+					result.context = number.context
+					result.span = node
+					return result
+				number, error = operations[type(number)](number) ##the Interpreter does not check error either
+				return number.set_span(node)
+			return negate
+		def unary(context):
+			number = operand(context)
+			number, error = operations[type(number)](number)
+			return number.set_span(node)
+		return unary
+
+	def compile_VarAccessNode(self, node, code):
+		var_name = node.var_name_tok.value
+		slot = node.slot
+
+		def undefined(context):
+			return RTFailure(RTError(node.pos_start, node.pos_end, f'{var_name} is not defined', context))
+
+		if node.depth == LOCAL:
+			def local(context):
+				table = context.symbol_table
+				value = table.values[slot]
+				if value is None and table.parent: ##not set in this frame (yet), the chain decides
+					value = table.parent.get(var_name)
+				if value is None:
+					raise undefined(context)
+				return value.located(node, context)
+			return local
+
+		if node.depth == GLOBAL:
+			def global_(context):
+				root = context.symbol_table.root
+				if var_name in root.shadowed:
+					value = context.symbol_table.get(var_name)
+				else:
+					value = root.values[slot]
+				if value is None:
+					raise undefined(context)
+				return value.located(node, context)
+			return global_
+
+		def by_name(context):
+			value = context.symbol_table.get(var_name)
+			if value is None:
+				raise undefined(context)
+			return value.located(node, context)
+		return by_name
+
+	def compile_VarAssignNode(self, node, code):
+		value_code = code[node.value_node]
+		var_name = node.var_name_tok.value
+		slot = node.slot
+		if node.depth == LOCAL:
+			def assign_local(context):
+				value = value_code(context)
+				context.symbol_table.store(slot, value)
+				return value
+			return assign_local
+		def assign(context):
+			value = value_code(context)
+			context.symbol_table.set(var_name, value)
+			return value
+		return assign
+
+	def compile_ListNode(self, node, code):
+		element_codes = [code[element_node] for element_node in node.element_nodes]
+		if node.effect_only:
+			def block(context):
+				for element in element_codes:
+					element(context)
+				return Number.null
+			return block
+		def list_(context):
+			return List([element(context) for element in element_codes]).set_context(context).set_span(node)
+		return list_
+
+	def compile_IfNode(self, node, code):
+		cases = [(code[condition], code[expr], should_return_null) for condition, expr, should_return_null in node.cases]
+		else_code, else_null = (code[node.else_case[0]], node.else_case[1]) if node.else_case else (None, False)
+		def if_(context):
+			for condition, expr, should_return_null in cases:
+				if condition(context).is_true():
+					value = expr(context)
+					return Number.null if should_return_null else value
+			if else_code:
+				value = else_code(context)
+				return Number.null if else_null else value
+			return Number.null
+		return if_
+
+	def compile_ForNode(self, node, code):
+		start, end, body = code[node.start_value_node], code[node.end_value_node], code[node.body_node]
+		step = code[node.step_value_node] if node.step_value_node else None
+		var_name = node.var_name_tok.value
+		should_return_null = node.should_return_null
+		def for_(context):
+			start_value = start(context)
+			end_value = end(context)
+			step_value = step(context) if step else Number(1)
+			elements = []
+			for _ in for_loop(context.symbol_table, var_name, start_value, end_value, step_value):
+				try:
+					value = body(context)
+				except ContinueLoop:
+					continue
+				except BreakLoop:
+					break
+				if not should_return_null: ##the list is thrown away otherwise
+					elements.append(value)
+
+			return Number.null if should_return_null else List(elements).set_context(context).set_span(node)
+		return for_
+
+	def compile_WhileNode(self, node, code):
+		condition, body = code[node.condition_node], code[node.body_node]
+		should_return_null = node.should_return_null
+		def while_(context):
+			elements = []
+			while condition(context).is_true():
+				try:
+					value = body(context)
+				except ContinueLoop:
+					continue
+				except BreakLoop:
+					break
+				if not should_return_null:
+					elements.append(value)
+			return Number.null if should_return_null else List(elements).set_context(context).set_span(node)
+		return while_
+
+	def compile_FuncDefNode(self, node, code):
+		body = code[node.body_node]
+		func_name = node.var_name_tok.value if node.var_name_tok else None
+		arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+		def function(context):
+			func_value = CompiledFunction(func_name, node.body_node, arg_names, node.should_auto_return, node.scope, body).set_context(context).set_span(node)
+			if func_name:
+				context.symbol_table.set(func_name, func_value)
+			return func_value
+		return function
+
+	def compile_CallNode(self, node, code):
+		callee = code[node.node_to_call]
+		arg_codes = [code[arg_node] for arg_node in node.arg_nodes]
+		tail = node.tail
+		def call(context):
+			value_to_call = callee(context).copy().set_span(node)
+			args = [arg(context) for arg in arg_codes]
+			if tail and type(value_to_call) is CompiledFunction: ##CompiledFunction.call makes it
+				return TailCall(value_to_call, args)
+			if type(value_to_call) is CompiledFunction:
+				return_value = value_to_call.call(args)
+			elif type(value_to_call) is BuiltInFunction:
+				return_value = value_to_call.call(args)
+			else: ##functions the Interpreter made, values that can not be called
+				return_value = raise_signal(value_to_call.execute(args))
+			return return_value.located(node, context)
+		return call
+
+	def compile_ReturnNode(self, node, code):
+		value_code = code[node.node_to_return] if node.node_to_return else None
+		def return_(context):
+			raise ReturnValue(value_code(context) if value_code else Number.null)
+		return return_
+
+	def compile_ContinueNode(self, node, code):
+		def continue_(context):
+			raise ContinueLoop()
+		return continue_
+
+	def compile_BreakNode(self, node, code):
+		def break_(context):
+			raise BreakLoop()
+		return break_
+
+def run_compiled(node, context): ##compile the tree and run it, gives the RTResult Interpreter.visit would
+	code = ClosureCompiler().compile(node)
+	try:
+		return RTResult().success(code(context))
+	except (RTFailure, ReturnValue, BreakLoop, ContinueLoop) as signal:
+		return RTResult().from_signal(signal)
+	except RecursionError: ##nested deeper than Python's stack outside any function
+		return RTResult().failure(recursion_error(node, context))
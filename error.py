@@ -58,4 +58,7 @@ class RTError(Error): ##sub class of error invoked when a parser comes across an
 			result = f'  File {pos.fn}, line {str(pos.ln + 1)}, in {ctx.display_name}\n' + result
 			pos = ctx.parent_entry_pos
 			ctx = ctx.parent
-		return 'Traceback (most recent call last):\n' + result
\ No newline at end of file
+		return 'Traceback (most recent call last):\n' + result
+
+def recursion_error(span, context): ##the program went deeper than Python's stack lets the engine follow it, at span
+	return RTError(span.pos_start, span.pos_end, 'Maximum recursion depth exceeded', context)
\ No newline at end of file
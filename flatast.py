@@ -0,0 +1,240 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+from array import array
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+
+########################################################
+##	FLAT AST
+########################################################
+
+##the whole tree of a program in parallel arrays instead of one object per node, for keeping parsed programs around
+##nodes are stored in preorder so a parent always comes before its children and a walk is a scan over the arrays
+##tokens the nodes refer to go into a TokenBuffer, every offset counts from the start of the file
+
+NODE_KINDS = (NumberNode, StringNode, BinOpNode, UnaryOpNode, VarAccessNode, VarAssignNode, ListNode, IfNode,
+	ForNode, WhileNode, FuncDefNode, CallNode, ReturnNode, ContinueNode, BreakNode)
+NODE_KIND_CODES = {node_class: code for code, node_class in enumerate(NODE_KINDS)}
+
+##bits of FlatAST.flags
+FLAG_OPTIONAL = 1 ##IfNode has an else case, ForNode has a step value
+FLAG_BLOCK = 2 ##should_return_null of a ForNode/WhileNode or the else case, should_auto_return of a FuncDefNode, effect_only of a ListNode
+
+class FlatAST:
+	def __init__(self, source):
+		self.source = source ##SourceFile every offset points into
+		self.kinds = array('B') ##kind code of each node, see NODE_KINDS
+		self.starts = array('I') ##start offset of each node
+		self.ends = array('I') ##end offset of each node
+		self.first_child = array('I') ##where the node's children start in children
+		self.child_counts = array('I')
+		self.refs = array('i') ##the node's token in tokens or its entry in extras, -1 when it has neither
+		self.flags = array('B')
+		self.children = array('I') ##node indexes, the children of one node are next to each other
+		self.tokens = TokenBuffer(source)
+		self.extras = [] ##what is more than one token: the flags of every IF case, a function's name and arguments
+
+	def __len__(self):
+		return len(self.kinds)
+
+	def kind(self, idx): ##node class of the node at idx
+		return NODE_KINDS[self.kinds[idx]]
+
+	def children_of(self, idx):
+		first = self.first_child[idx]
+		return self.children[first:first + self.child_counts[idx]]
+
+	def pos_start(self, idx):
+		return Position(self.starts[idx], self.source)
+
+	def pos_end(self, idx):
+		return Position(self.ends[idx], self.source)
+
+	##########################################
+
+	def add(self, node): ##append node and everything below it, returns the index of node
+		root = len(self.kinds)
+		stack = [(node, -1)] ##(node, slot in children its index goes into)
+		while stack:
+			node, slot = stack.pop()
+			idx = len(self.kinds)
+			if slot >= 0:
+				self.children[slot] = idx
+
+			node_children, ref, flags = getattr(self, 'encode_' + type(node).__name__)(node)
+			base = node.source.base
+			self.kinds.append(NODE_KIND_CODES[type(node)])
+			self.starts.append(node.start + base)
+			self.ends.append(node.end + base)
+			self.first_child.append(len(self.children))
+			self.child_counts.append(len(node_children))
+			self.refs.append(ref)
+			self.flags.append(flags)
+
+			first = len(self.children)
+			self.children.extend([0] * len(node_children)) ##filled in once the children get their index
+			for i in range(len(node_children) - 1, -1, -1): ##reversed so the first child is popped and numbered first
+				stack.append((node_children[i], first + i))
+		return root
+
+	def add_token(self, tok):
+		if tok is None:
+			return -1
+		base = tok.source.base
+		self.tokens.append(tok.type, tok.value, tok.start + base, tok.end + base)
+		return len(self.tokens) - 1
+
+	def add_extra(self, extra):
+		self.extras.append(extra)
+		return len(self.extras) - 1
+
+	##every encode_ returns (child nodes, ref, flags)
+
+	def encode_NumberNode(self, node):
+		return (), self.add_token(node.tok), 0
+
+	encode_StringNode = encode_NumberNode
+
+	def encode_VarAccessNode(self, node):
+		return (), self.add_token(node.var_name_tok), 0
+
+	def encode_BinOpNode(self, node):
+		return (node.left_node, node.right_node), self.add_token(node.op_tok), 0
+
+	def encode_UnaryOpNode(self, node):
+		return (node.node,), self.add_token(node.op_tok), 0
+
+	def encode_VarAssignNode(self, node):
+		return (node.value_node,), self.add_token(node.var_name_tok), 0
+
+	def encode_ListNode(self, node):
+		return node.element_nodes, -1, FLAG_BLOCK if node.effect_only else 0
+
+	def encode_IfNode(self, node):
+		node_children = []
+		for condition, expr, should_return_null in node.cases:
+			node_children.append(condition)
+			node_children.append(expr)
+		flags = 0
+		if node.else_case:
+			node_children.append(node.else_case[0])
+			flags = FLAG_OPTIONAL | (FLAG_BLOCK if node.else_case[1] else 0)
+		return node_children, self.add_extra(tuple(case[2] for case in node.cases)), flags
+
+	def encode_ForNode(self, node):
+		node_children = [node.start_value_node, node.end_value_node]
+		flags = FLAG_BLOCK if node.should_return_null else 0
+		if node.step_value_node:
+			node_children.append(node.step_value_node)
+			flags |= FLAG_OPTIONAL
+		node_children.append(node.body_node)
+		return node_children, self.add_token(node.var_name_tok), flags
+
+	def encode_WhileNode(self, node):
+		return (node.condition_node, node.body_node), -1, FLAG_BLOCK if node.should_return_null else 0
+
+	def encode_FuncDefNode(self, node):
+		extra = (self.add_token(node.var_name_tok), tuple(self.add_token(tok) for tok in node.arg_name_toks))
+		return (node.body_node,), self.add_extra(extra), FLAG_BLOCK if node.should_auto_return else 0
+
+	def encode_CallNode(self, node):
+		return [node.node_to_call] + node.arg_nodes, -1, 0
+
+	def encode_ReturnNode(self, node):
+		return (node.node_to_return,) if node.node_to_return else (), -1, 0
+
+	def encode_ContinueNode(self, node):
+		return (), -1, 0
+
+	encode_BreakNode = encode_ContinueNode
+
+	##########################################
+
+	def to_node(self, idx=0): ##the node objects for the tree at idx
+		##children come after their parent so building from the back means every child already exists
+		end = idx + 1
+		stack = [idx]
+		while stack: ##find where the subtree ends, it is one run of indexes in preorder
+			node_idx = stack.pop()
+			end = max(end, node_idx + 1)
+			stack.extend(self.children_of(node_idx))
+
+		built = {}
+		for node_idx in range(end - 1, idx - 1, -1):
+			node_children = [built.pop(child) for child in self.children_of(node_idx)]
+			built[node_idx] = getattr(self, 'decode_' + self.kind(node_idx).__name__)(node_idx, node_children)
+		return built[idx]
+
+	def token(self, ref):
+		if ref < 0:
+			return None
+		return self.tokens.token(ref)
+
+	def decode_NumberNode(self, idx, node_children):
+		return NumberNode(self.token(self.refs[idx]))
+
+	def decode_StringNode(self, idx, node_children):
+		return StringNode(self.token(self.refs[idx]))
+
+	def decode_VarAccessNode(self, idx, node_children):
+		return VarAccessNode(self.token(self.refs[idx]))
+
+	def decode_BinOpNode(self, idx, node_children):
+		return BinOpNode(node_children[0], self.token(self.refs[idx]), node_children[1])
+
+	def decode_UnaryOpNode(self, idx, node_children):
+		return UnaryOpNode(self.token(self.refs[idx]), node_children[0])
+
+	def decode_VarAssignNode(self, idx, node_children):
+		return VarAssignNode(self.token(self.refs[idx]), node_children[0])
+
+	def decode_ListNode(self, idx, node_children):
+		node = ListNode(node_children, self.pos_start(idx), self.pos_end(idx))
+		node.effect_only = bool(self.flags[idx] & FLAG_BLOCK)
+		return node
+
+	def decode_IfNode(self, idx, node_children):
+		case_flags = self.extras[self.refs[idx]]
+		cases = [(node_children[2 * i], node_children[2 * i + 1], case_flags[i]) for i in range(len(case_flags))]
+		else_case = None
+		if self.flags[idx] & FLAG_OPTIONAL:
+			else_case = (node_children[-1], bool(self.flags[idx] & FLAG_BLOCK))
+		return IfNode(cases, else_case)
+
+	def decode_ForNode(self, idx, node_children):
+		flags = self.flags[idx]
+		step_value_node = node_children[2] if flags & FLAG_OPTIONAL else None
+		return ForNode(self.token(self.refs[idx]), node_children[0], node_children[1], step_value_node, node_children[-1], bool(flags & FLAG_BLOCK))
+
+	def decode_WhileNode(self, idx, node_children):
+		return WhileNode(node_children[0], node_children[1], bool(self.flags[idx] & FLAG_BLOCK))
+
+	def decode_FuncDefNode(self, idx, node_children):
+		name_ref, arg_refs = self.extras[self.refs[idx]]
+		return FuncDefNode(self.token(name_ref), [self.token(ref) for ref in arg_refs], node_children[0], bool(self.flags[idx] & FLAG_BLOCK))
+
+	def decode_CallNode(self, idx, node_children):
+		return CallNode(node_children[0], node_children[1:])
+
+	def decode_ReturnNode(self, idx, node_children):
+		return ReturnNode(node_children[0] if node_children else None, self.pos_start(idx), self.pos_end(idx))
+
+	def decode_ContinueNode(self, idx, node_children):
+		return ContinueNode(self.pos_start(idx), self.pos_end(idx))
+
+	def decode_BreakNode(self, idx, node_children):
+		return BreakNode(self.pos_start(idx), self.pos_end(idx))
+
+def flatten(node): ##FlatAST of the tree under node
+	source = node.source
+	flat = FlatAST(getattr(source, 'file', source)) ##a SourceSegment's offsets are made absolute
+	flat.add(node)
+	return flat
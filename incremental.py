@@ -0,0 +1,160 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import bisect
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from parse import *
+
+########################################################
+##	INCREMENTAL DOCUMENT
+########################################################
+
+##keeps a file parsed as a list of top level statements so an edit only re-lexes and re-parses the statements around it
+##every statement gets its own SourceSegment, text inserted or deleted before it only moves the segment's base
+##the statements after the edit are reused as soon as parsing lines up with one of them again
+
+class Chunk: ##one top level statement
+	__slots__ = ('source', 'length', 'node')
+
+	def __init__(self, source, length, node):
+		self.source = source ##SourceSegment the statement's tokens and node positions count from
+		self.length = length ##offset just after the statement's last token
+		self.node = node
+
+	@property
+	def start(self):
+		return self.source.base
+
+	@property
+	def end(self):
+		return self.source.base + self.length
+
+class IncrementalDocument:
+	def __init__(self, fn, text):
+		self.fn = fn
+		self.text = text
+		self.source = SourceFile(fn, text)
+		self.chunks = []
+		self.dirty = None ##(start, end) of text that still has to be parsed again after an error
+		self.segment = None ##segment the lexer gives to new tokens
+		self.reparsed = 0 ##statements parsed by the last update, for measuring
+		self.parse()
+
+	def parse(self): ##parse the whole text from scratch
+		self.chunks = []
+		self.dirty = (0, len(self.text))
+		return self.update(0, 0, 0)
+
+	def edit(self, start, end, new_text): ##replace text[start:end] with new_text and bring the tree up to date
+		self.text = self.text[:start] + new_text + self.text[end:]
+		self.source.ftxt = self.text
+		self.source.line_starts = None ##rebuilt the next time an error needs it
+		return self.update(start, end, len(new_text) - (end - start))
+
+	def update(self, start, end, delta):
+		if self.dirty: ##text left unparsed by an earlier error has to be parsed again as well
+			start, end = min(start, self.dirty[0]), max(end, self.dirty[1])
+
+		##the statement before the first touched one is parsed again too since the edit may join it with the next
+		first = max(bisect.bisect_left(self.chunks, start, key=lambda chunk: chunk.end) - 1, 0)
+		region_start = self.chunks[first].start if first > 0 else 0
+		edit_end = end + delta ##end of the edited text in the new text
+
+		lexer = RegexLexer(self.fn, self.text)
+		self.segment = SourceSegment(self.source, region_start)
+		tokens = TokenStream(self.generate_tokens(lexer, region_start))
+		parser = Parser(tokens)
+		res = ParseResult()
+		new_chunks = []
+		resync = len(self.chunks) ##old chunk the new statements line up with again
+		at_first = first == 0 ##the first statement of the file has to parse, later ones just end the list when they fail
+
+		if at_first:
+			while parser.current_tok.type == TT_NEWLINE:
+				parser.advance()
+
+		while True:
+			tok = parser.current_tok
+			tok_start = tok.source.base + tok.start
+
+			if tok_start >= edit_end and tok.type != TT_EOF:
+				old = bisect.bisect_left(self.chunks, tok_start - delta, key=lambda chunk: chunk.start)
+				if old < len(self.chunks) and self.chunks[old].start == tok_start - delta and self.chunks[old].start >= end:
+					resync = old
+					break
+
+			self.segment = SourceSegment(self.source, tok_start)
+			self.rehome(tokens, parser.tok_idx)
+			parser.mark()
+			stmt = parser.run(parser.statement())
+			if stmt.error:
+				if at_first:
+					parser.release()
+					return self.failed(first, end, delta, region_start, edit_end, tokens, lexer, res.failure(stmt.error))
+				parser.reverse(stmt.advance_count)
+				parser.release()
+				break
+			parser.release()
+
+			at_first = False
+			length = tokens[parser.tok_idx - 1].end
+			new_chunks.append(Chunk(self.segment, length, stmt.node))
+
+			newline_count = 0
+			while parser.current_tok.type == TT_NEWLINE:
+				parser.advance()
+				newline_count += 1
+			if newline_count == 0:
+				break
+
+		if resync == len(self.chunks):
+			res = parser.expect_eof(res)
+			tokens.drain()
+			if res.error or lexer.error:
+				return self.failed(first, end, delta, region_start, edit_end, tokens, lexer, res)
+
+		for chunk in self.chunks[resync:]: ##statements after the edit keep their tokens and nodes, only the base moves
+			chunk.source.base += delta
+
+		self.reparsed = len(new_chunks)
+		self.chunks[first:resync] = new_chunks
+		self.dirty = None
+		return res.success(self.make_node())
+
+	def failed(self, first, end, delta, region_start, edit_end, tokens, lexer, res): ##keep what is still valid and remember the rest for next time
+		tokens.drain()
+		if lexer.error: ##lexing errors win over parse errors, the same as for a full parse
+			res.error = lexer.error
+		keep = bisect.bisect_left(self.chunks, end, key=lambda chunk: chunk.start)
+		for chunk in self.chunks[keep:]:
+			chunk.source.base += delta
+		self.chunks[first:keep] = []
+		self.dirty = (region_start, edit_end)
+		return res
+
+	def generate_tokens(self, lexer, start): ##tokens from start on, their offsets count from the current segment
+		for tok_type, value, tok_start, tok_end in lexer.scan(start):
+			tok = Token(tok_type, value)
+			tok.source = self.segment
+			tok.start = tok_start - self.segment.base
+			tok.end = tok_end - self.segment.base
+			yield tok
+
+	def rehome(self, tokens, idx): ##move tokens already read from the stream into the statement's new segment
+		for tok in tokens.buffer[idx - tokens.base:]:
+			tok_start = tok.source.base + tok.start
+			tok_end = tok.source.base + tok.end
+			tok.source = self.segment
+			tok.start = tok_start - self.segment.base
+			tok.end = tok_end - self.segment.base
+
+	def make_node(self):
+		return ListNode([chunk.node for chunk in self.chunks], Position(0, self.source), Position(len(self.text) + 1, self.source))
@@ -14,18 +14,104 @@ from rtresult import *
 from valuenode import *
 from context import *
 from symboltable import *
+from resolver import *
+from operators import *
+
+########################################################
+##	CALL SITE CACHE
+########################################################
+
+##a call of a name (f(x), PRINT(x)) remembers on its CallNode the function it found, the table it was found in and
+##that table's version (symboltable.py). the next call at that site whose name still resolves to the same table skips
+##the lookup and the two copies (VarAccessNode's and CallNode's) as long as the version has not moved. the cached
+##value is the copy the call made, spanning the call node, with the context it was made in; a call from another
+##frame gets one copy of it with its own context
+##only names with a fixed frame are cached: a LOCAL found in the frame the call runs in and a GLOBAL no other frame
+##may hold. call_sites counts what happened at every cached site, call_sites.report() gives the numbers
+
+class CallSiteCache:
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.hits = 0
+		self.misses = 0 ##nothing cached at the site, or it was made for another table
+		self.invalidations = 0 ##cached for this table but a function was stored in it since
+
+	def lookup(self, node, context): ##function to call for node, None when it has to be looked up
+		cache = node.cache
+		if cache is None:
+			self.misses += 1
+			return None
+		table, version, value = cache
+		callee = node.node_to_call
+		current = context.symbol_table
+		if callee.depth != LOCAL:
+			current = current.root
+			if callee.var_name_tok.value in current.shadowed: ##a frame may hold the name now
+				self.misses += 1
+				return None
+		if current is not table:
+			self.misses += 1
+			return None
+		if table.version != version:
+			self.invalidations += 1
+			node.cache = None
+			return None
+		self.hits += 1
+		if value.context is context:
+			return value
+		return value.copy().set_context(context)
+
+	def fill(self, node, value, context): ##value is what the call found and copied, kept when its frame is fixed
+		callee = node.node_to_call
+		if type(callee) is not VarAccessNode or not isinstance(value, BaseFunction):
+			return
+		table = context.symbol_table
+		if callee.depth == GLOBAL and callee.var_name_tok.value not in table.root.shadowed:
+			table = table.root
+		elif callee.depth != LOCAL or not isinstance(table.values[callee.slot], BaseFunction): ##LOCAL read from the chain
+			return
+		node.cache = (table, table.version, value)
+
+	def report(self):
+		looked_up = self.hits + self.misses + self.invalidations
+		return f'call sites: {self.hits} hits, {self.misses} misses, {self.invalidations} invalidations, {self.hits / looked_up if looked_up else 0:.1%} hit rate'
+
+call_sites = CallSiteCache()
+
 ########################################################
 ##	INTERPRETER
 ########################################################
 
+##visit finds the handler for a node in a table keyed by node class instead of building a method name for every node
+##the table holds plain functions so it is made once for the class, not again for each Interpreter a call creates
+##another node type gets evaluated by registering a handler for it:
+##	@Interpreter.register(MyNode)
+##	def visit_my_node(interpreter, node, context): ... return an RTResult
+##a subclass that overrides a visit_ method or registers a handler only changes its own table
+
 class Interpreter:
+	handlers = {} ##node class -> function(interpreter, node, context) returning an RTResult
+
+	def __init_subclass__(cls, **kwargs):
+		super().__init_subclass__(**kwargs)
+		cls.handlers = {node_class: cls.__dict__.get(f'visit_{node_class.__name__}', handler) for node_class, handler in cls.handlers.items()}
+
+	@classmethod
+	def register(cls, node_class, handler=None): ##can be used as a decorator, returns the handler
+		if handler is None:
+			return lambda handler: cls.register(node_class, handler)
+		if 'handlers' not in cls.__dict__:
+			cls.handlers = dict(cls.handlers)
+		cls.handlers[node_class] = handler
+		return handler
+
 	def visit(self, node, context):##for visiting each node ## we want a different visit for different node types
-		method_name = f'visit_{type(node).__name__}'
-		## the method_name will be different based on the type of node that we are visiting 
-		## visit_BinaryOpNode
-		## visit_NumberNode
-		method = getattr(self, method_name, self.no_visit_method) ##get the function names method_name
-		return method(node,context)
+		handler = self.handlers.get(type(node))
+		if handler is None: ##not registered, a visit_ method named after the class still works
+			return getattr(self, f'visit_{type(node).__name__}', self.no_visit_method)(node, context)
+		return handler(self, node, context)
 
 	def no_visit_method(self, node, context):
 		raise Exception(f'No visit_{type(node).__name__} method defined')
@@ -33,20 +119,29 @@ class Interpreter:
 	#######################################################################
 
 	def visit_StringNode(self, node, context):
-		return RTResult().success(String(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end))
+		return RTResult().success(String(node.tok.value).set_context(context).set_span(node))
 
 	def visit_NumberNode(self,node, context): ##visit number node 
-		return RTResult().success(Number(node.tok.value).set_context(context).set_pos(node.pos_start, node.pos_end))
+		return RTResult().success(Number(node.tok.value).set_context(context).set_span(node))
 
 	def visit_VarAccessNode(self,node, context):
 		res = RTResult()
 		var_name = node.var_name_tok.value
-		value = context.symbol_table.get(var_name)
+		table = context.symbol_table
+
+		if node.depth == LOCAL:
+			value = table.values[node.slot]
+			if value is None and table.parent: ##not set in this frame (yet), the chain decides
+				value = table.parent.get(var_name)
+		elif node.depth == GLOBAL and var_name not in table.root.shadowed:
+			value = table.root.values[node.slot]
+		else:
+			value = table.get(var_name)
 
 		if not value:
 			return res.failure(RTError(node.pos_start,node.pos_end, f'{var_name} is not defined', context))
 
-		value = value.copy().set_pos(node.pos_start,node.pos_end).set_context(context)
+		value = value.located(node, context)
 		return res.success(value)
 
 	def visit_VarAssignNode(self,node, context):
@@ -54,12 +149,21 @@ class Interpreter:
 		var_name = node.var_name_tok.value
 		value = res.register(self.visit(node.value_node, context))
 		if res.should_return():
-			return 
-		context.symbol_table.set(var_name,value)
+			return res
+		if node.depth == LOCAL:
+			context.symbol_table.store(node.slot, value)
+		else:
+			context.symbol_table.set(var_name,value)
 		return res.success(value)
 
 	def visit_ListNode(self, node, context):
 		res = RTResult()
+		if node.effect_only: ##a block nothing reads the value of, see ListNode.discard_values
+			for element_node in node.element_nodes:
+				res.register(self.visit(element_node, context))
+				if res.should_return():
+					return res
+			return res.success(Number.null)
 		elements = []
 
 		for element_node in node.element_nodes:
@@ -67,7 +171,7 @@ class Interpreter:
 		  if res.should_return():
 		   return res
 
-		return res.success(List(elements).set_context(context).set_pos(node.pos_start, node.pos_end))
+		return res.success(List(elements).set_context(context).set_span(node))
 
 	def visit_BinOpNode(self,node,context): #visit binary operation node 
 		res = RTResult()
@@ -78,37 +182,13 @@ class Interpreter:
 		if res.should_return():
 			return res
 
-		##Operations based on the below nodes
-		if node.op_tok.type == TT_PLUS:
-			result, error = left.added_to(right)
-		elif node.op_tok.type == TT_MINUS:
-			result, error = left.subbed_by(right)
-		elif node.op_tok.type == TT_MUL:
-			result, error = left.multed_by(right)
-		elif node.op_tok.type == TT_DIV:
-			result, error = left.dived_by(right)
-		elif node.op_tok.type == TT_POW:
-			result, error = left.powed_by(right)
-		elif node.op_tok.type == TT_EE:
-			result, error = left.get_comparison_eq(right)
-		elif node.op_tok.type == TT_NE:
-			result, error = left.get_comparison_ne(right)
-		elif node.op_tok.type == TT_LT:
-			result, error = left.get_comparison_lt(right)
-		elif node.op_tok.type == TT_GT:
-			result, error = left.get_comparison_gt(right)
-		elif node.op_tok.type == TT_LTE:
-			result, error = left.get_comparison_lte(right)
-		elif node.op_tok.type == TT_GTE:
-			result, error = left.get_comparison_gte(right)
-		elif node.op_tok.matches(TT_KEYWORD, 'AND'):
-			result, error = left.anded_by(right)
-		elif node.op_tok.matches(TT_KEYWORD, 'OR'):
-			result, error = left.ored_by(right)
+		##the operator's implementation for these two types, see operators.py
+		operations = node.operations or binary_operations(node)
+		result, error = operations[type(left), type(right)](left, right)
 
 		if error:
 			return res.failure(error)
-		return res.success(result.set_pos(node.pos_start, node.pos_end))
+		return res.success(result.set_span(node))
 
 	def visit_UnaryOpNode(self,node,context):
 		res = RTResult()
@@ -117,18 +197,13 @@ class Interpreter:
 		if res.should_return():
 			return res
 
-		error = None
-
-		if node.op_tok.type == TT_MINUS:
-			number, error = number.multed_by(Number(-1))
-
-		elif node.op_tok.matches(TT_KEYWORD, 'NOT'):
-			number, error = number.notted()
+		operations = node.operations or unary_operations(node)
+		number, error = operations[type(number)](number)
 
 		if res.should_return():
 			return res.failure(error)
 		else:
-			return res.success(number.set_pos(node.pos_start, node.pos_end))
+			return res.success(number.set_span(node))
 
 	def visit_IfNode(self, node, context):
 		res = RTResult()
@@ -166,17 +241,7 @@ class Interpreter:
 		else:
 			step_value = Number(1)
 
-		i = start_value.value
-
-		if step_value.value >= 0:
-			condition = lambda: i < end_value.value
-		else:
-			condition = lambda: i > end_value.value
-
-		while condition():
-			context.symbol_table.set(node.var_name_tok.value, Number(i))
-			i += step_value.value
-
+		for _ in for_loop(context.symbol_table, node.var_name_tok.value, start_value, end_value, step_value):
 			value = res.register(self.visit(node.body_node, context))
 			if res.should_return() and res.loop_should_continue == False and res.loop_should_break == False: return res
 
@@ -186,9 +251,10 @@ class Interpreter:
 			if res.loop_should_break:
 				break
 
-			elements.append(value)
+			if not node.should_return_null: ##the list is thrown away otherwise
+				elements.append(value)
 
-		return res.success(Number.null if node.should_return_null else List(elements).set_context(context).set_pos(node.pos_start, node.pos_end))
+		return res.success(Number.null if node.should_return_null else List(elements).set_context(context).set_span(node))
 
 	def visit_WhileNode(self, node, context):
 		res = RTResult()
@@ -211,7 +277,7 @@ class Interpreter:
 
 			elements.append(value)
 
-		return res.success(Number.null if node.should_return_null else List(elements).set_context(context).set_pos(node.pos_start, node.pos_end))
+		return res.success(Number.null if node.should_return_null else List(elements).set_context(context).set_span(node))
 
 	def visit_FuncDefNode(self, node, context):
 		res = RTResult()
@@ -224,7 +290,7 @@ class Interpreter:
 		body_node = node.body_node
 		arg_names = [arg_name.value for arg_name in node.arg_name_toks] ##go therought each argument name in the argument name token amd we just get the value of each argument name 
 
-		func_value = Function(func_name, body_node, arg_names, node.should_auto_return).set_context(context).set_pos(node.pos_start, node.pos_end)
+		func_value = Function(func_name, body_node, arg_names, node.should_auto_return, node.scope).set_context(context).set_span(node)
 		
 		if node.var_name_tok: ##if function has a name is to add it to the symbol table 
 			context.symbol_table.set(func_name, func_value)
@@ -235,22 +301,28 @@ class Interpreter:
 		res = RTResult()
 		args = []
 
-		value_to_call = res.register(self.visit(node.node_to_call, context))
-		if res.should_return(): 
-			return res
-	
-		value_to_call = value_to_call.copy().set_pos(node.pos_start, node.pos_end) ##create a copy of the value we're calling 
+		value_to_call = call_sites.lookup(node, context)
+		if value_to_call is None:
+			value_to_call = res.register(self.visit(node.node_to_call, context))
+			if res.should_return(): 
+				return res
+		
+			value_to_call = value_to_call.copy().set_span(node) ##create a copy of the value we're calling 
+			call_sites.fill(node, value_to_call, context)
 
 		for arg_node in node.arg_nodes:
 			args.append(res.register(self.visit(arg_node, context))) ##visit every arg_node and append it 
 			if res.should_return(): 
 				return res
 
+		if node.tail and type(value_to_call) is Function: ##the Function.execute running this body makes the call
+			return res.success(TailCall(value_to_call, args))
+
 		return_value = res.register(value_to_call.execute(args)) ##execute the arguments
 		if res.should_return(): 
 			return res
 
-		return_value = return_value.copy().set_pos(node.pos_start,node.pos_end).set_context(context)
+		return_value = return_value.located(node, context)
 		return res.success(return_value)
 
 	def visit_ReturnNode(self, node, context):
@@ -268,4 +340,199 @@ class Interpreter:
 		return RTResult().success_continue()
 
 	def visit_BreakNode(self, node, context):
-		return RTResult().success_break()
\ No newline at end of file
+		return RTResult().success_break()
+
+for node_class in (NumberNode, StringNode, BinOpNode, UnaryOpNode, VarAccessNode, VarAssignNode, ListNode, IfNode,
+	ForNode, WhileNode, FuncDefNode, CallNode, ReturnNode, ContinueNode, BreakNode):
+	Interpreter.register(node_class, getattr(Interpreter, f'visit_{node_class.__name__}'))
+
+Function.interpreter = Interpreter() ##keeps no state between visits, every Function.execute uses this one
+
+def run_tree(node, context): ##walks the tree with the Interpreter, a program nested deeper than Python's stack fails
+	try:
+		return Interpreter().visit(node, context)
+	except RecursionError: ##outside any function, calls catch their own
+		return RTResult().failure(recursion_error(node, context))
+
+########################################################
+##	SIGNAL INTERPRETER
+########################################################
+
+##walks the same nodes, but a visit gives back the node's Value itself instead of an RTResult around it
+##errors, RETURN, BREAK and CONTINUE are raised as the signals in rtresult.py and only caught where they end:
+##a function call for RETURN, the loop around the body for BREAK and CONTINUE, run_signals for anything left over
+##so a node that runs without one of them makes no result object and checks no flags
+##handlers registered on SignalInterpreter return a Value and raise signals, the way these visit methods do
+
+class SignalInterpreter(Interpreter):
+	def visit_StringNode(self, node, context):
+		return String(node.tok.value).set_context(context).set_span(node)
+
+	def visit_NumberNode(self, node, context):
+		return Number(node.tok.value).set_context(context).set_span(node)
+
+	def visit_VarAccessNode(self, node, context):
+		var_name = node.var_name_tok.value
+		table = context.symbol_table
+
+		if node.depth == LOCAL:
+			value = table.values[node.slot]
+			if value is None and table.parent: ##not set in this frame (yet), the chain decides
+				value = table.parent.get(var_name)
+		elif node.depth == GLOBAL and var_name not in table.root.shadowed:
+			value = table.root.values[node.slot]
+		else:
+			value = table.get(var_name)
+
+		if not value:
+			raise RTFailure(RTError(node.pos_start, node.pos_end, f'{var_name} is not defined', context))
+		return value.located(node, context)
+
+	def visit_VarAssignNode(self, node, context):
+		value = self.visit(node.value_node, context)
+		if node.depth == LOCAL:
+			context.symbol_table.store(node.slot, value)
+		else:
+			context.symbol_table.set(node.var_name_tok.value, value)
+		return value
+
+	def visit_ListNode(self, node, context):
+		if node.effect_only:
+			for element_node in node.element_nodes:
+				self.visit(element_node, context)
+			return Number.null
+		return List([self.visit(element_node, context) for element_node in node.element_nodes]).set_context(context).set_span(node)
+
+	def visit_BinOpNode(self, node, context):
+		left = self.visit(node.left_node, context)
+		right = self.visit(node.right_node, context)
+		operations = node.operations or binary_operations(node)
+		result, error = operations[type(left), type(right)](left, right)
+		if error:
+			raise RTFailure(error)
+		return result.set_span(node)
+
+	def visit_UnaryOpNode(self, node, context):
+		number = self.visit(node.node, context)
+		operations = node.operations or unary_operations(node)
+		number, error = operations[type(number)](number) ##the Interpreter does not check error either
+		return number.set_span(node)
+
+	def visit_IfNode(self, node, context):
+		for condition, expr, should_return_null in node.cases:
+			if self.visit(condition, context).is_true():
+				expr_value = self.visit(expr, context)
+				return Number.null if should_return_null else expr_value
+
+		if node.else_case:
+			expr, should_return_null = node.else_case
+			expr_value = self.visit(expr, context)
+			return Number.null if should_return_null else expr_value
+
+		return Number.null
+
+	def visit_ForNode(self, node, context):
+		elements = []
+		start_value = self.visit(node.start_value_node, context)
+		end_value = self.visit(node.end_value_node, context)
+		step_value = self.visit(node.step_value_node, context) if node.step_value_node else Number(1)
+
+		for _ in for_loop(context.symbol_table, node.var_name_tok.value, start_value, end_value, step_value):
+			try:
+				value = self.visit(node.body_node, context)
+			except ContinueLoop:
+				continue
+			except BreakLoop:
+				break
+			if not node.should_return_null:
+				elements.append(value)
+
+		return Number.null if node.should_return_null else List(elements).set_context(context).set_span(node)
+
+	def visit_WhileNode(self, node, context):
+		elements = []
+		while self.visit(node.condition_node, context).is_true(): ##a BREAK in the condition is for the loop around this one
+			try:
+				value = self.visit(node.body_node, context)
+			except ContinueLoop:
+				continue
+			except BreakLoop:
+				break
+			elements.append(value)
+
+		return Number.null if node.should_return_null else List(elements).set_context(context).set_span(node)
+
+	def visit_FuncDefNode(self, node, context):
+		func_name = node.var_name_tok.value if node.var_name_tok else None
+		arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+		func_value = SignalFunction(func_name, node.body_node, arg_names, node.should_auto_return, node.scope).set_context(context).set_span(node)
+		if func_name:
+			context.symbol_table.set(func_name, func_value)
+		return func_value
+
+	def visit_CallNode(self, node, context):
+		value_to_call = call_sites.lookup(node, context)
+		if value_to_call is None:
+			value_to_call = self.visit(node.node_to_call, context).copy().set_span(node)
+			call_sites.fill(node, value_to_call, context)
+		args = [self.visit(arg_node, context) for arg_node in node.arg_nodes]
+		if node.tail and type(value_to_call) is SignalFunction: ##SignalFunction.call makes it
+			return TailCall(value_to_call, args)
+		if type(value_to_call) is SignalFunction:
+			return_value = value_to_call.call(args)
+		elif type(value_to_call) is BuiltInFunction:
+			return_value = value_to_call.call(args)
+		else: ##functions the Interpreter made, values that can not be called
+			return_value = raise_signal(value_to_call.execute(args))
+		return return_value.located(node, context)
+
+	def visit_ReturnNode(self, node, context):
+		raise ReturnValue(self.visit(node.node_to_return, context) if node.node_to_return else Number.null)
+
+	def visit_ContinueNode(self, node, context):
+		raise ContinueLoop()
+
+	def visit_BreakNode(self, node, context):
+		raise BreakLoop()
+
+class SignalFunction(Function): ##a function whose body the SignalInterpreter runs
+	__slots__ = ()
+	interpreter = SignalInterpreter() ##keeps no state between visits, one is enough
+
+	def call(self, args): ##Function.execute giving the Value, signals other than RETURN go on to the caller
+		function = self
+		while True:
+			exec_ctx, error = frame_pool.enter(function, args)
+			if error:
+				raise RTFailure(error)
+			try:
+				value = self.interpreter.visit(function.body_node, exec_ctx)
+				value = value if function.should_auto_return else Number.null
+			except ReturnValue as ret:
+				value = ret.value
+			except RecursionError: ##a call that does not fit on Python's stack fails where it was made
+				raise RTFailure(recursion_error(function, function.context)) from None
+			if type(value) is not TailCall:
+				frame_pool.leave(exec_ctx, value)
+				return value
+			function, args = frame_pool.tail(exec_ctx, value.function, value.args) or value.function, value.args ##a frame that stays is left to the garbage collector
+
+	def execute(self, args): ##for the Interpreter and anything else that expects an RTResult
+		try:
+			return RTResult().success(self.call(args))
+		except (RTFailure, BreakLoop, ContinueLoop) as signal:
+			return RTResult().from_signal(signal)
+
+	def copy(self):
+		copy = SignalFunction(self.name, self.body_node, self.arg_names, self.should_auto_return, self.scope)
+		copy.set_context(self.context)
+		copy.set_span(self.span)
+		return copy
+
+def run_signals(node, context): ##runs the tree on the SignalInterpreter, gives the RTResult Interpreter.visit would
+	try:
+		return RTResult().success(SignalInterpreter().visit(node, context))
+	except (RTFailure, ReturnValue, BreakLoop, ContinueLoop) as signal:
+		return RTResult().from_signal(signal)
+	except RecursionError: ##nested deeper than Python's stack outside any function
+		return RTResult().failure(recursion_error(node, context))
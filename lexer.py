@@ -1,7 +1,10 @@
 from strings_with_arrows import *
 import string
 import os
+import sys
 import math
+import re
+from array import array
 import constants
 from error import *
 from position import *
@@ -42,29 +45,59 @@ TT_ARROW = 'ARROW'
 TT_STRING = 'STRING'
 TT_NEWLINE		= 'NEWLINE'
 
-KEYWORDS = ['VAR', 'OR','AND','NOT','IF','THEN','ELIF','ELSE', 'FOR', 'TO','STEP','FUN','WHILE','RETURN','CONTINUE','BREAK'] ##reserved keywords for language
+##integer kind code of every token type, the code of a type is its index here
+TOKEN_KINDS = (TT_INT, TT_FLOAT, TT_PLUS, TT_MINUS, TT_MUL, TT_POW, TT_DIV, TT_LPAREN, TT_RPAREN, TT_EOF, TT_IDENTIFIER, TT_LSQUARE, TT_RSQUARE,
+	TT_EQ, TT_KEYWORD, TT_EE, TT_NE, TT_LT, TT_GT, TT_LTE, TT_GTE, TT_COMMA, TT_ARROW, TT_STRING, TT_NEWLINE)
+KIND_CODES = {tok_type: code for code, tok_type in enumerate(TOKEN_KINDS)}
+
+KEYWORDS = ['VAR', 'OR','AND','NOT','IF','THEN','ELIF','ELSE', 'FOR', 'TO','STEP','FUN','WHILE','RETURN','CONTINUE','BREAK','END'] ##reserved keywords for language
+KEYWORD_SET = frozenset(KEYWORDS) ##for checking identifiers without searching the list
+
+ESCAPE_CHARACTERS = { 'n': '\n','t': '\t'}##escapecharacter dictionary
 
 class Token:
+	__slots__ = ('type', 'value', 'start', 'end', 'source')
+
 	def __init__(self, type_, value = None, pos_start = None, pos_end = None):
 		self.type = type_
 		self.value = value
+		self.start = None ##offset of the first character in source
+		self.end = None ##offset just after the last character
+		self.source = None ##SourceFile shared by every token of the file
 
 		if pos_start:
-			self.pos_start = pos_start.copy()
-			self.pos_end = pos_start.copy()
-			self.pos_end.advance()
+			self.source = pos_start.source
+			self.start = pos_start.offset
+			self.end = pos_start.offset + 1
 
 		if pos_end:
-			self.pos_end = pos_end.copy()
+			self.end = pos_end.offset
+
+	@property
+	def pos_start(self): ##positions are only made when something asks for them
+		if self.source is None:
+			return None
+		return Position(self.start, self.source)
+
+	@property
+	def pos_end(self):
+		if self.source is None:
+			return None
+		return Position(self.end, self.source)
 
 	def matches(self,type_,value):
 		return self.type == type_ and self.value == value
 
+	def hold(self): ##the token a node can keep, see TokenCursor.hold
+		return self
+
 	def __repr__(self): #Returns the Token 
 		if self.value:
 			return f'{self.type}:{self.value}'
 		return f'{self.type}'
 
+new_token = object.__new__ ##new_token(Token) is a Token with no slot set, for code that sets every slot itself
+
 
 ########################################################
 ##	LEXER
@@ -75,7 +108,8 @@ class Lexer:
 	def __init__(self, fn, text):
 		self.fn = fn
 		self.text = text
-		self.pos = Position(-1, 0, -1,fn,text) ##Current Position its -1 and column  as the advance method will immediately increment it 
+		self.source = SourceFile(fn, text)
+		self.pos = Position(-1, self.source) ##Current Position its -1 as the advance method will immediately increment it 
 		self.current_char = None ##Current Character
 		self.advance()
 
@@ -87,73 +121,88 @@ class Lexer:
 			self.current_char = None
 
 	def make_tokens(self):
-		tokens = [] ##empty list of tokens to be returned 
+		tokens = list(self.generate_tokens()) ##list of tokens to be returned
+		if self.error:
+			return [],self.error
+		return tokens,None
+
+	def make_token_buffer(self):
+		buffer = TokenBuffer(self.source)
+		for tok in self.generate_tokens():
+			buffer.append(tok.type, tok.value, tok.start, tok.end)
+		if self.error:
+			return None,self.error
+		return buffer,None
+
+	def generate_tokens(self): ##yields the tokens one at a time so a parser can pull them on demand
+		self.error = None
 
 		while self.current_char != None:
 			if self.current_char in ' \t':#if the character is a space or a tab advance we ignore 
 				self.advance()
-			if self.current_char in '#': #its a comment so we ignore
-				self.advance()
+			elif self.current_char == '#': #its a comment so we ignore the rest of the line
+				self.skip_comment()
 			elif self.current_char in ';\n': ##new line character
-				tokens.append(Token(TT_NEWLINE, pos_start=self.pos))
+				yield Token(TT_NEWLINE, pos_start=self.pos)
 				self.advance()
 			elif self.current_char in constants.DIGITS:
-				tokens.append(self.make_number()) ##since a number token can have more than one digit we call the make_number function
+				yield self.make_number() ##since a number token can have more than one digit we call the make_number function
 			elif self.current_char in constants.LETTERS: ##for letters
-				tokens.append(self.make_identifier())##create the variables
+				yield self.make_identifier()##create the variables
 			elif self.current_char == '+':
-				tokens.append(Token(TT_PLUS, pos_start = self.pos))
+				yield Token(TT_PLUS, pos_start = self.pos)
 				self.advance()
 			elif self.current_char == '"':
-				tokens.append(self.make_string())
+				yield self.make_string()
 			elif self.current_char == '-': ##minus and arrow token 
-				tokens.append(self.make_minus_or_arrow())
+				yield self.make_minus_or_arrow()
 			elif self.current_char == '*':
-				tokens.append(Token(TT_MUL, pos_start = self.pos))
+				yield Token(TT_MUL, pos_start = self.pos)
 				self.advance()
 			elif self.current_char == '/':
-				tokens.append(Token(TT_DIV, pos_start = self.pos))
+				yield Token(TT_DIV, pos_start = self.pos)
 				self.advance()
 			elif self.current_char == '=':
-				tokens.append(self.make_equals()) ##makes = character if there is 1 equal character and == if two equal characters
+				yield self.make_equals() ##makes = character if there is 1 equal character and == if two equal characters
 			elif self.current_char == '<':
-				tokens.append(self.make_less_than()) ##makes > character if there is 1 less than character and <= if the next character is like that 
+				yield self.make_less_than() ##makes > character if there is 1 less than character and <= if the next character is like that 
 			elif self.current_char == '>':
-				tokens.append(self.make_greater_than()) ##makes < character if there is 1 equal character and >= if the next characters is like that
+				yield self.make_greater_than() ##makes < character if there is 1 equal character and >= if the next characters is like that
 			elif self.current_char == '^':
-				tokens.append(Token(TT_POW, pos_start = self.pos))
+				yield Token(TT_POW, pos_start = self.pos)
 				self.advance()
 			elif self.current_char == '!':
 				tok,error = self.make_not_equals()##check if the next token after this is a = for != else it will return a not equals token
 				if error:
-					return [],error
-				tokens.append(tok)
-				self.advance()
+					self.error = error
+					yield Token(TT_EOF, pos_start = error.pos_start) ##so whoever is pulling tokens still sees the end of the input
+					return
+				yield tok
 			elif self.current_char == '(':
-				tokens.append(Token(TT_LPAREN, pos_start = self.pos))
+				yield Token(TT_LPAREN, pos_start = self.pos)
 				self.advance()
 			elif self.current_char == ')':
-				tokens.append(Token(TT_RPAREN, pos_start = self.pos))
+				yield Token(TT_RPAREN, pos_start = self.pos)
 				self.advance()
 			elif self.current_char == '[':
-				tokens.append(Token(TT_LSQUARE, pos_start=self.pos))
+				yield Token(TT_LSQUARE, pos_start=self.pos)
 				self.advance()
 			elif self.current_char == ']':
-				tokens.append(Token(TT_RSQUARE, pos_start=self.pos))
+				yield Token(TT_RSQUARE, pos_start=self.pos)
 				self.advance()
 			elif self.current_char == ',':
-				tokens.append(Token(TT_COMMA, pos_start = self.pos))
+				yield Token(TT_COMMA, pos_start = self.pos)
 				self.advance()
 			else:
 				##return error because Illegal character
 				pos_start = self.pos.copy()
 				char = self.current_char
 				self.advance()
-				return [],IllegalCharError(pos_start,self.pos,"'" + char + "'")		
-
-		tokens.append(Token(TT_EOF, pos_start = self.pos))		
+				self.error = IllegalCharError(pos_start,self.pos,"'" + char + "'")
+				yield Token(TT_EOF, pos_start = pos_start) ##so whoever is pulling tokens still sees the end of the input
+				return
 
-		return tokens,None
+		yield Token(TT_EOF, pos_start = self.pos)
 	
 	def make_identifier(self):
 		id_str = '' ##the string of numbers containing variable name
@@ -163,7 +212,7 @@ class Lexer:
 			id_str += self.current_char
 			self.advance()
 
-		if id_str in KEYWORDS:	##check if it is a keyword or a identifier
+		if id_str in KEYWORD_SET:	##check if it is a keyword or a identifier
 			tok_type = TT_KEYWORD
 		else:
 			tok_type = TT_IDENTIFIER
@@ -180,7 +229,7 @@ class Lexer:
 			self.advance()
 			tok_type = TT_ARROW
 
-		return Token(tok_type,pos_start,pos_end = self.pos)
+		return Token(tok_type,pos_start = pos_start,pos_end = self.pos)
 
 	def make_string(self):
 		string = ''
@@ -188,11 +237,9 @@ class Lexer:
 		escape_character = False
 		self.advance()
 
-		escape_characters = { 'n': '\n','t': '\t'}##escapecharacter dictionary
-
 		while self.current_char != None and (self.current_char != '"' or escape_character):
 			if escape_character:##if we get an escape charater
-				string += escape_characters.get(self.current_char, self.current_char) ##we'll add the escape character
+				string += ESCAPE_CHARACTERS.get(self.current_char, self.current_char) ##we'll add the escape character
 				escape_character = False
 			else:
 				if self.current_char == '\\':
@@ -229,9 +276,9 @@ class Lexer:
 		pos_start = self.pos.copy()
 		self.advance()
 
-		if self.current_char.tok_type == '=':
+		if self.current_char == '=':
 			self.advance()
-			return Token(TT_NE, pos_start,pos_end = self.pos), None
+			return Token(TT_NE, pos_start = pos_start,pos_end = self.pos), None
 
 		self.advance()
 		return None, ExpectedCharError(pos_start,self.pos,"Expected character '=' after ! ")
@@ -273,7 +320,257 @@ class Lexer:
 	def skip_comment(self):
 		self.advance()
 
-		while self.current_char != '\n':
+		while self.current_char != None and self.current_char != '\n': ##the new line is kept so the statement still ends there
 			self.advance()
 
-		self.advance()
+
+########################################################
+##	REGEX LEXER
+########################################################
+
+##single pass lexer driven by one compiled master regex, every match is one lexeme and the name of the group that matched decides the token
+##it produces the same tokens, values and error positions as Lexer but never walks the text one character at a time
+
+TOKEN_REGEX = re.compile(r'''
+	(?P<SKIP>[ \t]+|\#[^\n]*)
+	|(?P<NEWLINE>[;\n])
+	|(?P<NUMBER>[0-9]+(?:\.[0-9]*)?)
+	|(?P<IDENTIFIER>[A-Za-z][A-Za-z0-9_]*)
+	|(?P<STRING>"(?P<BODY>(?:[^"\\]|\\.)*)\\?(?P<CLOSE>"?))
+	|(?P<OPERATOR>->|==|!=|<=|>=|[-+*/^()\[\],=<>])
+	|(?P<BANG>!)
+''', re.VERBOSE | re.DOTALL)
+
+ESCAPE_REGEX = re.compile(r'\\(.)', re.DOTALL)
+
+OPERATOR_TYPES = {
+	'+': TT_PLUS, '-': TT_MINUS, '*': TT_MUL, '/': TT_DIV, '^': TT_POW,
+	'(': TT_LPAREN, ')': TT_RPAREN, '[': TT_LSQUARE, ']': TT_RSQUARE, ',': TT_COMMA,
+	'=': TT_EQ, '<': TT_LT, '>': TT_GT,
+	'->': TT_ARROW, '==': TT_EE, '!=': TT_NE, '<=': TT_LTE, '>=': TT_GTE,
+}
+
+class RegexLexer:
+	def __init__(self, fn, text):
+		self.fn = fn
+		self.text = text
+		self.source = SourceFile(fn, text)
+
+	def make_tokens(self):
+		tokens = list(self.generate_tokens())
+		if self.error:
+			return [], self.error
+		return tokens, None
+
+	def make_token_buffer(self):
+		buffer = TokenBuffer(self.source)
+		append = buffer.append
+		for tok_type, value, start, end in self.scan():
+			append(tok_type, value, start, end)
+		if self.error:
+			return None, self.error
+		return buffer, None
+
+	def generate_tokens(self): ##yields the tokens one at a time so a parser can pull them on demand
+		source = self.source
+		for tok_type, value, start, end in self.scan():
+			tok = Token(tok_type, value)
+			tok.start = start
+			tok.end = end
+			tok.source = source
+			yield tok
+
+	def scan(self, idx=0): ##yields (type, value, start, end) for every lexeme from idx on, both token forms are built from this
+		self.error = None
+		text = self.text
+		match = TOKEN_REGEX.match
+
+		while idx < len(text):
+			m = match(text, idx)
+
+			if m is None: ##no group matched so it is an illegal character
+				self.error = IllegalCharError(Position(idx, self.source), Position(idx + 1, self.source), "'" + text[idx] + "'")
+				yield TT_EOF, None, idx, idx + 1 ##so whoever is pulling tokens still sees the end of the input
+				return
+
+			kind = m.lastgroup
+			end = m.end()
+
+			if kind == 'SKIP':
+				pass
+			elif kind == 'NEWLINE':
+				yield TT_NEWLINE, None, idx, end
+			elif kind == 'IDENTIFIER':
+				id_str = m.group()
+				yield (TT_KEYWORD if id_str in KEYWORD_SET else TT_IDENTIFIER), id_str, idx, end
+			elif kind == 'NUMBER':
+				num_str = m.group()
+				if '.' in num_str:
+					yield TT_FLOAT, float(num_str), idx, end
+				else:
+					yield TT_INT, int(num_str), idx, end
+			elif kind == 'OPERATOR':
+				yield OPERATOR_TYPES[m.group()], None, idx, end
+			elif kind == 'STRING':
+				string = ESCAPE_REGEX.sub(lambda e: ESCAPE_CHARACTERS.get(e.group(1), e.group(1)), m.group('BODY'))
+				if not m.group('CLOSE'):
+					end += 1 ##Lexer steps once past the end of the text when the string is never closed
+				yield TT_STRING, string, idx, end
+			else: ##'!' that is not followed by '='
+				self.error = ExpectedCharError(Position(idx, self.source), Position(idx + 2, self.source), "Expected character '=' after ! ")
+				yield TT_EOF, None, idx, idx + 1 ##so whoever is pulling tokens still sees the end of the input
+				return
+
+			idx = end
+
+		yield TT_EOF, None, idx, idx + 1
+
+
+########################################################
+##	TOKEN STREAM
+########################################################
+
+##feeds the Parser tokens pulled from a lexer generator instead of a finished list
+##only a bounded window of tokens is kept, plus whatever lies after the oldest mark the parser may still reverse to
+
+class TokenStream:
+	def __init__(self, tokens, window=64):
+		self.tokens = iter(tokens) ##token generator
+		self.buffer = [] ##tokens that are still reachable
+		self.base = 0 ##index of buffer[0] in the whole token sequence
+		self.window = window ##how many tokens are kept behind the furthest one read
+		self.marks = [] ##stack of indexes the parser may reverse back to
+		self.peak = 0 ##largest the buffer has been, for measuring
+
+	def __getitem__(self, idx):
+		offset = idx - self.base
+		if offset < 0:
+			raise Exception(f'Token {idx} has already been dropped from the stream')
+
+		while offset >= len(self.buffer):
+			tok = next(self.tokens, None)
+			if tok is None:
+				raise IndexError(idx) ##past the end of the tokens, just like a list
+			self.buffer.append(tok)
+			if len(self.buffer) > self.peak:
+				self.peak = len(self.buffer)
+
+		tok = self.buffer[offset]
+		self.trim(idx)
+		return tok
+
+	def trim(self, idx): ##drop the tokens nothing can reach anymore, in batches so it stays cheap
+		keep_from = idx - self.window
+		if self.marks and self.marks[0] < keep_from:
+			keep_from = self.marks[0]
+		if keep_from - self.base > self.window:
+			del self.buffer[:keep_from - self.base]
+			self.base = keep_from
+
+	def mark(self, idx):
+		self.marks.append(idx)
+
+	def release(self):
+		self.marks.pop()
+
+	def drain(self): ##run the rest of the lexer without keeping the tokens, so errors further on still come out
+		for tok in self.tokens:
+			pass
+
+
+
+########################################################
+##	TOKEN BUFFER
+########################################################
+
+##packed struct of arrays form of a token list, no Token object is made per lexeme
+##kinds, starts, ends and value references sit in flat arrays, values live once in a side table
+##so every identifier or keyword with the same name shares one string
+
+class TokenBuffer:
+	def __init__(self, source):
+		self.source = source
+		self.kinds = array('B') ##kind code of each token, see TOKEN_KINDS
+		self.starts = array('I') ##start offset of each token
+		self.ends = array('I') ##end offset of each token
+		self.value_refs = array('I') ##index into value_table, 0 means no value
+		self.value_table = [None] ##every distinct value once
+		self.value_ids = {} ##(type, value) -> index in value_table, the type keeps 1 and 1.0 apart
+
+	def append(self, tok_type, value, start, end):
+		self.kinds.append(KIND_CODES[tok_type])
+		self.starts.append(start)
+		self.ends.append(end)
+
+		if value is None:
+			self.value_refs.append(0)
+			return
+
+		key = (tok_type, value)
+		ref = self.value_ids.get(key)
+		if ref is None:
+			ref = len(self.value_table)
+			self.value_ids[key] = ref
+			self.value_table.append(sys.intern(value) if tok_type in (TT_IDENTIFIER, TT_KEYWORD) else value)
+		self.value_refs.append(ref)
+
+	def __len__(self):
+		return len(self.kinds)
+
+	def __getitem__(self, idx): ##a full Token, only made when something asks for one
+		if idx < 0 or idx >= len(self.kinds):
+			raise IndexError(idx)
+		return self.token(idx)
+
+	def token(self, idx):
+		tok = new_token(Token) ##every slot is set here, Token.__init__ would only set them twice
+		tok.type = TOKEN_KINDS[self.kinds[idx]]
+		tok.value = self.value_table[self.value_refs[idx]]
+		tok.start = self.starts[idx]
+		tok.end = self.ends[idx]
+		tok.source = self.source
+		return tok
+
+
+##stands in for current_tok while a Parser reads a TokenBuffer, moving it just rereads the arrays
+##nodes must not keep the cursor itself since it moves on with the parser, they keep hold() instead
+
+class TokenCursor:
+	__slots__ = ('buffer', 'kinds', 'value_refs', 'value_table', 'idx', 'type', 'value')
+
+	def __init__(self, buffer):
+		self.buffer = buffer
+		self.kinds = buffer.kinds
+		self.value_refs = buffer.value_refs
+		self.value_table = buffer.value_table
+		self.move(0)
+
+	def move(self, idx):
+		self.idx = idx
+		self.type = TOKEN_KINDS[self.kinds[idx]]
+		self.value = self.value_table[self.value_refs[idx]]
+
+	def matches(self,type_,value):
+		return self.type == type_ and self.value == value
+
+	def hold(self): ##a real Token for the current index, made from what the cursor already read
+		buffer = self.buffer
+		idx = self.idx
+		tok = new_token(Token)
+		tok.type = self.type
+		tok.value = self.value
+		tok.start = buffer.starts[idx]
+		tok.end = buffer.ends[idx]
+		tok.source = buffer.source
+		return tok
+
+	@property
+	def pos_start(self):
+		return Position(self.buffer.starts[self.idx], self.buffer.source)
+
+	@property
+	def pos_end(self):
+		return Position(self.buffer.ends[self.idx], self.buffer.source)
+
+	def __repr__(self):
+		return repr(self.hold())
@@ -7,81 +7,130 @@ import os
 import math
 import constants
 from error import *
+from position import *
 
 
 ########################################################
 ##	NODES
 ########################################################
 
-class NumberNode:
+##nodes keep integer offsets into the source their tokens came from instead of two Position objects each,
+##every position inside one node points into the same source so it is only stored once
+
+class Node:
+	__slots__ = ('source', 'start', 'end')
+
+	@property
+	def pos_start(self): ##positions are only made when something asks for them
+		return Position(self.start, self.source)
+
+	@property
+	def pos_end(self):
+		return Position(self.end, self.source)
+
+	def set_span(self, start, end): ##start and end are anything with source/start/end (a token or a node)
+		self.source = start.source
+		self.start = start.start
+		self.end = end.end
+
+	def set_positions(self, pos_start, pos_end): ##from Position objects
+		self.source = pos_start.source
+		self.start = pos_start.offset
+		self.end = pos_end.offset
+
+class NumberNode(Node):
+	__slots__ = ('tok',)
+
 	def __init__(self, tok): ##number node takes in the corresponding number token 
 		self.tok = tok
-		self.pos_start = tok.pos_start
-		self.pos_end = tok.pos_end
+		self.set_span(tok, tok)
 
 	def __repr__(self):
 		return f'{self.tok}'
 
-class StringNode:
+class StringNode(Node):
+	__slots__ = ('tok',)
+
 	def __init__(self, tok): ##number node takes in the corresponding number token 
 		self.tok = tok
-		self.pos_start = tok.pos_start
-		self.pos_end = tok.pos_end
+		self.set_span(tok, tok)
 
 	def __repr__(self):
 		return f'{self.tok}'
 
-class BinOpNode: ##Node for binary operations
+class BinOpNode(Node): ##Node for binary operations
+	__slots__ = ('left_node', 'op_tok', 'right_node', 'operations')
+
 	def __init__(self, left_node,op_tok,right_node):
 		self.left_node = left_node
 		self.right_node = right_node
 		self.op_tok = op_tok
+		self.operations = None ##table of the operator, set the first time the node runs, see operators.py
 
-		self.pos_start = left_node.pos_start
-		self.pos_end = right_node.pos_end
+		self.set_span(left_node, right_node)
 
 	def __repr__(self):
 		return f'({self.left_node},{self.op_tok},{self.right_node})'
 
-class UnaryOpNode:
+class UnaryOpNode(Node):
+	__slots__ = ('op_tok', 'node', 'operations')
+
 	def __init__(self,op_tok, node):
 		self.op_tok = op_tok
 		self.node = node
+		self.operations = None
 
-		self.pos_start = op_tok.pos_start
-		self.pos_end = node.pos_end
+		self.set_span(op_tok, node)
 
 	def __repr__(self):
 		return f'({self.op_tok}, {self.node})'
 
-class VarAccessNode:
+class VarAccessNode(Node):
+	__slots__ = ('var_name_tok', 'depth', 'slot')
+
 	def __init__(self,var_name_tok):
 		self.var_name_tok = var_name_tok
-		self.pos_start = self.var_name_tok.pos_start 
-		self.pos_end = self.var_name_tok.pos_end
+		self.depth = None ##where the Resolver found the variable, see resolver.py, None looks it up by name
+		self.slot = None
+		self.set_span(var_name_tok, var_name_tok)
+
+class VarAssignNode(Node):
+	__slots__ = ('var_name_tok', 'value_node', 'depth', 'slot')
 
-class VarAssignNode:
 	def __init__(self, var_name_tok, value_node):
 		self.var_name_tok = var_name_tok
 		self.value_node = value_node
-		self.pos_start = self.var_name_tok.pos_start
-		self.pos_end = self.var_name_tok.pos_end
+		self.depth = None
+		self.slot = None
+		self.set_span(var_name_tok, var_name_tok)
+
+class ListNode(Node):
+  __slots__ = ('element_nodes', 'effect_only')
 
-class ListNode:
   def __init__(self, element_nodes, pos_start, pos_end):
     self.element_nodes = element_nodes
-    self.pos_start = pos_start
-    self.pos_end = pos_end
+    self.effect_only = False ##a block whose statements only run for what they do, see discard_values
+    self.set_positions(pos_start, pos_end)
+
+  def discard_values(self): ##nothing reads this block's value: its statements run without a List of their results
+    self.effect_only = True
+    for statement in self.element_nodes: ##a loop statement's List would only be thrown away with the rest
+      if isinstance(statement, (ForNode, WhileNode)):
+        statement.should_return_null = True
+    return self
+
+class IfNode(Node):
+	__slots__ = ('cases', 'else_case')
 
-class IfNode:
 	def __init__(self, cases, else_case):
 		self.cases = cases
 		self.else_case = else_case
 
-		self.pos_start = self.cases[0][0].pos_start##position of the first case
-		self.pos_end = (self.else_case or self.cases[len(self.cases) - 1])[0].pos_end ##position of the else casae if it exists
+		self.set_span(self.cases[0][0], (self.else_case or self.cases[len(self.cases) - 1])[0]) ##from the first case to the else case if it exists
+
+class ForNode(Node):
+	__slots__ = ('var_name_tok', 'start_value_node', 'end_value_node', 'step_value_node', 'body_node', 'should_return_null')
 
-class ForNode:
 	def __init__(self, var_name_tok, start_value_node, end_value_node, step_value_node, body_node, should_return_null):
 		self.var_name_tok = var_name_tok ##name of the variable in the for statement 
 		self.start_value_node = start_value_node ##value the loop will start off at 
@@ -89,56 +138,63 @@ class ForNode:
 		self.step_value_node = step_value_node ##value of the increments , one is provided 
 		self.body_node = body_node ##this is what evaulated on every iteration 
 		self.should_return_null = should_return_null
-		self.pos_start = self.var_name_tok.pos_start
-		self.pos_end = self.var_name_tok.pos_end
+		self.set_span(var_name_tok, var_name_tok)
+
+class WhileNode(Node):
+	__slots__ = ('condition_node', 'body_node', 'should_return_null')
 
-class WhileNode:
 	def __init__(self, condition_node, body_node, should_return_null):
 		self.condition_node = condition_node ##condition that is to be evaluated 
 		self.body_node = body_node ##this is what evaulated on every iteration 
-		self.pos_start = self.condition_node.pos_start
-		self.pos_end = self.condition_node.pos_end
+		self.set_span(condition_node, condition_node)
 		self.should_return_null = should_return_null
 
-class FuncDefNode:
+class FuncDefNode(Node):
+	__slots__ = ('var_name_tok', 'arg_name_toks', 'body_node', 'should_auto_return', 'scope')
+
 	def __init__(self, var_name_tok, arg_name_toks, body_node,should_auto_return):
 		self.var_name_tok = var_name_tok ##name of the function. None if the function is anonymous
 		self.arg_name_toks = arg_name_toks ##name of the argumenets for a function 
 		self.body_node = body_node ##body tht is to evaulated when the function is called 
 		self.should_auto_return = should_auto_return ##if there isnt a return statemetn 
+		self.scope = None ##Scope of the function's frames once resolved
 
 		if self.var_name_tok:##if function isnit anonoymous
-			self.pos_start = self.var_name_tok.pos_start
+			self.set_span(self.var_name_tok, self.body_node)
 		elif len(self.arg_name_toks) > 0: ##if there are arguemts set pos start to the first arguments postition 
-			self.pos_start = self.arg_name_toks[0].pos_start
+			self.set_span(self.arg_name_toks[0], self.body_node)
 		else:
-			self.pos_start = self.body_node.pos_start
+			self.set_span(self.body_node, self.body_node)
 
-		self.pos_end = self.body_node.pos_end
+class CallNode(Node):
+	__slots__ = ('node_to_call', 'arg_nodes', 'tail', 'cache')
 
-class CallNode:
 	def __init__(self, node_to_call, arg_nodes):
 		self.node_to_call = node_to_call
 		self.arg_nodes = arg_nodes
-		self.pos_start = self.node_to_call.pos_start
+		self.tail = False ##its value is what the function it is in returns, set by mark_tail_calls (resolver.py)
+		self.cache = None ##(table, version, function) the last call found, see CallSiteCache (interpreter.py)
 
 		if len(self.arg_nodes) > 0:
-			self.pos_end = self.arg_nodes[len(self.arg_nodes) - 1].pos_end
+			self.set_span(self.node_to_call, self.arg_nodes[len(self.arg_nodes) - 1])
 		else:
-			self.pos_end = self.node_to_call.pos_end
+			self.set_span(self.node_to_call, self.node_to_call)
+
+class ReturnNode(Node):
+	__slots__ = ('node_to_return',)
 
-class ReturnNode:
 	def __init__(self, node_to_return, pos_start, pos_end):
 		self.node_to_return = node_to_return
-		self.pos_start = pos_start
-		self.pos_end = pos_end
+		self.set_positions(pos_start, pos_end)
+
+class ContinueNode(Node):
+	__slots__ = ()
 
-class ContinueNode:
 	def __init__(self, pos_start, pos_end):
-		self.pos_start = pos_start
-		self.pos_end = pos_end
+		self.set_positions(pos_start, pos_end)
+
+class BreakNode(Node):
+	__slots__ = ()
 
-class BreakNode:
 	def __init__(self, pos_start, pos_end):
-		self.pos_start = pos_start
-		self.pos_end = pos_end
\ No newline at end of file
+		self.set_positions(pos_start, pos_end)
\ No newline at end of file
@@ -0,0 +1,159 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import operator
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from rtresult import *
+from valuenode import *
+
+########################################################
+##	OPERATORS
+########################################################
+
+##what an operator does is looked up by (operator, type of the left value, type of the right value) instead of an
+##if/elif chain on the token and an isinstance check inside the Value method. a BinOpNode or UnaryOpNode gets the
+##table of its operator the first time it runs (node.operations), after that one dict lookup finds the implementation
+##an implementation takes the values and gives (result, error) the way the Value methods do
+##a pair of types nothing was registered for gets the left value's method, the way the Interpreter always called it
+##new value types get operators without touching the interpreter:
+##	@register_binary('added_to', Vector, Vector)
+##	def add_vectors(left, right): ... return result, None
+##	register_unary('negated', Vector, negate_vector)
+##the engines that compile the tree still work out Number with Number themselves, every other pair goes through here
+
+BINARY_METHODS = { ##operator token -> name of the operator, the same as the Value method it falls back to
+	TT_PLUS: 'added_to',
+	TT_MINUS: 'subbed_by',
+	TT_MUL: 'multed_by',
+	TT_DIV: 'dived_by',
+	TT_POW: 'powed_by',
+	TT_EE: 'get_comparison_eq',
+	TT_NE: 'get_comparison_ne',
+	TT_LT: 'get_comparison_lt',
+	TT_GT: 'get_comparison_gt',
+	TT_LTE: 'get_comparison_lte',
+	TT_GTE: 'get_comparison_gte',
+}
+KEYWORD_METHODS = {'AND': 'anded_by', 'OR': 'ored_by'}
+
+def divide(a, b):
+	return a / b
+
+def power(a, b):
+	return a ** b
+
+##what Number's methods compute from the two values, see valuenode.py
+NUMBER_OPS = {
+	'added_to': operator.add,
+	'subbed_by': operator.sub,
+	'multed_by': operator.mul,
+	'dived_by': divide, ##only called when the divisor is not 0, dived_by has no result for that
+	'powed_by': power,
+	'get_comparison_eq': lambda a, b: int(a == b),
+	'get_comparison_ne': lambda a, b: int(a != b),
+	'get_comparison_lt': lambda a, b: int(a < b),
+	'get_comparison_gt': lambda a, b: int(a > b),
+	'get_comparison_lte': lambda a, b: int(a <= b),
+	'get_comparison_gte': lambda a, b: int(a >= b),
+	'anded_by': lambda a, b: int(a and b),
+	'ored_by': lambda a, b: int(a or b),
+}
+
+class OperatorTable(dict): ##implementations of one operator, keyed by the type of the value (unary) or a pair of types
+	def __init__(self, name, generic):
+		super().__init__()
+		self.name = name
+		self.generic = generic ##function(key) giving the implementation for types nothing was registered for
+
+	def __missing__(self, key): ##first time these types meet, remembered so the next lookup is a plain hit
+		implementation = self[key] = self.generic(key)
+		return implementation
+
+def method_of(name): ##the left value's Value method, found on its class once instead of on every value
+	return lambda types: getattr(types[0], name)
+
+BINARY_OPERATIONS = {name: OperatorTable(name, method_of(name)) for name in NUMBER_OPS}
+
+UNARY_OPERATIONS = {
+	'negated': OperatorTable('negated', lambda value_type: lambda value: value.multed_by(Number(-1))),
+	'notted': OperatorTable('notted', lambda value_type: lambda value: value.notted()),
+	'plus': OperatorTable('plus', lambda value_type: lambda value: (value, None)),
+}
+
+def register_binary(name, left_type, right_type, implementation=None): ##can be used as a decorator, returns the implementation
+	if implementation is None:
+		return lambda implementation: register_binary(name, left_type, right_type, implementation)
+	BINARY_OPERATIONS[name][left_type, right_type] = implementation
+	return implementation
+
+def register_unary(name, value_type, implementation=None):
+	if implementation is None:
+		return lambda implementation: register_unary(name, value_type, implementation)
+	UNARY_OPERATIONS[name][value_type] = implementation
+	return implementation
+
+def binary_name(op_tok):
+	return BINARY_METHODS.get(op_tok.type) or KEYWORD_METHODS.get(op_tok.value)
+
+def unary_name(op_tok):
+	if op_tok.type == TT_MINUS:
+		return 'negated'
+	if op_tok.matches(TT_KEYWORD, 'NOT'):
+		return 'notted'
+	return 'plus'
+
+def binary_operations(node): ##the table node's operator uses, bound to the node the first time it is asked for
+	if node.operations is None:
+		node.operations = BINARY_OPERATIONS[binary_name(node.op_tok)]
+	return node.operations
+
+def unary_operations(node):
+	if node.operations is None:
+		node.operations = UNARY_OPERATIONS[unary_name(node.op_tok)]
+	return node.operations
+
+##########################################
+##	Number with Number
+
+##Number's methods without the isinstance check, a result is made without going through Number.__init__
+
+def number(value, context): ##a Number with the attributes Number.__init__ gives it
+	result = new_value(Number)
+	result.value = value
+	result.span = None
+	result.context = context
+	return result
+
+def number_division(left, right):
+	if right.value == 0: ##whatever dived_by does about it
+		return left.dived_by(right)
+	return number(left.value / right.value, left.context), None
+
+NUMBER_OPERATIONS = {
+	'added_to': lambda left, right: (number(left.value + right.value, left.context), None),
+	'subbed_by': lambda left, right: (number(left.value - right.value, left.context), None),
+	'multed_by': lambda left, right: (number(left.value * right.value, left.context), None),
+	'dived_by': number_division,
+	'powed_by': lambda left, right: (number(left.value ** right.value, left.context), None),
+	'get_comparison_eq': lambda left, right: (number(int(left.value == right.value), left.context), None),
+	'get_comparison_ne': lambda left, right: (number(int(left.value != right.value), left.context), None),
+	'get_comparison_lt': lambda left, right: (number(int(left.value < right.value), left.context), None),
+	'get_comparison_gt': lambda left, right: (number(int(left.value > right.value), left.context), None),
+	'get_comparison_lte': lambda left, right: (number(int(left.value <= right.value), left.context), None),
+	'get_comparison_gte': lambda left, right: (number(int(left.value >= right.value), left.context), None),
+	'anded_by': lambda left, right: (number(int(left.value and right.value), left.context), None),
+	'ored_by': lambda left, right: (number(int(left.value or right.value), left.context), None),
+}
+for name, implementation in NUMBER_OPERATIONS.items():
+	register_binary(name, Number, Number, implementation)
+
+register_unary('negated', Number, lambda value: (number(value.value * -1, value.context), None))
+register_unary('notted', Number, lambda value: (number(1 if value.value == 0 else 0, value.context), None))
@@ -0,0 +1,227 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from rtresult import *
+from valuenode import *
+from operators import *
+
+########################################################
+##	OPTIMIZER
+########################################################
+
+##rewrites a parsed tree before the Interpreter runs it: operators whose operands are all constants become one
+##NumberNode/StringNode, and x*1, 1*x, x^1, x+0, 0+x, x-0 become x where that cannot change what the program does
+##folded operations are worked out by the same operator implementations the Interpreter uses, anything that gives an error
+##is left for the Interpreter so runtime errors and their messages stay the same
+##a new node gets the offsets of the node it replaces, positions in error messages do not move
+
+CONSTANT_NAMES = {'NULL': Number.null, 'FALSE': Number.false, 'TRUE': Number.true, 'MATH_PI': Number.math_PI}
+
+COMPARISON_TYPES = (TT_EE, TT_NE, TT_LT, TT_GT, TT_LTE, TT_GTE)
+
+MAX_FOLDED_STRING = 4096 ##longer strings are built at runtime, not stored in the tree
+MAX_FOLDED_BITS = 4096 ##same for integer powers, a fold must never be slower than the code it saves
+
+class Optimizer:
+	def __init__(self):
+		self.folded = 0 ##operator and constant name nodes replaced by a constant, summed over every optimize call
+		self.simplified = 0 ##identities like x*1 replaced by x
+
+	def report(self):
+		return f'{self.folded} nodes folded, {self.simplified} identities simplified'
+
+	def optimize(self, node, symbol_table=None): ##returns the rewritten tree, node itself is changed in place
+		self.replaced = {} ##node -> the node that takes its place in its parent
+		order = []
+		stack = [node]
+		while stack: ##preorder without recursion, trees can be nested far deeper than Python's stack
+			current = stack.pop()
+			order.append(current)
+			for name in type(current).__slots__:
+				self.collect(getattr(current, name), stack)
+
+		self.constants = self.foldable_names(order, symbol_table)
+
+		for current in reversed(order): ##children are rewritten before their parents
+			for name in type(current).__slots__:
+				setattr(current, name, self.replace(getattr(current, name)))
+			method = getattr(self, f'fold_{type(current).__name__}', None)
+			if method:
+				new_node = method(current)
+				if new_node is not current:
+					self.replaced[current] = new_node
+
+		root = self.replaced.get(node, node)
+		self.replaced = None
+		return root
+
+	def collect(self, value, stack): ##child nodes in a slot, IF cases and the else case are tuples inside lists
+		if isinstance(value, Node):
+			stack.append(value)
+		elif type(value) in (list, tuple):
+			for item in value:
+				self.collect(item, stack)
+
+	def replace(self, value):
+		if isinstance(value, Node):
+			return self.replaced.get(value, value)
+		if type(value) is list:
+			return [self.replace(item) for item in value]
+		if type(value) is tuple:
+			return tuple(self.replace(item) for item in value)
+		return value
+
+	##########################################
+
+	def foldable_names(self, order, symbol_table):
+		##NULL, TRUE, FALSE and MATH_PI are only constants while nothing can give them another value:
+		##the program never assigns them (not even as a loop variable or argument), they still hold the built in value,
+		##and every name the program reads but does not set itself is a built in other than RUN, so no code from outside
+		##the program (an earlier shell line or a RUN script) gets to run and assign them
+		if symbol_table is None:
+			return {}
+
+		bound = set()
+		read = set()
+		for node in order:
+			if isinstance(node, VarAccessNode):
+				read.add(node.var_name_tok.value)
+			elif isinstance(node, (VarAssignNode, ForNode)):
+				bound.add(node.var_name_tok.value)
+			elif isinstance(node, FuncDefNode):
+				if node.var_name_tok:
+					bound.add(node.var_name_tok.value)
+				bound.update(tok.value for tok in node.arg_name_toks)
+
+		for name in read - bound:
+			value = symbol_table.get(name)
+			if not (CONSTANT_NAMES.get(name) is value or (isinstance(value, BuiltInFunction) and value.name != 'run')):
+				return {}
+
+		return {name: value for name, value in CONSTANT_NAMES.items() if name not in bound and symbol_table.get(name) is value}
+
+	def constant(self, node): ##the Value a constant node stands for, None when it is not constant
+		if isinstance(node, NumberNode):
+			return Number(node.tok.value)
+		if isinstance(node, StringNode):
+			return String(node.tok.value)
+		return None
+
+	def make_constant(self, value, node): ##NumberNode/StringNode for value spanning the same text as node
+		if isinstance(value, String):
+			if len(value.value) > MAX_FOLDED_STRING:
+				return node
+			tok = Token(TT_STRING, value.value)
+			node_class = StringNode
+		elif isinstance(value, Number) and type(value.value) in (int, float):
+			tok = Token(TT_INT if type(value.value) is int else TT_FLOAT, value.value)
+			node_class = NumberNode
+		else:
+			return node
+		tok.source = node.source
+		tok.start = node.start
+		tok.end = node.end
+		self.folded += 1
+		return node_class(tok)
+
+	def is_number(self, node, integer=False): ##node can only evaluate to a Number (with an int value if integer)
+		if isinstance(node, NumberNode):
+			return not integer or type(node.tok.value) is int
+		if isinstance(node, UnaryOpNode):
+			if node.op_tok.matches(TT_KEYWORD, 'NOT'):
+				return True
+			return self.is_number(node.node, integer)
+		if isinstance(node, BinOpNode):
+			if node.op_tok.type in COMPARISON_TYPES or node.op_tok.matches(TT_KEYWORD, 'AND') or node.op_tok.matches(TT_KEYWORD, 'OR'):
+				return True
+			if node.op_tok.type == TT_POW:
+				return not integer
+			if node.op_tok.type in (TT_PLUS, TT_MINUS, TT_MUL):
+				return self.is_number(node.left_node, integer) and self.is_number(node.right_node, integer)
+			if node.op_tok.type == TT_DIV:
+				return not integer and self.is_number(node.left_node) and self.is_number(node.right_node)
+		return False
+
+	def is_literal(self, node, value): ##an int literal equal to value
+		return isinstance(node, NumberNode) and type(node.tok.value) is int and node.tok.value == value
+
+	def simplify(self, operand, node): ##operand takes the place of node, with node's offsets for the value it gives
+		##operand is an operator node that can only give a Number, its own offsets are only used as the span of that value
+		operand.source = node.source
+		operand.start = node.start
+		operand.end = node.end
+		self.simplified += 1
+		return operand
+
+	##########################################
+
+	def fold_VarAccessNode(self, node):
+		value = self.constants.get(node.var_name_tok.value)
+		if value is None:
+			return node
+		return self.make_constant(value, node)
+
+	def fold_UnaryOpNode(self, node):
+		operand = self.constant(node.node)
+		if operand is None:
+			return node
+		try:
+			result, error = UNARY_OPERATIONS[unary_name(node.op_tok)][type(operand)](operand)
+		except Exception: ##left to fail at runtime the way it always has
+			return node
+		if error:
+			return node
+		return self.make_constant(result, node)
+
+	def fold_BinOpNode(self, node):
+		left, right = node.left_node, node.right_node
+		left_value, right_value = self.constant(left), self.constant(right)
+		op_type = node.op_tok.type
+
+		if left_value is not None and right_value is not None:
+			name = binary_name(node.op_tok)
+			if not name or self.too_big(op_type, left_value, right_value):
+				return node
+			try:
+				result, error = BINARY_OPERATIONS[name][type(left_value), type(right_value)](left_value, right_value)
+			except Exception:
+				return node
+			if error:
+				return node
+			return self.make_constant(result, node)
+
+		##identities, only where the other operand cannot be a String or List (those would add, repeat or fail instead)
+		##and is not a NumberNode, which would have been folded above
+		if op_type == TT_MUL:
+			if self.is_literal(right, 1) and self.is_number(left):
+				return self.simplify(left, node)
+			if self.is_literal(left, 1) and self.is_number(right):
+				return self.simplify(right, node)
+		elif op_type == TT_POW:
+			if self.is_literal(right, 1) and self.is_number(left):
+				return self.simplify(left, node)
+		elif op_type == TT_PLUS: ##-0.0 + 0 is 0.0, so the other operand has to be an int
+			if self.is_literal(right, 0) and self.is_number(left, integer=True):
+				return self.simplify(left, node)
+			if self.is_literal(left, 0) and self.is_number(right, integer=True):
+				return self.simplify(right, node)
+		elif op_type == TT_MINUS:
+			if self.is_literal(right, 0) and self.is_number(left, integer=True):
+				return self.simplify(left, node)
+		return node
+
+	def too_big(self, op_type, left, right):
+		if op_type == TT_POW and type(left.value) is int and type(right.value) is int and abs(left.value) > 1:
+			return right.value * abs(left.value).bit_length() > MAX_FOLDED_BITS
+		if op_type == TT_MUL and isinstance(left, String) and isinstance(right, Number):
+			return len(left.value) * right.value > MAX_FOLDED_STRING
+		return False
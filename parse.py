@@ -56,19 +56,93 @@ class ParseResult:
 			self.error = error
 		return self
 
+	def copy(self):
+		copy = ParseResult()
+		copy.error = self.error
+		copy.node = self.node
+		copy.advance_count = self.advance_count
+		copy.last_registered_advance_count = self.last_registered_advance_count
+		copy.to_reverse_count = self.to_reverse_count
+		return copy
+
 ########################################################
 ##	PARSER
 ########################################################
 
+##grammar rules the packrat mode memoizes, every one of them only depends on the token index it starts at
+PACKRAT_RULES = ('statements', 'statement', 'expr', 'comp_expr', 'arith_expr', 'term', 'factor', 'power', 'call', 'atom',
+	'list_expr', 'if_expr', 'if_expr_b', 'if_expr_c', 'if_expr_b_or_c', 'if_expr_cases', 'for_expr', 'while_expr', 'func_def')
+
+##binding power of every binary operator for the precedence climbing expression parser, keywords are keyed by (type, value)
+##the levels are the classic rules from loosest to tightest: expr, comp_expr, arith_expr, term, power
+BINARY_PRECEDENCE = {
+	(TT_KEYWORD, 'AND'): 1, (TT_KEYWORD, 'OR'): 1,
+	TT_EE: 2, TT_NE: 2, TT_LT: 2, TT_GT: 2, TT_LTE: 2, TT_GTE: 2,
+	TT_PLUS: 3, TT_MINUS: 3,
+	TT_MUL: 4, TT_DIV: 4,
+	TT_POW: 5,
+}
+NOT_PRECEDENCE = 2 ##NOT starts a comp_expr so it can only appear where a comparison can and takes all of one as its operand
+SIGN_PRECEDENCE = 5 ##unary '+'/'-' is a factor, its operand is a power so -2^2 is -(2^2)
+POW_PRECEDENCE = 5 ##the right side of '^' is a factor again which makes it right associative
+
+##tokens an expression can start with, anything else fails expr() before it advances
+EXPR_START_TYPES = {TT_INT, TT_FLOAT, TT_STRING, TT_IDENTIFIER, TT_LPAREN, TT_LSQUARE, TT_PLUS, TT_MINUS}
+EXPR_START_KEYWORDS = {'VAR', 'NOT', 'IF', 'FOR', 'WHILE', 'FUN'}
+EXPECTED_EXPR = "Expected 'VAR', 'IF', 'FOR', 'WHILE', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'NOT'"
+
 class Parser:
-	def __init__(self,tokens): ##initialise token and token index 
+	def __init__(self,tokens, packrat=False, pratt=True): ##initialise token and token index, tokens can be a list, a TokenStream or a TokenBuffer
 		self.tokens = tokens
+		self.stream = isinstance(tokens, TokenStream)
+		self.cursor = None
+		if isinstance(tokens, TokenBuffer): ##read the arrays through one cursor instead of a Token per lexeme
+			self.cursor = TokenCursor(tokens)
+			self.cursor_end = len(tokens)
+			self.kinds = tokens.kinds ##the arrays advance reads
+			self.value_refs = tokens.value_refs
+			self.value_table = tokens.value_table
+			self.current_tok = self.cursor
+		self.classic_expr = self.expr
+		self.expr_failures = {} ##token index -> (result, end index) of expressions that did not parse
+		self.pratt_failed = set() ##token indexes of nested expressions inside one the precedence climbing loop gave up on
+		if pratt: ##expressions go through one precedence climbing loop instead of the rule per level chain
+			self.expr = self.pratt_expr
+		self.memo = None
+		if packrat: ##the rules are only wrapped when asked for so the normal parser pays nothing
+			self.memo = {}
+			for rule_name in PACKRAT_RULES:
+				setattr(self, rule_name, self.memoize(rule_name, getattr(self, rule_name)))
 		self.tok_idx = -1
 		self.advance()
 
-	def advance(self):
-		self.tok_idx += 1
-		self.update_current_tok()
+	def memoize(self, rule_name, rule): ##(rule, token index) -> result, so backtracking never parses the same tokens with the same rule twice
+		def memoized(*args):
+			key = (rule_name, self.tok_idx) + args
+			entry = self.memo.get(key)
+			if entry:
+				res, end_idx = entry
+				self.tok_idx = end_idx
+				self.update_current_tok()
+				return res.copy() ##callers may change the result they get back
+			res = yield rule(*args)
+			self.memo[key] = (res.copy(), self.tok_idx)
+			return res
+		return memoized
+
+	def advance(self): ##called for every token, so it does the work of update_current_tok itself
+		idx = self.tok_idx = self.tok_idx + 1
+		cursor = self.cursor
+		if cursor is not None:
+			if idx < self.cursor_end:
+				cursor.idx = idx
+				cursor.type = TOKEN_KINDS[self.kinds[idx]]
+				cursor.value = self.value_table[self.value_refs[idx]]
+			return cursor
+		try:
+			self.current_tok = self.tokens[idx]
+		except IndexError: ##past the last token so we stay on it
+			pass
 		return self.current_tok
 
 	def reverse(self, amount=1):
@@ -77,13 +151,46 @@ class Parser:
 		return self.current_tok
 
 	def update_current_tok(self):
-		if self.tok_idx >= 0 and self.tok_idx < len(self.tokens):
-		  self.current_tok = self.tokens[self.tok_idx]
+		if self.cursor:
+			if 0 <= self.tok_idx < self.cursor_end:
+				self.cursor.move(self.tok_idx)
+		elif self.tok_idx >= 0:
+			try:
+				self.current_tok = self.tokens[self.tok_idx]
+			except IndexError: ##past the last token so we stay on it
+				pass
+
+	def mark(self): ##a stream has to keep the tokens from here on while we might still reverse back to them
+		if self.stream:
+			self.tokens.mark(self.tok_idx)
+
+	def release(self):
+		if self.stream:
+			self.tokens.release()
 
 	#########################################################
 
 	def parse(self):	
-		res = self.statements() ##result after parsing expression
+		res = self.run(self.statements()) ##result after parsing expression
+		return self.expect_eof(res)
+
+	def run(self, rule): ##drive a rule on an explicit stack so nesting is only limited by memory, not the Python stack
+		##every rule is a generator that yields the sub rule it needs and is sent back that rule's result,
+		##a sub rule that cannot nest back into its caller before reaching a plain yield is run with yield from, which skips a trip
+		##through this loop but does use the Python stack, so anything that can nest without bound has to be a plain yield
+		stack = [rule]
+		result = None
+		while True:
+			try:
+				stack.append(stack[-1].send(result))
+				result = None
+			except StopIteration as done:
+				stack.pop()
+				if not stack:
+					return done.value
+				result = done.value
+
+	def expect_eof(self, res):
 		if not res.error and self.current_tok.type != TT_EOF: ##still havennt reached the EOF even though we have finished it means we have a syntax error 
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, "Expected '+', '-' , '*' '/' or '^' "))
 		return res
@@ -94,16 +201,19 @@ class Parser:
 		tok = self.current_tok
 
 		if tok.type in (TT_INT,TT_FLOAT):
+			tok = tok.hold()
 			res.register_advancements()
 			self.advance()
 			return res.success(NumberNode(tok)) 
 
 		elif tok.type == TT_STRING:
+			tok = tok.hold()
 			res.register_advancements()
 			self.advance()
 			return res.success(StringNode(tok))
 
 		elif tok.type == TT_IDENTIFIER:
+			tok = tok.hold()
 			res.register_advancements()
 			self.advance()
 			return res.success(VarAccessNode(tok))
@@ -111,7 +221,7 @@ class Parser:
 		elif tok.type == TT_LPAREN:
 			res.register_advancements()
 			self.advance()
-			expr = res.register(self.expr())
+			expr = res.register((yield self.expr()))
 			if res.error:
 				return res
 			if self.current_tok.type == TT_RPAREN:
@@ -122,31 +232,31 @@ class Parser:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, "Expected ')' "))
 
 		elif tok.type == TT_LSQUARE:
-		  list_expr = res.register(self.list_expr())
+		  list_expr = res.register((yield self.list_expr()))
 		  if res.error: 
 		  	return res
 		  return res.success(list_expr)
 
 		elif tok.matches(TT_KEYWORD, 'IF'):
-			if_expr = res.register(self.if_expr())
+			if_expr = res.register((yield self.if_expr()))
 			if res.error:
 				return res
 			return res.success(if_expr)
 
 		elif tok.matches(TT_KEYWORD, 'FOR'):
-			for_expr = res.register(self.for_expr())
+			for_expr = res.register((yield self.for_expr()))
 			if res.error:
 				return res
 			return res.success(for_expr)
 
 		elif tok.matches(TT_KEYWORD, 'WHILE'):
-			while_expr = res.register(self.while_expr())
+			while_expr = res.register((yield self.while_expr()))
 			if res.error:
 				return res
 			return res.success(while_expr)
 
 		elif tok.matches(TT_KEYWORD, 'FUN'):
-			func_def = res.register(self.func_def())
+			func_def = res.register((yield self.func_def()))
 			if res.error:
 				return res
 			return res.success(func_def)
@@ -159,13 +269,13 @@ class Parser:
 
 		res = ParseResult()
 		statements = [] ##for the list of expressions 
-		pos_start = self.current_tok.pos_start.copy()
+		pos_start = self.current_tok.pos_start
 
 		while self.current_tok.type == TT_NEWLINE: ##if current token is new line 
 			res.register_advancements()
 			self.advance()
 
-		statement = res.register(self.statement()) ##add expression to statement 
+		statement = res.register((yield self.statement())) ##add expression to statement 
 		if res.error: return res
 		statements.append(statement) ##append to statements 
 
@@ -183,41 +293,46 @@ class Parser:
 			if not more_statements: 
 				break
 
-			statement = res.try_register(self.statement()) ##try and look for rules 
+			self.mark()
+			statement = res.try_register((yield self.statement())) ##try and look for rules 
 
 			if not statement:
 				self.reverse(res.to_reverse_count) ##expression count would have moved forward a bunch of times so we need to reverse. 
+				self.release()
 				more_statements = False
 				continue
+			self.release()
 			statements.append(statement)
 
-		return res.success(ListNode(statements,pos_start,self.current_tok.pos_end.copy()))
+		return res.success(ListNode(statements,pos_start,self.current_tok.pos_end))
 
 
 	def statement(self):
 		res = ParseResult()
-		pos_start = self.current_tok.pos_start.copy()
+		pos_start = self.current_tok.pos_start
 
 		if self.current_tok.matches(TT_KEYWORD, 'RETURN'): ##we check for the return statement
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
 
-			expr = res.try_register(self.expr()) ##optional expression after return
+			self.mark()
+			expr = res.try_register((yield self.expr())) ##optional expression after return
 			if not expr:
 				self.reverse(res.to_reverse_count)
-			return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start.copy()))
+			self.release()
+			return res.success(ReturnNode(expr, pos_start, self.current_tok.pos_start))
 
 		if self.current_tok.matches(TT_KEYWORD, 'CONTINUE'): ##check for continue
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
-			return res.success(ContinueNode(pos_start, self.current_tok.pos_start.copy()))
+			return res.success(ContinueNode(pos_start, self.current_tok.pos_start))
 
 		if self.current_tok.matches(TT_KEYWORD, 'BREAK'):
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
-			return res.success(BreakNode(pos_start, self.current_tok.pos_start.copy()))
+			return res.success(BreakNode(pos_start, self.current_tok.pos_start))
 
-		expr = res.register(self.expr()) ##if none of the keyword we're looking for a normal expression
+		expr = res.register((yield self.expr())) ##if none of the keyword we're looking for a normal expression
 		if res.error:
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,"Expected 'RETURN', 'CONTINUE', 'BREAK', 'VAR', 'IF', 'FOR', 'WHILE', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'NOT'"))
 		return res.success(expr)
@@ -226,7 +341,7 @@ class Parser:
 	def list_expr(self):
 		res = ParseResult()
 		element_nodes = []
-		pos_start = self.current_tok.pos_start.copy()
+		pos_start = self.current_tok.pos_start
 
 		if self.current_tok.type != TT_LSQUARE:
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected '['"))
@@ -238,7 +353,7 @@ class Parser:
 			res.register_advancements()
 			self.advance()
 		else:
-			element_nodes.append(res.register(self.expr()))
+			element_nodes.append(res.register((yield self.expr())))
 			if res.error:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,"Expected ']', 'VAR', 'IF', 'FOR', 'WHILE', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'NOT'"))
 
@@ -246,27 +361,27 @@ class Parser:
 				res.register_advancements()
 				self.advance()
 
-			element_nodes.append(res.register(self.expr()))
-			if res.error: 
-				return res
+				element_nodes.append(res.register((yield self.expr())))
+				if res.error: 
+					return res
 
 			if self.current_tok.type != TT_RSQUARE:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected ',' or ']'"))
 			res.register_advancements()
 			self.advance()
 
-		return res.success(ListNode(element_nodes,pos_start,self.current_tok.pos_end.copy()))
+		return res.success(ListNode(element_nodes,pos_start,self.current_tok.pos_end))
 
 	def if_expr(self):
 		res = ParseResult()
-		all_cases = res.register(self.if_expr_cases('IF'))
+		all_cases = res.register((yield self.if_expr_cases('IF')))
 		if res.error: 
 			return res
 		cases, else_case = all_cases
 		return res.success(IfNode(cases, else_case))
 
 	def if_expr_b(self):
-		return self.if_expr_cases('ELIF')
+		return (yield from self.if_expr_cases('ELIF'))
 
 	def if_expr_c(self):
 		res = ParseResult()
@@ -280,9 +395,9 @@ class Parser:
 				res.register_advancements()
 				self.advance()
 
-				statements = res.register(self.statements())
+				statements = res.register((yield self.statements()))
 				if res.error: return res
-				else_case = (statements, True)
+				else_case = (statements.discard_values(), True)
 
 				if self.current_tok.matches(TT_KEYWORD, 'END'):
 				  res.register_advancements()
@@ -293,7 +408,7 @@ class Parser:
 				    "Expected 'END'"
 				  ))
 			else:
-				expr = res.register(self.statement())
+				expr = res.register((yield self.statement()))
 				if res.error: return res
 				else_case = (expr, False)
 
@@ -304,11 +419,11 @@ class Parser:
 		cases, else_case = [], None
 
 		if self.current_tok.matches(TT_KEYWORD, 'ELIF'):
-		  all_cases = res.register(self.if_expr_b())
+		  all_cases = res.register((yield self.if_expr_b()))
 		  if res.error: return res
 		  cases, else_case = all_cases
 		else:
-		  else_case = res.register(self.if_expr_c())
+		  else_case = res.register((yield self.if_expr_c()))
 		  if res.error: return res
 
 		return res.success((cases, else_case))
@@ -324,7 +439,7 @@ class Parser:
 		res.register_advancements()
 		self.advance()
 
-		condition = res.register(self.expr())
+		condition = res.register((yield self.expr()))
 		if res.error: 
 			return res
 
@@ -338,27 +453,27 @@ class Parser:
 		  res.register_advancements()
 		  self.advance()
 
-		  statements = res.register(self.statements())
+		  statements = res.register((yield self.statements()))
 		  if res.error: 
 		  	return res
-		  cases.append((condition, statements, True))
+		  cases.append((condition, statements.discard_values(), True))
 
 		  if self.current_tok.matches(TT_KEYWORD, 'END'):
 		    res.register_advancements()
 		    self.advance()
 		  else:
-		    all_cases = res.register(self.if_expr_b_or_c())
+		    all_cases = res.register((yield self.if_expr_b_or_c()))
 		    if res.error: 
 		    	return res
 		    new_cases, else_case = all_cases
 		    cases.extend(new_cases)
 		else:
-		  expr = res.register(self.statement())
+		  expr = res.register((yield self.statement()))
 		  if res.error: 
 		  	return res
 		  cases.append((condition, expr, False))
 
-		  all_cases = res.register(self.if_expr_b_or_c())
+		  all_cases = res.register((yield self.if_expr_b_or_c()))
 		  if res.error: return res
 		  new_cases, else_case = all_cases
 		  cases.extend(new_cases)
@@ -371,39 +486,39 @@ class Parser:
 		if not self.current_tok.matches(TT_KEYWORD, 'FOR'):
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'FOR'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
 		if self.current_tok.type != TT_IDENTIFIER:
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected identifier"))
 
-		var_name = self.current_tok
-		res.register_advancement()
+		var_name = self.current_tok.hold()
+		res.register_advancements()
 		self.advance()
 
 		if self.current_tok.type != TT_EQ:
 		  return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected '='"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
-		start_value = res.register(self.expr())
+		start_value = res.register((yield self.expr()))
 		if res.error: return res
 
 		if not self.current_tok.matches(TT_KEYWORD, 'TO'):
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'TO'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
-		end_value = res.register(self.expr())
+		end_value = res.register((yield self.expr()))
 		if res.error: return res
 
 		if self.current_tok.matches(TT_KEYWORD, 'STEP'):
-		  res.register_advancement()
+		  res.register_advancements()
 		  self.advance()
 
-		  step_value = res.register(self.expr())
+		  step_value = res.register((yield self.expr()))
 		  if res.error: return res
 		else:
 		  step_value = None
@@ -411,25 +526,25 @@ class Parser:
 		if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'THEN'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
 		if self.current_tok.type == TT_NEWLINE:
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
 
-			body = res.register(self.statements())
+			body = res.register((yield self.statements()))
 			if res.error: return res
 
 			if not self.current_tok.matches(TT_KEYWORD, 'END'):
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'END'"))
 
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
 
-			return res.success(ForNode(var_name, start_value, end_value, step_value, body, True))
+			return res.success(ForNode(var_name, start_value, end_value, step_value, body.discard_values(), True))
 
-		body = res.register(self.statement())
+		body = res.register((yield self.statement()))
 		if res.error: return res
 
 		return res.success(ForNode(var_name, start_value, end_value, step_value, body, False))
@@ -440,76 +555,239 @@ class Parser:
 		if not self.current_tok.matches(TT_KEYWORD, 'WHILE'):
 		  return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'WHILE'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
-		condition = res.register(self.expr())
+		condition = res.register((yield self.expr()))
 		if res.error: return res
 
 		if not self.current_tok.matches(TT_KEYWORD, 'THEN'):
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'THEN'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
 		if self.current_tok.type == TT_NEWLINE:
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
 
-			body = res.register(self.statements())
+			body = res.register((yield self.statements()))
 			if res.error: return res
 
 			if not self.current_tok.matches(TT_KEYWORD, 'END'):
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'END'"))
 
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
 
-			return res.success(WhileNode(condition, body, True))
+			return res.success(WhileNode(condition, body.discard_values(), True))
 
-		body = res.register(self.statement())
+		body = res.register((yield self.statement()))
 		if res.error: return res
 
 		return res.success(WhileNode(condition, body, False))
 	
+	###################################
+
+	##precedence climbing builds the same BinOpNode/UnaryOpNode trees as expr -> comp_expr -> ... -> call
+	##without a rule and a ParseResult for every level. It only has to handle input that parses,
+	##as soon as something is off the expression is parsed again by the classic rules so errors come out the same
+
+	def pratt_expr(self):
+		start_idx = self.tok_idx
+		failed = self.expr_failures.get(start_idx)
+		if failed: ##an enclosing expression falling back to the classic rules asks again, do not parse it a third time
+			res, end_idx = failed
+			self.tok_idx = end_idx
+			self.update_current_tok()
+			return res.copy()
+
+		tok = self.current_tok
+		if tok.type not in EXPR_START_TYPES and not (tok.type == TT_KEYWORD and tok.value in EXPR_START_KEYWORDS):
+			##what the classic rules end on for a token like END or ')', every block end asks this once
+			return ParseResult().failure(InvalidSyntaxError(tok.pos_start, tok.pos_end, EXPECTED_EXPR))
+
+		node = None
+		self.mark()
+		if start_idx not in self.pratt_failed and not tok.matches(TT_KEYWORD, 'VAR'): ##assignments are rare and already cheap through the classic rule
+			node = yield from self.climb() ##the loop runs as part of this rule and only yields the sub rules it needs
+		if node is not None:
+			self.release()
+			res = ParseResult()
+			res.advance_count = self.tok_idx - start_idx
+			return res.success(node)
+
+		self.reverse(self.tok_idx - start_idx)
+		self.release()
+		res = yield self.classic_expr()
+		if res.error:
+			self.expr_failures[start_idx] = (res.copy(), self.tok_idx)
+		return res
+
+	def climb(self): ##None when the classic rules have to take over
+		##operators wait on a stack until one that binds looser shows up, each entry is (binding, op token, kind)
+		##where binding is the precedence the operator's right side is parsed at in the recursive formulation,
+		##an incoming operator reduces every entry whose binding is higher than its own precedence.
+		##'(', argument lists and list literals push a group entry with binding 0 that only its closing token takes off,
+		##so nesting them never recurses either
+		operands = []
+		operators = []
+		starts = [] ##token indexes the classic rules start a nested expr at, see give_up
+		while True:
+			tok = self.current_tok
+			tok_type = tok.type
+			if tok_type == TT_PLUS or tok_type == TT_MINUS:
+				operators.append((SIGN_PRECEDENCE, tok.hold(), 'unary'))
+				self.advance()
+				continue
+			if tok_type == TT_LPAREN:
+				operators.append((0, None, '('))
+				self.advance()
+				starts.append(self.tok_idx)
+				continue
+
+			##the call rule, plain literals and names are read here and IF, FOR, WHILE and FUN go to atom
+			if tok_type == TT_INT or tok_type == TT_FLOAT:
+				node = NumberNode(tok.hold())
+				self.advance()
+			elif tok_type == TT_IDENTIFIER:
+				node = VarAccessNode(tok.hold())
+				self.advance()
+			elif tok_type == TT_STRING:
+				node = StringNode(tok.hold())
+				self.advance()
+			elif tok_type == TT_LSQUARE:
+				pos_start = tok.pos_start
+				self.advance()
+				if self.current_tok.type != TT_RSQUARE:
+					operators.append((0, (pos_start, []), '['))
+					starts.append(self.tok_idx)
+					continue
+				self.advance()
+				node = ListNode([], pos_start, self.current_tok.pos_end)
+			elif tok_type == TT_KEYWORD:
+				if tok.value == 'NOT':
+					if operators and operators[-1][0] > NOT_PRECEDENCE: ##NOT is not a factor so it cannot follow '+', '==', '-' and the like
+						return self.give_up(starts)
+					operators.append((NOT_PRECEDENCE, tok.hold(), 'unary'))
+					self.advance()
+					continue
+				res = yield self.atom()
+				if res.error:
+					return self.give_up(starts)
+				node = res.node
+			else:
+				return self.give_up(starts)
+
+			can_call = True ##an atom can be followed by one argument list
+			while True:
+				if can_call and self.current_tok.type == TT_LPAREN:
+					self.advance()
+					if self.current_tok.type != TT_RPAREN:
+						operators.append((0, (node, []), 'call'))
+						starts.append(self.tok_idx)
+						break
+					self.advance()
+					node = CallNode(node, [])
+				operands.append(node)
+
+				tok = self.current_tok
+				if tok.type == TT_KEYWORD:
+					prec = BINARY_PRECEDENCE.get((TT_KEYWORD, tok.value))
+				else:
+					prec = BINARY_PRECEDENCE.get(tok.type)
+				limit = prec or 0 ##anything but an operator ends every operator up to the innermost group
+				while operators and operators[-1][0] > limit:
+					binding, op_tok, kind = operators.pop()
+					if kind == 'unary':
+						operands[-1] = UnaryOpNode(op_tok, operands[-1])
+					else:
+						right = operands.pop()
+						operands[-1] = BinOpNode(operands[-1], op_tok, right)
+				if prec is not None:
+					operators.append((prec if prec == POW_PRECEDENCE else prec + 1, tok.hold(), 'binary')) ##left associative everywhere else
+					self.advance()
+					break
+				if not operators:
+					return operands[0]
+
+				binding, group, kind = operators[-1]
+				tok_type = tok.type
+				if kind == '(' and tok_type == TT_RPAREN:
+					operators.pop()
+					self.advance()
+					node = operands.pop()
+					can_call = True
+				elif kind == 'call' and (tok_type == TT_COMMA or tok_type == TT_RPAREN):
+					group[1].append(operands.pop())
+					self.advance()
+					if tok_type == TT_COMMA:
+						starts.append(self.tok_idx)
+						break
+					operators.pop()
+					node = CallNode(group[0], group[1])
+					can_call = False
+				elif kind == '[' and (tok_type == TT_COMMA or tok_type == TT_RSQUARE):
+					group[1].append(operands.pop())
+					self.advance()
+					if tok_type == TT_COMMA:
+						starts.append(self.tok_idx)
+						break
+					operators.pop()
+					node = ListNode(group[1], group[0], self.current_tok.pos_end)
+					can_call = True
+				else:
+					return self.give_up(starts)
+
+	def give_up(self, starts): ##the classic rules reparse the nested expressions one by one so none of them should try this loop again
+		self.pratt_failed.update(starts)
+		return None
+
 	def power(self):
-		return self.bin_op(self.call,(TT_POW,),self.factor)
+		return (yield from self.bin_op(self.call,(TT_POW,),self.factor))
 
 	def call(self):
 		res = ParseResult()
-		atom = res.register(self.atom())
+		atom = res.register((yield from self.atom()))
 		if res.error: 
 			return res
 
 		if self.current_tok.type == TT_LPAREN:
+			arg_nodes = res.register((yield self.call_args()))
+			if res.error:
+				return res
+			return res.success(CallNode(atom, arg_nodes))
+		return res.success(atom)
+
+	def call_args(self): ##the parenthesised argument list after a callee
+		res = ParseResult()
+		res.register_advancements()
+		self.advance()
+		arg_nodes = []
+
+		if self.current_tok.type == TT_RPAREN:
 			res.register_advancements()
 			self.advance()
-			arg_nodes = []
+		else:
+			arg_nodes.append(res.register((yield self.expr())))
+			if res.error:
+				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,"Expected ')', 'VAR', 'IF', 'FOR', 'WHILE', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'NOT'"))
 
-			if self.current_tok.type == TT_RPAREN:
+			while self.current_tok.type == TT_COMMA:
 				res.register_advancements()
 				self.advance()
-			else:
-				arg_nodes.append(res.register(self.expr()))
-				if res.error:
-					return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,"Expected ')', 'VAR', 'IF', 'FOR', 'WHILE', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'NOT'"))
-
-				while self.current_tok.type == TT_COMMA:
-					res.register_advancements()
-					self.advance()
 
-					arg_nodes.append(res.register(self.expr()))
-					if res.error: 
-						return res
+				arg_nodes.append(res.register((yield self.expr())))
+				if res.error: 
+					return res
 
-				if self.current_tok.type != TT_RPAREN:
-					return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected ',' or ')'"))
+			if self.current_tok.type != TT_RPAREN:
+				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected ',' or ')'"))
 
-				res.register_advancements()
-				self.advance()
+			res.register_advancements()
+			self.advance()
 
-			return res.success(CallNode(atom, arg_nodes))
-		return res.success(atom)
+		return res.success(arg_nodes)
 
 	def factor(self):
 
@@ -517,11 +795,11 @@ class Parser:
 		tok = self.current_tok
 
 		if tok.type in (TT_PLUS, TT_MINUS):
-
+			tok = tok.hold()
 			res.register_advancements()
 			self.advance()
 
-			factor = res.register(self.factor())
+			factor = res.register((yield self.factor()))
 
 			if res.error:
 				return res
@@ -529,31 +807,31 @@ class Parser:
 			else:
 				return res.success(UnaryOpNode(tok,factor))
 
-		return self.power()
+		return (yield from self.power())
 		
 
 	def term(self):
-		return self.bin_op(self.factor, (TT_MUL,TT_DIV))
+		return (yield from self.bin_op(self.factor, (TT_MUL,TT_DIV)))
 
 	def arith_expr(self):
-		return self.bin_op(self.term, (TT_PLUS,TT_MINUS))
+		return (yield from self.bin_op(self.term, (TT_PLUS,TT_MINUS)))
 
 	def comp_expr(self):
 		res = ParseResult()
 
-		if self.current_tok.matches(TT_NE,'NE'):
-			op_tok = self.current_tok
+		if self.current_tok.matches(TT_KEYWORD,'NOT'):
+			op_tok = self.current_tok.hold()
 			res.register_advancements()
 			self.advance()
 
-			node = res.register(self.comp_expr())
+			node = res.register((yield self.comp_expr()))
 
 			if res.error:
 				return res
 
 			return res.success(UnaryOpNode(op_tok,node))
 
-		node = res.register(self.bin_op(self.arith_expr,(TT_EE,TT_NE,TT_LT,TT_GT,TT_LTE,TT_GTE)))
+		node = res.register((yield from self.bin_op(self.arith_expr,(TT_EE,TT_NE,TT_LT,TT_GT,TT_LTE,TT_GTE))))
 
 		if res.error:
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end, "Expected int, float, identifier, '+', '-', '(', '[', 'IF', 'FOR', 'WHILE', 'FUN' or 'NOT'"))
@@ -569,7 +847,7 @@ class Parser:
 			if self.current_tok.type != TT_IDENTIFIER:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start,self.current_tok.pos_end,"Expected identifier"))
 
-			var_name = self.current_tok
+			var_name = self.current_tok.hold()
 
 			res.register_advancements()
 			self.advance()
@@ -579,17 +857,17 @@ class Parser:
 
 			res.register_advancements()
 			self.advance()
-			expr = res.register(self.expr())
+			expr = res.register((yield self.expr()))
 			if res.error:
 				return res
 
 			return res.success(VarAssignNode(var_name,expr))
 
 
-		node = res.register(self.bin_op(self.comp_expr, ((TT_KEYWORD,"AND"),(TT_KEYWORD,"OR"))))
+		node = res.register((yield from self.bin_op(self.comp_expr, ((TT_KEYWORD,"AND"),(TT_KEYWORD,"OR")))))
 
 		if res.error:
-			return res.failure(InvalidSyntaxError(self.current_tok.pos_start,self.current_tok.pos_end,"Expected 'VAR', 'IF', 'FOR', 'WHILE', 'FUN', int, float, identifier, '+', '-', '(', '[' or 'NOT'")) ##overwrite error with term 
+			return res.failure(InvalidSyntaxError(self.current_tok.pos_start,self.current_tok.pos_end,EXPECTED_EXPR)) ##overwrite error with term 
 		else:
 			return res.success(node)
 
@@ -598,14 +876,14 @@ class Parser:
 			func_b = func_a
 
 		res = ParseResult()
-		left = res.register(func_a()) ## if there is an error in the func it will be registered to the res obj 
+		left = res.register((yield from func_a())) ##bounded, the left operand chain always reaches atom before it nests again ## if there is an error in the func it will be registered to the res obj 
 		if res.error:
 			return res
 		while self.current_tok.type in ops or (self.current_tok.type, self.current_tok.value) in ops:
-			op_tok = self.current_tok
+			op_tok = self.current_tok.hold()
 			res.register_advancements()
 			self.advance()
-			right = res.register(func_b())
+			right = res.register((yield func_b()))
 			if res.error:
 				return res
 			left = BinOpNode(left,op_tok,right)
@@ -618,12 +896,12 @@ class Parser:
 		if not self.current_tok.matches(TT_KEYWORD, 'FUN'):
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'FUN'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
 		if self.current_tok.type == TT_IDENTIFIER:
-			var_name_tok = self.current_tok
-			res.register_advancement()
+			var_name_tok = self.current_tok.hold()
+			res.register_advancements()
 			self.advance()
 			if self.current_tok.type != TT_LPAREN:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected '('"))
@@ -632,41 +910,41 @@ class Parser:
 			if self.current_tok.type != TT_LPAREN:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected identifier or '('"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 		arg_name_toks = []
 
 		if self.current_tok.type == TT_IDENTIFIER:
-			arg_name_toks.append(self.current_tok)
-			res.register_advancement()
+			arg_name_toks.append(self.current_tok.hold())
+			res.register_advancements()
 			self.advance()
 
 			while self.current_tok.type == TT_COMMA:
-				res.register_advancement()
+				res.register_advancements()
 				self.advance()
 
 				if self.current_tok.type != TT_IDENTIFIER:
 					return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected identifier"))
 
-				arg_name_toks.append(self.current_tok)
-				res.register_advancement()
+				arg_name_toks.append(self.current_tok.hold())
+				res.register_advancements()
 				self.advance()
 
-				if self.current_tok.type != TT_RPAREN:
-					return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected ',' or ')'"))
+			if self.current_tok.type != TT_RPAREN:
+				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected ',' or ')'"))
 
 		else:
 			if self.current_tok.type != TT_RPAREN:
 				return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected identifier or ')'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
 		if self.current_tok.type == TT_ARROW:
-			res.register_advancement()
+			res.register_advancements()
 			self.advance()
 
-			body = res.register(self.expr())
+			body = res.register((yield self.expr()))
 			if res.error: return res
 
 			return res.success(FuncDefNode(var_name_tok,arg_name_toks,body,True))
@@ -674,16 +952,16 @@ class Parser:
 		if self.current_tok.type != TT_NEWLINE:
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected '->' or NEWLINE"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
-		body = res.register(self.statements())
+		body = res.register((yield self.statements()))
 		if res.error: return res
 
 		if not self.current_tok.matches(TT_KEYWORD, 'END'):
 			return res.failure(InvalidSyntaxError(self.current_tok.pos_start, self.current_tok.pos_end,f"Expected 'END'"))
 
-		res.register_advancement()
+		res.register_advancements()
 		self.advance()
 
-		return res.success(FuncDefNode(var_name_tok,arg_name_toks,body, False))##no arrow
+		return res.success(FuncDefNode(var_name_tok,arg_name_toks,body.discard_values(), False))##no arrow
@@ -5,30 +5,110 @@ from strings_with_arrows import *
 import string
 import os
 import math
+import bisect
 import constants
 from error import *
 
 ########################################################
-##	POSITION
+##	SOURCE FILE
 ########################################################
 
-class Position:
-	def __init__(self, idx, ln, col, fn, ftxt):
-		self.idx = idx ##index
-		self.ln = ln ##line
-		self.col = col ##column
+##one shared object per file holding its name and text, positions only keep an offset into it
+##the line index is built the first time an error needs a line or column and then reused
+
+class SourceFile:
+	base = 0 ##offset of this source inside the file text, see SourceSegment
+
+	def __init__(self, fn, ftxt):
 		self.fn = fn ##file name
 		self.ftxt = ftxt ##file text
+		self.line_starts = None ##offset of the first character of every line
 
-	def advance(self, current_char=None):
-		self.idx += 1
-		self.col += 1
+	def build_line_index(self):
+		line_starts = [0]
+		idx = self.ftxt.find('\n')
+		while idx != -1:
+			line_starts.append(idx + 1)
+			idx = self.ftxt.find('\n', idx + 1)
+		self.line_starts = line_starts
+
+	def line_col(self, idx): ##line and column of the character at idx
+		if self.line_starts is None:
+			self.build_line_index()
+		ln = bisect.bisect_right(self.line_starts, idx) - 1
+		return ln, idx - self.line_starts[ln]
+
+	def end_line_col(self, idx): ##line and column just after the character before idx, for the exclusive end of a span
+		if idx <= 0:
+			return 0, 0
+		ln, col = self.line_col(idx - 1)
+		return ln, col + 1
+
+##a piece of a SourceFile whose offsets count from base, used by IncrementalDocument for each top level statement
+##when text before the piece changes only base moves, the tokens and nodes inside keep their offsets
+
+class SourceSegment:
+	def __init__(self, file, base):
+		self.file = file ##SourceFile of the whole text
+		self.base = base
+
+	@property
+	def fn(self):
+		return self.file.fn
+
+	@property
+	def ftxt(self):
+		return self.file.ftxt
+
+	def line_col(self, idx):
+		return self.file.line_col(idx)
+
+	def end_line_col(self, idx):
+		return self.file.end_line_col(idx)
+
+########################################################
+##	POSITION
+########################################################
+
+class Position:
+	__slots__ = ('offset', 'source')
+
+	def __init__(self, offset, source):
+		self.offset = offset ##offset from the start of source
+		self.source = source ##SourceFile or SourceSegment the offset points into
+
+	@property
+	def idx(self): ##index in the file text
+		return self.offset + self.source.base
 
-		if current_char == '\n': ##if the current character is equal to a new line 
-			self.ln += 1
-			self.col += 0
+	@property
+	def ln(self): ##line
+		return self.source.line_col(self.idx)[0]
 
+	@property
+	def col(self): ##column
+		return self.source.line_col(self.idx)[1]
+
+	@property
+	def fn(self): ##file name
+		return self.source.fn
+
+	@property
+	def ftxt(self): ##file text
+		return self.source.ftxt
+
+	def advance(self, current_char=None):
+		self.offset += 1
 		return self
 
 	def copy(self): ##create a copy of the position
-		return Position(self.idx,self.ln,self.col,self.fn,self.ftxt)
\ No newline at end of file
+		return Position(self.offset,self.source)
+
+##two Positions for something that needs a span, a node or a token works in its place and makes its Positions on demand
+
+class Span:
+	__slots__ = ('pos_start', 'pos_end')
+
+	def __init__(self, pos_start, pos_end):
+		self.pos_start = pos_start
+		self.pos_end = pos_end
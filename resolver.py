@@ -0,0 +1,122 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from symboltable import *
+
+########################################################
+##	RESOLVER
+########################################################
+
+##gives every VarAccessNode and VarAssignNode a (depth, slot) address so the Interpreter can index a frame's values
+##instead of looking the name up in one dict after another up the parent chain
+##a function's frame has a slot for each of its arguments and each name it sets (VAR, FOR, a named FUN inside it),
+##the program's top level lives in the global table, which gets a slot for every name the program uses
+##
+##a called function's parent frame is its caller's, not the frame it was written in, so which frame between the
+##caller and the global table holds a name is only known at runtime and the only fixed depths are:
+##LOCAL (0) the frame the node runs in, falls back to the chain when the slot is still empty
+##GLOBAL the global table, read straight from the slot unless some frame may hold the name too (SymbolTable.shadowed),
+##then the chain is walked the way it always was. code the Resolver never saw (RUN scripts, trees that were not
+##resolved) has its frames' names added to shadowed as it sets them, so a direct read never skips one of them
+
+LOCAL = 0
+GLOBAL = -1
+
+class Resolver:
+	def __init__(self, symbol_table):
+		self.symbol_table = symbol_table ##global table the program will run in, the global slots are its slots
+
+	def resolve(self, node): ##annotates the tree in place
+		order = [] ##(node, FuncDefNode whose frame it runs in or None for the top level), parents first
+		stack = [(node, None)]
+		while stack: ##without recursion, trees can be nested far deeper than Python's stack
+			current, owner = stack.pop()
+			order.append((current, owner))
+			inner = current if isinstance(current, FuncDefNode) else owner
+			for name in type(current).__slots__:
+				self.collect(getattr(current, name), inner, stack)
+
+		for current, owner in order: ##every name a frame sets, before any read is resolved
+			if isinstance(current, FuncDefNode):
+				current.scope = Scope(tok.value for tok in current.arg_name_toks)
+				if current.var_name_tok:
+					self.bind(owner, current.var_name_tok.value)
+			elif isinstance(current, (VarAssignNode, ForNode)):
+				self.bind(owner, current.var_name_tok.value)
+
+		for current, owner in order:
+			if isinstance(current, FuncDefNode):
+				self.symbol_table.shadowed.update(current.scope.names)
+			elif isinstance(current, (VarAccessNode, VarAssignNode)):
+				name = current.var_name_tok.value
+				if owner is None:
+					current.depth, current.slot = LOCAL, self.symbol_table.declare(name)
+				elif name in owner.scope.slots:
+					current.depth, current.slot = LOCAL, owner.scope.slots[name]
+				else: ##only reads get here, a VAR always sets the frame it runs in
+					current.depth, current.slot = GLOBAL, self.symbol_table.declare(name)
+		return node
+
+	def collect(self, value, owner, stack): ##child nodes in a slot, IF cases and the else case are tuples inside lists
+		if isinstance(value, Node):
+			stack.append((value, owner))
+		elif type(value) in (list, tuple):
+			for item in value:
+				self.collect(item, owner, stack)
+
+	def bind(self, owner, name):
+		if owner is None:
+			self.symbol_table.declare(name)
+		else:
+			owner.scope.add(name)
+
+########################################################
+##	TAIL CALLS
+########################################################
+
+##a call is in tail position when the value it gives is what the function it is in returns: the value of a RETURN,
+##the body of a FUN f(...) -> ..., and the cases of an IF that gives one of those. the tree walking engines hand such a
+##call back to the function that is running instead of calling it (TailCall, valuenode.py), and that function runs
+##the callee in the same Python frame, so the Python stack does not grow. when the callee's arguments hide every name
+##of the caller, its frame also takes the caller's place under the caller's parent (FramePool.tail, symboltable.py)
+##calls at the top level are never marked, there is no function to hand them back to
+
+def mark_tail_calls(node): ##sets CallNode.tail in place
+	stack = [(node, None)] ##(node, FuncDefNode it runs in or None for the top level)
+	tails = []
+	while stack:
+		current, owner = stack.pop()
+		if isinstance(current, FuncDefNode):
+			owner = current
+			if current.should_auto_return:
+				tails.append(current.body_node)
+		elif isinstance(current, ReturnNode) and owner and current.node_to_return:
+			tails.append(current.node_to_return)
+		for name in type(current).__slots__:
+			collect_nodes(getattr(current, name), owner, stack)
+
+	while tails:
+		current = tails.pop()
+		if isinstance(current, CallNode):
+			current.tail = True
+		elif isinstance(current, IfNode): ##a case that gives null instead of its value is not a tail
+			tails.extend(expr for condition, expr, should_return_null in current.cases if not should_return_null)
+			if current.else_case and not current.else_case[1]:
+				tails.append(current.else_case[0])
+	return node
+
+def collect_nodes(value, owner, stack):
+	if isinstance(value, Node):
+		stack.append((value, owner))
+	elif type(value) in (list, tuple):
+		for item in value:
+			collect_nodes(item, owner, stack)
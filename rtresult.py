@@ -45,6 +45,45 @@ class RTResult:
 		self.error = error
 		return self
 
+	def from_signal(self, signal): ##the RTResult a tree walking engine would have given instead of raising signal
+		if isinstance(signal, RTFailure):
+			return self.failure(signal.error)
+		if isinstance(signal, ReturnValue):
+			return self.success_return(signal.value)
+		if isinstance(signal, BreakLoop):
+			return self.success_break()
+		return self.success_continue()
+
 	def should_return(self):
 		# this will allow you to continue and break outside the current function
-		return (self.error or self.func_return_value or self.loop_should_continue or self.loop_should_break)
\ No newline at end of file
+		return (self.error or self.func_return_value or self.loop_should_continue or self.loop_should_break)
+########################################################
+##	RUNTIME SIGNALS
+########################################################
+
+##engines that do not hand an RTResult back from every node raise these instead, whatever runs a function or a loop
+##catches the ones meant for it, RTResult.from_signal turns one back into an RTResult where the two ways meet
+##and raise_signal turns an RTResult into its value or its signal
+
+class RTFailure(Exception): ##a runtime error
+	def __init__(self, error):
+		self.error = error
+
+class ReturnValue(Exception):
+	def __init__(self, value):
+		self.value = value
+
+class BreakLoop(Exception):
+	pass
+
+class ContinueLoop(Exception):
+	pass
+
+def raise_signal(res): ##value of an RTResult from code that hands back RTResults, its flags raised as signals
+	if res.error:
+		raise RTFailure(res.error)
+	if res.loop_should_break: ##a BREAK or CONTINUE in a function ends up in the caller's loop
+		raise BreakLoop()
+	if res.loop_should_continue:
+		raise ContinueLoop()
+	return res.value
@@ -6,13 +6,17 @@ def string_with_arrows(text, pos_start, pos_end):
     idx_end = text.find('\n', idx_start + 1)
     if idx_end < 0: idx_end = len(text)
     
+    # Lines and columns are only worked out here, the end is exclusive so it belongs to the line of the character before it
+    ln_start, col_start_first = pos_start.source.line_col(pos_start.idx)
+    ln_end, col_end_last = pos_end.source.end_line_col(pos_end.idx)
+
     # Generate each line
-    line_count = pos_end.ln - pos_start.ln + 1
+    line_count = max(ln_end - ln_start + 1, 1)
     for i in range(line_count):
         # Calculate line columns
         line = text[idx_start:idx_end]
-        col_start = pos_start.col if i == 0 else 0
-        col_end = pos_end.col if i == line_count - 1 else len(line) - 1
+        col_start = col_start_first if i == 0 else 0
+        col_end = col_end_last if i == line_count - 1 else len(line) - 1
 
         # Append to result
         result += line + '\n'
@@ -15,19 +15,238 @@ from context import *
 ##	SYMBOL TABLE
 ########################################################
 
+##a frame keeps the variables its Scope knows about in a list, the Resolver gives the nodes that use them the slot to index
+##names a frame's Scope does not know go into the symbols dict the way every variable used to
+##the global table (the one without a parent) grows its Scope as names are set, so every global has a slot
+##version moves on whenever a function is stored in or replaced in the table, a call site that remembered the function
+##it found in a table (CallSiteCache, interpreter.py) uses it until the version it saw is gone. other writes leave it
+##alone so a loop counter in the same table does not throw the caches away
+
+class Scope: ##names of one frame and the slot each of them lives in
+	def __init__(self, names=()):
+		self.slots = {} ##name -> index into SymbolTable.values
+		self.names = []
+		for name in names:
+			self.add(name)
+		self.arguments = len(self.names) ##a function's arguments take the first slots, unless a name was given twice
+		self.free = [] ##CallFrames of calls that returned, see FramePool
+
+	def add(self, name):
+		slot = self.slots.get(name)
+		if slot is None:
+			slot = self.slots[name] = len(self.names)
+			self.names.append(name)
+		return slot
+
+	def __len__(self):
+		return len(self.names)
+
+EMPTY_SCOPE = Scope() ##for frames nothing was resolved for, never added to
+
 class SymbolTable: ##the symbol table keeps track of functions 
-	def __init__(self, parent=None):
+	def __init__(self, parent=None, scope=None):
 		self.symbols = {}
 		self.parent = parent ##to keep track of global variables. 
+		self.root = parent.root if parent else self ##the global table at the end of the parent chain
+		if parent is None:
+			self.scope = scope if scope is not None else Scope()
+			self.shadowed = set() ##names some other frame may hold, a lookup of these has to walk the chain
+		else:
+			self.scope = scope if scope is not None else EMPTY_SCOPE
+		self.values = [None] * len(self.scope)
+		self.version = 0
+
+	def declare(self, name): ##slot of a global, made if it does not exist yet
+		slot = self.scope.add(name)
+		if slot == len(self.values):
+			self.values.append(None)
+		return slot
 
 	def get(self, name):
-		value = self.symbols.get(name,None)
-		if value == None and self.parent : ##check in parent symbol table
-			return self.parent.get(name)
-		return value
+		table = self
+		while True: ##a loop, tail calls let the chain grow far past Python's recursion limit
+			slot = table.scope.slots.get(name)
+			value = table.symbols.get(name,None) if slot is None else table.values[slot]
+			if value == None and table.parent : ##check in parent symbol table
+				table = table.parent
+				continue
+			return value
 
 	def set(self,name,value):
-		self.symbols[name] = value
+		slot = self.scope.slots.get(name)
+		if slot is not None:
+			self.store(slot, value)
+		elif self.parent is None:
+			self.store(self.declare(name), value)
+		else:
+			self.symbols[name] = value
+			self.root.shadowed.add(name) ##a global of that name can no longer be read straight from its slot
+
+	def store(self, slot, value): ##what every write to a slot goes through
+		old = self.values[slot]
+		self.values[slot] = value
+		if isinstance(value, BaseFunction) or isinstance(old, BaseFunction):
+			self.version += 1
 
 	def remove(self, name):
-		del self.symbols[name]
\ No newline at end of file
+		slot = self.scope.slots.get(name)
+		if slot is not None and self.values[slot] is not None:
+			self.store(slot, None)
+		else:
+			del self.symbols[name]
+
+########################################################
+##	CALL FRAMES
+########################################################
+
+##a function call runs in a CallFrame, the Context and the SymbolTable of one call made together, its arguments are
+##written straight into the first slots. once the call has returned, a frame that did not escape goes on the free list
+##of its function's Scope and the next call of that function takes it from there instead of making a Context, a
+##SymbolTable and its values.
+##a frame escapes when a value whose context is the frame is kept somewhere that outlives the call: put in a List
+##(a list literal, a loop's List, +, APPEND) or in a frame that escaped itself, which has the frame as its parent.
+##capture marks it and every frame above it, they are left as they were: a function value kept in a list still finds
+##the variables of the call that made it when it is called from there, and tracebacks that reach the frame see its
+##callers. a value kept in a slot is only ever read through located, which gives it the reading frame's context, and
+##the value a call returns is moved to the caller's context, so neither of them keeps a frame alive
+
+class CallFrame(Context):
+	def __init__(self, function, scope):
+		self.symbol_table = SymbolTable(function.context.symbol_table, scope)
+		self.blank = (None,) * len(scope) ##what the values go back to when the frame is freed
+		self.escaped = False ##set by capture, an escaped frame is never freed
+		self.enter(function)
+
+	def enter(self, function): ##sets the frame up for a call of function, whose context is the caller's
+		self.display_name = function.name
+		self.parent = function.context
+		self.entry_span = function.span
+		table = self.symbol_table
+		table.parent = function.context.symbol_table
+		table.root = table.parent.root
+
+	@property
+	def parent_entry_pos(self): ##only made when a traceback asks for it
+		return self.entry_span.pos_start if self.entry_span else None
+
+def capture(value): ##value is kept where it outlives the call it was made in, that call's frame must not be freed
+	context = value.context
+	while context is not None:
+		if type(context) is CallFrame:
+			if context.escaped: ##the frames above it were marked with it
+				return
+			context.escaped = True
+		context = context.parent
+
+class FramePool:
+	def __init__(self, limit=64):
+		self.limit = limit ##frames kept per Scope, a recursion deeper than that makes the rest of its frames each time
+		self.reset()
+
+	def reset(self):
+		self.made = 0
+		self.reused = 0
+		self.escaped = 0 ##frames captured during their call, left to the garbage collector
+
+	def enter(self, function, args): ##(frame of a call of function with args bound, None) or (None, error)
+		arg_names = function.arg_names
+		if len(args) != len(arg_names):
+			return None, function.check_args(arg_names, args).error
+		scope = function.scope or EMPTY_SCOPE
+		if scope.free:
+			frame = scope.free.pop()
+			frame.enter(function)
+			self.reused += 1
+		else:
+			frame = CallFrame(function, scope)
+			self.made += 1
+		if scope.arguments == len(arg_names):
+			frame.symbol_table.values[:len(args)] = args
+		else: ##a name given twice or a function that was not resolved, the way the symbol table always did it
+			function.populate_args(arg_names, args, frame)
+		return frame, None
+
+	def leave(self, frame, value): ##frame's call returned value, frame goes back on the free list unless it escaped
+		if frame.escaped:
+			self.escaped += 1
+			return
+		if value.context is frame: ##the caller makes its own handle of value right away
+			value.context = frame.parent
+		self.free(frame)
+
+	def tail(self, frame, function, args): ##frame's call ends in a tail call of function, gives the function to call
+		##in frame's place, or None when frame has to stay the callee's parent. the callee can take frame's place under
+		##frame's parent only when every name frame holds is one of its arguments: the callee's own frame answers every
+		##lookup frame could, so nothing sees the difference and a loop of tail calls does not grow the chain of frames
+		##every name lookup and traceback walks. a call with the wrong number of arguments fails from frame instead
+		if len(args) != len(function.arg_names) or not self.hidden(frame, function.arg_names):
+			return None
+		if function.context is frame: ##tracebacks show the callee as made where frame's call was
+			function = function.located(frame.entry_span, frame.parent)
+		if frame.escaped:
+			self.escaped += 1
+		else:
+			self.free(frame)
+		return function
+
+	def hidden(self, frame, arg_names): ##every name frame holds is in arg_names
+		table = frame.symbol_table
+		for name in table.symbols:
+			if name not in arg_names:
+				return False
+		names = table.scope.names
+		for slot, value in enumerate(table.values):
+			if value is not None and names[slot] not in arg_names:
+				return False
+		return True
+
+	def free(self, frame): ##clears frame and puts it on its Scope's free list
+		table = frame.symbol_table
+		table.values[:] = frame.blank
+		if table.symbols:
+			table.symbols.clear()
+		frame.parent = frame.entry_span = table.parent = None
+		table.version += 1 ##a call site cache that found a function in this table last call misses
+		if len(table.scope.free) < self.limit:
+			table.scope.free.append(frame)
+
+	def report(self):
+		calls = self.made + self.reused
+		return f'{calls} frames, {self.reused} reused ({self.reused / calls if calls else 0:.1%}), {self.escaped} escaped'
+
+frame_pool = FramePool()
+
+########################################################
+##	COUNTED LOOPS
+########################################################
+
+##every engine runs a FOR through for_loop: it binds the variable, yields, and the engine runs the body each time
+##when start, end and step are whole numbers it counts on a Python range and the variable holds one Number whose value
+##moves on with the loop instead of a new Number each time. reading the variable gives a handle of its own (located),
+##nothing else ever holds that Number, so no read sees it change. anything else counts the way FOR always did
+
+def for_loop(table, name, start_value, end_value, step_value):
+	i = start_value.value
+	step = step_value.value
+	up = step >= 0
+	end = end_value.value
+
+	if type(i) is int and type(end) is int and type(step) is int and step != 0:
+		counter = Number(0)
+		slot = table.scope.slots.get(name)
+		if slot is None and table.parent is None:
+			slot = table.declare(name)
+		values = table.values
+		for i in range(i, end, step):
+			counter.value = i
+			if slot is None: ##a frame nothing was resolved for keeps it in its symbols dict
+				table.set(name, counter)
+			elif values[slot] is not counter: ##first time round, or the body set the variable to something else
+				table.store(slot, counter)
+			yield True
+		return
+
+	while (i < end) if up else (i > end):
+		table.set(name, Number(i))
+		i += step
+		yield True
@@ -0,0 +1,71 @@
+########################################################
+##	IMPORTS
+########################################################
+import pytest
+import basic
+
+########################################################
+##	TAIL CALLS AND DEEP RECURSION
+########################################################
+
+COUNT = 'FUN count(n) -> IF n == 0 THEN 0 ELSE count(n - 1)\ncount(%d)'
+SUM = 'FUN s(n) -> IF n == 0 THEN 0 ELSE n + s(n - 1)\ns(%d)'
+FAIL_AT_END = 'FUN count(n) -> IF n == 0 THEN n + "s" ELSE count(n - 1)\ncount(1000)'
+
+def run(text, engine, **options):
+	value, error = basic.run('<test>', text, engine=engine, **options)
+	return (value.elements[-1].value if value else None), error
+
+@pytest.mark.parametrize('resolve', [True, False])
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_tail_calls_run_in_constant_stack(engine, resolve):
+	assert run(COUNT % 100000, engine, resolve=resolve) == (0, None)
+
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_tail_calls_take_the_callers_place(engine): ##the traceback at the bottom of the loop has the one frame
+	value, error = run(FAIL_AT_END, engine)
+	assert error.as_string().splitlines()[:3] == [
+		'Traceback (most recent call last):',
+		'  File <test>, line 2, in <program>',
+		'  File <test>, line 1, in count',
+	]
+	assert 'Illegal operation' in error.as_string().splitlines()[3]
+
+##a tail call only takes the place of a caller whose names are all arguments of the callee, any other caller stays
+##in the chain of frames so the callee still sees its names and tracebacks still show it
+CALLER_NAMES = {
+	'argument of the caller': ('FUN a(x) -> b()\nFUN b() -> x\na(1)', 1),
+	'local of the caller': ('FUN a()\n\tVAR x = 2\n\tRETURN b()\nEND\nFUN b() -> x\na()', 2),
+	'function made by the caller': ('FUN f(n) -> (FUN () -> n)()\nf(5)', 5),
+	'argument renamed': ('FUN a(x) -> b(x + 1)\nFUN b(y) -> x + y\na(1)', 3),
+}
+
+@pytest.mark.parametrize('resolve', [True, False])
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+@pytest.mark.parametrize('name', list(CALLER_NAMES))
+def test_tail_call_sees_the_callers_names(name, engine, resolve):
+	text, expected = CALLER_NAMES[name]
+	assert run(text, engine, resolve=resolve) == (expected, None)
+
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_tail_call_keeps_the_caller_in_tracebacks(engine):
+	value, error = run('FUN a(x) -> b()\nFUN b() -> x + "s"\na(1)', engine)
+	assert error.as_string().splitlines()[:4] == [
+		'Traceback (most recent call last):',
+		'  File <test>, line 3, in <program>',
+		'  File <test>, line 1, in a',
+		'  File <test>, line 2, in b',
+	]
+
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_deep_recursion_gives_value_or_runtime_error(engine):
+	for depth in (200, 3000, 20000):
+		value, error = run(SUM % depth, engine) ##a RecursionError out of run fails the test
+		if error:
+			assert 'Maximum recursion depth exceeded' in error.as_string()
+			assert 'in s' in error.generate_traceback()
+		else:
+			assert value == depth * (depth + 1) // 2
+
+def test_vm_recursion_is_not_limited_by_the_python_stack():
+	assert run(SUM % 20000, 'vm') == (200010000, None)
@@ -0,0 +1,98 @@
+########################################################
+##	IMPORTS
+########################################################
+import pytest
+import basic
+
+########################################################
+##	ENGINES
+########################################################
+
+##every program in the corpus runs on every engine in basic.ENGINES, with and without constant folding and slot
+##resolution, and has to give what the tree walker gives with neither: the same value, the same printed output and
+##the same error text, traceback included. globals stay set between runs, so a program sets every name it reads
+
+CORPUS = {
+	'arithmetic': '1 + 2 * 3 - 4 / 2\n2 ^ 3 ^ 2\n-(3 - 5) * +2\n7 - -1.5',
+	'comparisons': '[1 == 1, 1 != 1, 2 < 3, 3 <= 2, 4 > 1, 4 >= 5, 1 AND 0, 1 OR 0, NOT 0, NOT 1 == 2]',
+	'strings': 'VAR s = "ab"\ns + "cd"\ns * 3\nIS_STR(s)\nPRINT_RET([s, 1])',
+	'variables': 'VAR a = VAR b = 4\nVAR a = a + b\n[a, b]',
+	'lists': 'VAR l = [1, 2, 3]\nVAR m = l + 4\nVAR n = l - 0\n[l, m, n, m / 3, LEN(m)]',
+	'list handles': 'VAR l = [1]\nVAR k = l\nAPPEND(k, 2)\nEXTEND(l, [3, 4])\nPOP(k, 0)\n[l, k]',
+	'if': 'VAR x = 5\nIF x < 3 THEN "small" ELIF x < 10 THEN "medium" ELSE "large"\nIF x == 0 THEN 1',
+	'block if': 'VAR x = 0\nIF x == 0 THEN\n\tVAR y = 1\n\tVAR z = 2\nELSE\n\tVAR y = 3\nEND\ny',
+	'for': 'FOR i = 0 TO 5 THEN i * i\nFOR i = 10 TO 0 STEP -3 THEN i\nFOR i = 0 TO 1 STEP 0.25 THEN i',
+	'block for': 'VAR s = 0\nFOR i = 1 TO 101 THEN\n\tVAR s = s + i\nEND\ns',
+	'while': 'VAR i = 0\nWHILE i < 5 THEN VAR i = i + 1\nVAR j = 0\nWHILE j < 3 THEN\n\tVAR j = j + 1\nEND\nj',
+	'break and continue': 'VAR out = []\nFOR i = 0 TO 10 THEN\n\tIF i == 2 THEN CONTINUE\n\tIF i == 6 THEN BREAK\n\tAPPEND(out, i)\nEND\nout',
+	'functions': 'FUN add(a, b) -> a + b\nFUN twice(f, x) -> f(f(x, 1), 1)\nVAR anon = FUN (x) -> x * 10\n[add(1, 2), twice(add, 5), anon(4)]',
+	'block functions': 'FUN f(n)\n\tVAR t = 0\n\tFOR i = 0 TO n THEN\n\t\tVAR t = t + i\n\tEND\n\tRETURN t\nEND\nFUN g()\n\tVAR unused = 1\nEND\n[f(10), g()]',
+	'recursion': 'FUN fib(n) -> IF n < 2 THEN n ELSE fib(n - 1) + fib(n - 2)\nfib(12)',
+	'dynamic scope': 'FUN get() -> y\nFUN set(y) -> [get()]\nset(7)',
+	'break out of a function': 'FUN stop()\n\tBREAK\nEND\nVAR n = 0\nWHILE n < 10 THEN\n\tVAR n = n + 1\n\tIF n == 4 THEN stop()\nEND\nn',
+	'return at the top level': 'VAR a = 1\nRETURN a\nVAR a = 2',
+	'print': 'PRINT("hello")\nPRINT([1, "two"])\nFOR i = 0 TO 2 THEN PRINT(i)',
+	'memo': 'VAR fib = MEMO(FUN (n) -> IF n < 2 THEN n ELSE fib(n - 1) + fib(n - 2))\n[fib(30), MEMO_STATS(fib)]',
+	'closure in a returned list': 'FUN make(x) -> [FUN () -> x]\nVAR a = make(1)\nVAR b = make(2)\n[(a/0)(), (b/0)()]',
+	'closures appended': 'VAR store = []\nFUN make(x)\n\tAPPEND(store, VAR g = FUN () -> x)\n\tRETURN 0\nEND\nmake(1)\nmake(2)\n[(store/0)(), (store/1)()]',
+	'closures appended in a -> body': 'VAR store = []\nFUN make(x) -> APPEND(store, VAR g = FUN () -> x)\nmake(1)\nmake(2)\n[(store/0)(), (store/1)()]',
+	'closure of a callee': 'FUN inner() -> [FUN () -> y]\nFUN outer(y)\n\tVAR l = inner()\n\tRETURN l\nEND\nVAR a = outer(1)\nVAR b = outer(2)\n[(a/0)(), (b/0)()]',
+	'tail calls': 'FUN count(n) -> IF n == 0 THEN "done" ELSE count(n - 1)\ncount(20000)',
+	'mutual tail calls': 'FUN even(n) -> IF n == 0 THEN 1 ELSE odd(n - 1)\nFUN odd(n)\n\tIF n == 0 THEN RETURN 0\n\tRETURN even(n - 1)\nEND\n[even(20001), odd(20001)]',
+	'undefined variable': 'VAR a = 1\nnever_set + a',
+	'illegal operation': 'FUN f(x) -> x + "s"\nFUN g(x) -> [f(x)]\ng(1)',
+	'wrong argument count': 'FUN f(a, b) -> a\nf(1)',
+	'wrong argument count in a tail call': 'FUN f(a, b) -> a\nFUN g() -> f(1, 2, 3)\ng()',
+	'index out of bounds': 'VAR l = [1, 2]\nl / 5',
+	'builtin error': 'FUN f() -> APPEND(1, 2)\nf()',
+	'error in a tail loop': 'FUN count(n) -> IF n == 0 THEN n + "s" ELSE count(n - 1)\ncount(1000)',
+}
+
+##recursion that is not a tail call is only as deep as Python's stack on every engine but vm, which has its own:
+##it gives the value or a Run Time Error, never a RecursionError out of basic.run
+DEEP = {
+	'deep recursion 200': ('FUN s(n) -> IF n == 0 THEN 0 ELSE n + s(n - 1)\ns(200)', '20100'),
+	'deep recursion 3000': ('FUN s(n) -> IF n == 0 THEN 0 ELSE n + s(n - 1)\ns(3000)', '4501500'),
+	'deep list walk': ('FUN build(n) -> IF n == 0 THEN [] ELSE build(n - 1) + n\nLEN(build(5000))', '5000'),
+	'deep memoized recursion': ('VAR ms = MEMO(FUN (n) -> IF n == 0 THEN 0 ELSE n + ms(n - 1))\nms(3000)', '4501500'),
+}
+
+OPTIONS = [
+	pytest.param({}, id='plain'),
+	pytest.param({'optimize': True}, id='optimize'),
+	pytest.param({'resolve': False}, id='unresolved'),
+	pytest.param({'optimize': True, 'resolve': False}, id='optimize-unresolved'),
+]
+
+def run(text, capsys, engine='tree', **options):
+	value, error = basic.run('<test>', text, engine=engine, **options)
+	return repr(value) if value else None, error.as_string() if error else None, capsys.readouterr().out
+
+@pytest.mark.parametrize('options', OPTIONS)
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+@pytest.mark.parametrize('name', list(CORPUS))
+def test_engine_matches_tree_walker(name, engine, options, capsys):
+	expected = run(CORPUS[name], capsys)
+	assert run(CORPUS[name], capsys, engine, **options) == expected
+
+@pytest.mark.parametrize('options', OPTIONS)
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+@pytest.mark.parametrize('name', list(DEEP))
+def test_deep_recursion(name, engine, options, capsys):
+	text, expected = DEEP[name]
+	value, error, output = run(text, capsys, engine, **options)
+	if error:
+		assert 'Maximum recursion depth exceeded' in error
+	else:
+		assert value.endswith(f', {expected}]')
+	if engine == 'vm':
+		assert error is None
+
+##a list a memoized function gives is the caller's own, changing it changes neither the cache nor what others got
+MEMO_LISTS = 'VAR mf = MEMO(FUN (n) -> [n, [n]])\nVAR a = mf(1)\nAPPEND(a, 2)\nAPPEND(a/1, 3)\nVAR b = mf(1)\nAPPEND(b, 4)\n[a, b, mf(1)]'
+
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_memo_results_are_not_shared(engine, capsys):
+	value, error, output = run(MEMO_LISTS, capsys, engine)
+	assert error is None
+	assert value.endswith(', [[1, [1, 3], 2], [1, [1], 4], [1, [1]]]]')
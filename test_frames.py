@@ -0,0 +1,63 @@
+########################################################
+##	IMPORTS
+########################################################
+import pytest
+import basic
+from symboltable import *
+
+########################################################
+##	POOLED CALL FRAMES
+########################################################
+
+##every program runs on every engine with frames pooled and with frame_pool.limit 0, where nothing is ever put back
+##for reuse, and has to give the same value and error both ways. the programs keep a call's values past its return
+##(closures returned, kept in lists, kept in globals) so a frame that is reused too early shows up as a wrong value
+
+ESCAPES = {
+	'closure in a returned list': ('FUN make(x) -> [FUN () -> x]\nVAR a = make(1)\nVAR b = make(2)\n[(a/0)(), (b/0)()]', '[1, 2]'),
+	'closure added to a list': ('VAR store = []\nFUN keep(x) -> store + (FUN () -> x)\nVAR store = keep(1)\nVAR store = keep(2)\n[(store/0)(), (store/1)()]', '[1, 2]'),
+	'closure in a loop list': ('FUN make(x) -> FOR i = 0 TO 2 THEN FUN () -> x + i\nVAR a = make(10)\nmake(20)\n[(a/0)(), (a/1)()]', '[11, 11]'), ##both see the loop variable as the loop left it
+	'closure appended': ('VAR store = []\nFUN make(x)\nAPPEND(store, VAR g = FUN () -> x)\nRETURN 0\nEND\nmake(1)\n(store/0)()', '1'),
+	'closures appended': ('VAR store = []\nFUN make(x)\nAPPEND(store, VAR g = FUN () -> x)\nRETURN 0\nEND\nmake(1)\nmake(2)\n[(store/0)(), (store/1)()]', '[1, 2]'),
+	'closures appended in a -> body': ('VAR store = []\nFUN make(x) -> APPEND(store, VAR g = FUN () -> x)\nmake(1)\nmake(2)\n[(store/0)(), (store/1)()]', '[1, 2]'),
+	'closure of a callee': ('FUN inner() -> [FUN () -> y]\nFUN outer(y)\nVAR l = inner()\nRETURN l\nEND\nVAR a = outer(1)\nVAR b = outer(2)\n[(a/0)(), (b/0)()]', '[1, 2]'),
+	'closure in a global': ('FUN make(x) -> FUN () -> x\nVAR g = make(1)\nmake(2)\ng()', None), ##read through a variable the closure runs in its caller's frame
+	'list in a global': ('FUN pair(a, b) -> [a, b]\nVAR p = pair(1, 2)\nVAR q = pair(3, 4)\n[p, q]', '[[1, 2], [3, 4]]'),
+	'recursion': ('FUN fib(n) -> IF n < 2 THEN n ELSE fib(n - 1) + fib(n - 2)\nfib(15)', '610'),
+}
+
+def run(text, engine, resolve):
+	value, error = basic.run('<test>', text, engine=engine, resolve=resolve)
+	return (repr(value.elements[-1]) if value else None), (error.as_string() if error else None)
+
+def run_unpooled(text, engine, resolve):
+	limit = frame_pool.limit
+	frame_pool.limit = 0
+	EMPTY_SCOPE.free.clear() ##the frames of functions that were not resolved, left from earlier runs
+	try:
+		return run(text, engine, resolve)
+	finally:
+		frame_pool.limit = limit
+
+@pytest.mark.parametrize('resolve', [True, False])
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+@pytest.mark.parametrize('name', list(ESCAPES))
+def test_escaped_frames_are_not_reused(name, engine, resolve):
+	text, expected = ESCAPES[name]
+	pooled = run(text, engine, resolve)
+	assert pooled == run_unpooled(text, engine, resolve)
+	if expected is not None:
+		assert pooled == (expected, None)
+
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_frames_are_reused(engine):
+	frame_pool.reset()
+	assert run(ESCAPES['recursion'][0], engine, True) == ('610', None)
+	assert frame_pool.reused > frame_pool.made
+	assert frame_pool.escaped == 0
+
+@pytest.mark.parametrize('engine', list(basic.ENGINES))
+def test_list_keeps_frame(engine):
+	frame_pool.reset()
+	assert run(ESCAPES['closure in a returned list'][0], engine, True) == ('[1, 2]', None)
+	assert frame_pool.escaped == 2 ##the two calls of make
@@ -0,0 +1,77 @@
+########################################################
+##	IMPORTS
+########################################################
+import os
+import sys
+import pytest
+import basic
+
+########################################################
+##	DEEP NESTING
+########################################################
+
+##the parser keeps its own stack, so programs nested DEPTH deep go through basic.run in every parser mode and give
+##their value or the same syntax error the program gives when it is shallow, never a RecursionError. they run on vm,
+##which does not recurse either, and once on the tree walker, which may only fail with the runtime recursion error
+##DEPTH is already well past Python's recursion limit, BASIC_STRESS=1 python -m pytest test_parser.py runs them 100000
+##deep, which takes a few minutes
+
+DEPTH = 100000 if os.environ.get('BASIC_STRESS') else 5000
+
+def nested_ifs(depth, ends=0): return 'IF 1 THEN\n' * depth + '1\n' + 'END\n' * (depth + ends)
+def inline_ifs(depth): return 'IF 1 THEN ' * depth + '1' + ' ELSE 2' * depth
+def parens(depth, closed=0): return '(' * depth + '1' + ')' * (depth + closed)
+def sum_of(depth, tail=''): return ' + '.join(['1'] * depth) + tail
+
+NESTED = {
+	'if blocks': (nested_ifs, '0'), ##a block IF gives null
+	'inline ifs': (inline_ifs, '1'),
+	'parens': (parens, '1'),
+	'sum': (sum_of, str(DEPTH)),
+}
+
+SYNTAX_ERRORS = {
+	'one END too many': lambda depth: nested_ifs(depth, ends=1),
+	'unclosed paren': lambda depth: parens(depth, closed=-1),
+	'sum ending in +': lambda depth: sum_of(depth, tail=' +'),
+}
+
+MODES = [
+	pytest.param({}, id='pratt'),
+	pytest.param({'pratt': False}, id='classic'),
+	pytest.param({'stream': True}, id='stream'),
+	pytest.param({'buffer': True}, id='buffer'),
+	pytest.param({'packrat': True}, id='packrat'),
+]
+
+def test_depth_is_past_the_recursion_limit():
+	assert DEPTH > 4 * sys.getrecursionlimit()
+
+def run(text, engine='vm', **options):
+	value, error = basic.run('<test>', text, engine=engine, **options)
+	return (repr(value.elements[-1]) if value else None), error
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', list(NESTED))
+def test_deep_nesting_gives_value(name, mode):
+	make, expected = NESTED[name]
+	assert run(make(DEPTH), **mode) == (expected, None)
+
+@pytest.mark.parametrize('mode', MODES)
+@pytest.mark.parametrize('name', list(SYNTAX_ERRORS))
+def test_deep_nesting_gives_syntax_error(name, mode):
+	make = SYNTAX_ERRORS[name]
+	value, error = run(make(DEPTH), **mode)
+	shallow_value, shallow_error = run(make(3), **mode)
+	assert value is None and shallow_value is None
+	assert error.error_name == shallow_error.error_name == 'Invalid Syntax'
+	assert error.details == shallow_error.details
+
+@pytest.mark.parametrize('name', list(NESTED))
+def test_deep_nesting_on_the_tree_walker(name):
+	make, expected = NESTED[name]
+	value, error = run(make(DEPTH), engine='tree')
+	if error:
+		assert error.details == 'Maximum recursion depth exceeded'
+	else:
+		assert value == expected
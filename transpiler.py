@@ -0,0 +1,512 @@
+########################################################
+##	IMPORTS
+########################################################
+from strings_with_arrows import *
+import string
+import os
+import math
+import ast
+import hashlib
+import constants
+from error import *
+from position import *
+from lexer import *
+from nodes import *
+from rtresult import *
+from valuenode import *
+from context import *
+from symboltable import *
+from resolver import *
+from operators import *
+from optimizer import COMPARISON_TYPES
+from closures import CompiledFunction, run_compiled
+
+########################################################
+##	TRANSPILER
+########################################################
+
+##writes the tree out as Python source, one def for the program and one for every function body, and runs it with
+##compile/exec, so FOR and WHILE loops become Python loops, IF becomes if and variables are indexed straight in a def
+##values are still Numbers, Strings, Lists and Functions with their spans and contexts, every operation that is not
+##on two Numbers goes through the operator table the Interpreter uses, so results, errors and crashes stay the same
+##
+##an arithmetic expression made only of number literals, variables and operators that can not fail on Numbers is
+##worked out on plain Python numbers once every variable in it is a Number, only its result is made a Number.
+##otherwise (or when a variable is not set) the expression is run one operator at a time the Interpreter's way
+##
+##BREAK and CONTINUE are Python's break and continue in the loop they are written in, anywhere else (a function body,
+##a WHILE condition) they raise BreakLoop/ContinueLoop for the caller's loop to catch, a RETURN is Python's return
+##
+##the code object is cached by a hash of the source text and the shape of the tree, running the same program again
+##only puts its nodes (kept for spans and error positions) in the globals of a new exec. line numbers in the code
+##object are the BASIC source lines, a Python traceback out of a program points at the line it came from
+
+MAX_NESTING = 100 ##deeper trees run on the closure engine, Python's compiler has limits on nested blocks and brackets
+MAX_CACHED = 256 ##code objects kept in CODE_CACHE, the oldest goes first
+
+CODE_CACHE = {} ##(file name, base, source hash, tree shape) -> code object, None for a tree Python can not compile
+
+PYTHON_OPERATORS = { ##what Number's methods do with the two values, {0} and {1} are the left and right value
+	'added_to': '({0} + {1})',
+	'subbed_by': '({0} - {1})',
+	'multed_by': '({0} * {1})',
+	'dived_by': '({0} / {1})', ##only with a number literal other than 0 on the right, dived_by has no result for 0
+	'powed_by': '({0} ** {1})',
+	'get_comparison_eq': 'int({0} == {1})',
+	'get_comparison_ne': 'int({0} != {1})',
+	'get_comparison_lt': 'int({0} < {1})',
+	'get_comparison_gt': 'int({0} > {1})',
+	'get_comparison_lte': 'int({0} <= {1})',
+	'get_comparison_gte': 'int({0} >= {1})',
+	'anded_by': 'int({0} and {1})',
+	'ored_by': 'int({0} or {1})',
+}
+
+class PyFunction(CompiledFunction): ##a function whose body was transpiled, code returns the value the call gives
+	__slots__ = ()
+
+	def call(self, args):
+		function = self
+		while True: ##a call in tail position comes back as a TailCall and is made here
+			exec_ctx, error = frame_pool.enter(function, args)
+			if error:
+				raise RTFailure(error)
+			try:
+				value = function.code(exec_ctx)
+			except RecursionError: ##a call that does not fit on Python's stack fails where it was made
+				raise RTFailure(recursion_error(function, function.context)) from None
+			if type(value) is not TailCall:
+				frame_pool.leave(exec_ctx, value)
+				return value
+			function, args = frame_pool.tail(exec_ctx, value.function, value.args) or value.function, value.args ##a frame that stays is left to the garbage collector
+
+	def copy(self):
+		copy = PyFunction(self.name, self.body_node, self.arg_names, self.should_auto_return, self.scope, self.code)
+		copy.set_context(self.context)
+		copy.set_span(self.span)
+		return copy
+
+##helpers the generated code calls for everything that is not on two Numbers
+
+def binop(left, right, name, node):
+	result, error = BINARY_OPERATIONS[name][type(left), type(right)](left, right)
+	if error:
+		raise RTFailure(error)
+	return result.set_span(node)
+
+def unary(value, name, node):
+	number, error = UNARY_OPERATIONS[name][type(value)](value) ##the Interpreter does not check error either
+	return number.set_span(node)
+
+def undefined(node, name, context):
+	return RTFailure(RTError(node.pos_start, node.pos_end, f'{name} is not defined', context))
+
+RUNTIME = {
+	'Number': Number, 'String': String, 'List': List, 'PyFunction': PyFunction, 'BuiltInFunction': BuiltInFunction, 'TailCall': TailCall, 'binop': binop, 'unary': unary,
+	'undefined': undefined, 'raise_signal': raise_signal, 'RTFailure': RTFailure, 'for_loop': for_loop,
+	'BreakLoop': BreakLoop, 'ContinueLoop': ContinueLoop,
+}
+
+class Transpiler:
+	def transpile(self, node, nodes): ##Python source for the tree, nodes is every node in it, N[i] in the source is nodes[i]
+		self.index = {current: i for i, current in enumerate(nodes)}
+		self.lines = [] ##(indent, text, BASIC line)
+		self.line = 1
+		self.temps = 0
+		self.plain = False ##True while writing the one operator at a time way of an expression worked out on plain numbers
+		self.pending = [] ##FuncDefNodes whose bodies still need a def
+		self.define('program', node, None)
+		while self.pending:
+			func_def = self.pending.pop(0)
+			self.define(f'body_{self.index[func_def]}', func_def.body_node, func_def)
+		source = '\n'.join('\t' * indent + text for indent, text, line in self.lines)
+		return source, [line for indent, text, line in self.lines]
+
+	def define(self, name, body, func_def): ##a def for the program (func_def None) or for a function's body
+		self.function = func_def
+		self.loops = [] ##'body' or 'condition' for each Python loop the code being written is in
+		self.indent = 0
+		self.emit(f'def {name}(context):')
+		self.indent = 1
+		self.emit('table = context.symbol_table')
+		self.emit('values = table.values')
+		self.emit('root_values = table.root.values')
+		self.emit('shadowed = table.root.shadowed')
+		value = self.gen(body)
+		if func_def is None or func_def.should_auto_return:
+			self.emit(f'return {value}')
+		else:
+			self.emit('return Number.null')
+		self.indent = 0
+		self.emit('')
+
+	def emit(self, text):
+		self.lines.append((self.indent, text, self.line))
+
+	def temp(self):
+		self.temps += 1
+		return f'_t{self.temps}'
+
+	def node(self, node): ##how the source refers to node
+		return f'N[{self.index[node]}]'
+
+	def gen(self, node): ##writes the code for node, returns the Python expression for its Value
+		line = self.line
+		self.line = node.pos_start.ln + 1
+		if self.fusable(node) and not self.plain and not isinstance(node, (NumberNode, VarAccessNode)):
+			value = self.gen_fused(node)
+		else:
+			value = getattr(self, f'gen_{type(node).__name__}')(node)
+		self.line = line
+		return value
+
+	def gen_condition(self, node): ##writes the code for node, returns a Python expression for whether its Value is true
+		if self.fusable(node) and not self.plain and not isinstance(node, (NumberNode, VarAccessNode)):
+			return self.gen_fused(node, condition=True)
+		return f'{self.gen(node)}.is_true()'
+
+	def block(self, lines_of): ##runs lines_of() one level deeper
+		self.indent += 1
+		lines_of()
+		self.indent -= 1
+
+	##########################################
+	##	plain numbers
+
+	def method(self, node):
+		return binary_name(node.op_tok)
+
+	def fusable(self, node): ##node can be worked out on plain numbers, only literals, variables and safe operators
+		if isinstance(node, NumberNode):
+			return type(node.tok.value) in (int, float)
+		if isinstance(node, VarAccessNode):
+			return True
+		if isinstance(node, UnaryOpNode):
+			return self.fusable(node.node)
+		if isinstance(node, BinOpNode):
+			method = self.method(node)
+			if method == 'dived_by' and not (isinstance(node.right_node, NumberNode) and node.right_node.tok.value != 0):
+				return False
+			return self.fusable(node.left_node) and self.fusable(node.right_node)
+		return False
+
+	def literal(self, value):
+		if type(value) is float and not math.isfinite(value):
+			return f"float('{value}')"
+		return f'({value!r})' if value < 0 else repr(value)
+
+	def raw(self, node, variables): ##Python expression for node's value, variables gets a temp for each variable read
+		if isinstance(node, NumberNode):
+			return self.literal(node.tok.value)
+		if isinstance(node, VarAccessNode):
+			value = self.temp()
+			variables.append(value)
+			self.emit(f'{value} = {self.read(node)}')
+			return f'{value}.value'
+		if isinstance(node, UnaryOpNode):
+			operand = self.raw(node.node, variables)
+			if node.op_tok.type == TT_MINUS:
+				return f'({operand} * -1)'
+			if node.op_tok.matches(TT_KEYWORD, 'NOT'):
+				return f'(1 if {operand} == 0 else 0)'
+			return operand
+		left = self.raw(node.left_node, variables)
+		right = self.raw(node.right_node, variables)
+		return PYTHON_OPERATORS[self.method(node)].format(left, right)
+
+	def gen_fused(self, node, condition=False):
+		variables = []
+		expr = self.raw(node, variables)
+		check = ' and '.join(f'type({value}) is Number' for value in variables) or 'True'
+		result = self.temp()
+		self.emit(f'if {check}:')
+		if condition:
+			if isinstance(node, BinOpNode) and node.op_tok.type in COMPARISON_TYPES: ##already True or False
+				self.block(lambda: self.emit(f'{result} = {expr[4:-1]}'))
+			else:
+				self.block(lambda: self.emit(f'{result} = {expr} != 0'))
+		else:
+			self.block(lambda: self.emit(f'{result} = Number({expr}); {result}.context = context; {result}.span = {self.node(node)}'))
+		self.emit('else: ##some variable is not a Number or not set, the Interpreter\'s way one operator at a time')
+		def slow():
+			self.plain = True
+			value = getattr(self, f'gen_{type(node).__name__}')(node)
+			self.plain = False
+			self.emit(f'{result} = {value}.is_true()' if condition else f'{result} = {value}')
+		self.block(slow)
+		return result
+
+	##########################################
+
+	def gen_NumberNode(self, node):
+		value = self.temp()
+		self.emit(f'{value} = Number({self.literal(node.tok.value)}); {value}.context = context; {value}.span = {self.node(node)}')
+		return value
+
+	def gen_StringNode(self, node):
+		value = self.temp()
+		self.emit(f'{value} = String({node.tok.value!r}); {value}.context = context; {value}.span = {self.node(node)}')
+		return value
+
+	def read(self, node): ##Python expression for the variable's Value as it is stored, None when it is not set
+		name = repr(node.var_name_tok.value)
+		if node.depth == LOCAL: ##not set in this frame (yet), the chain decides
+			return f'values[{node.slot}] if values[{node.slot}] is not None or table.parent is None else table.parent.get({name})'
+		if node.depth == GLOBAL:
+			return f'table.get({name}) if {name} in shadowed else root_values[{node.slot}]'
+		return f'table.get({name})'
+
+	def gen_VarAccessNode(self, node):
+		value = self.temp()
+		self.emit(f'{value} = {self.read(node)}')
+		self.emit(f'if {value} is None: raise undefined({self.node(node)}, {node.var_name_tok.value!r}, context)')
+		self.emit(f'{value} = {value}.located({self.node(node)}, context)')
+		return value
+
+	def gen_VarAssignNode(self, node):
+		value = self.gen(node.value_node)
+		if node.depth == LOCAL:
+			self.emit(f'table.store({node.slot}, {value})')
+		else:
+			self.emit(f'table.set({node.var_name_tok.value!r}, {value})')
+		return value
+
+	def gen_ListNode(self, node):
+		if node.effect_only: ##every statement's code is written, the temps holding their values are just not used
+			for element_node in node.element_nodes:
+				self.gen(element_node)
+			return 'Number.null'
+		elements = [self.gen(element_node) for element_node in node.element_nodes]
+		value = self.temp()
+		self.emit(f'{value} = List([{", ".join(elements)}]).set_context(context).set_span({self.node(node)})')
+		return value
+
+	def gen_BinOpNode(self, node):
+		left = self.gen(node.left_node)
+		method = self.method(node)
+		value = self.temp()
+		span = self.node(node)
+		expr = PYTHON_OPERATORS[method]
+		if isinstance(node.right_node, NumberNode) and not (method == 'dived_by' and node.right_node.tok.value == 0):
+			self.emit(f'if type({left}) is Number:') ##x + 1, n - 1, n == 0 ... the literal's Number is only made when a method needs it
+			self.block(lambda: self.emit(f'{value} = Number({expr.format(left + ".value", self.literal(node.right_node.tok.value))}); {value}.context = {left}.context; {value}.span = {span}'))
+			self.emit('else:')
+			def slow():
+				right = self.gen(node.right_node)
+				self.emit(f'{value} = binop({left}, {right}, {method!r}, {span})')
+			self.block(slow)
+			return value
+		right = self.gen(node.right_node)
+		check = f'type({left}) is Number and type({right}) is Number'
+		if method == 'dived_by':
+			check += f' and {right}.value != 0'
+		self.emit(f'if {check}:')
+		self.block(lambda: self.emit(f'{value} = Number({expr.format(left + ".value", right + ".value")}); {value}.context = {left}.context; {value}.span = {span}'))
+		self.emit(f'else: {value} = binop({left}, {right}, {method!r}, {span})')
+		return value
+
+	def gen_UnaryOpNode(self, node):
+		operand = self.gen(node.node)
+		span = self.node(node)
+		if node.op_tok.type == TT_MINUS:
+			value = self.temp()
+			self.emit(f'if type({operand}) is Number:')
+			self.block(lambda: self.emit(f'{value} = Number({operand}.value * -1); {value}.context = {operand}.context; {value}.span = {span}'))
+			self.emit(f'else: {value} = unary({operand}, \'negated\', {span})')
+			return value
+		value = self.temp()
+		self.emit(f'{value} = unary({operand}, {unary_name(node.op_tok)!r}, {span})')
+		return value
+
+	def gen_IfNode(self, node):
+		value = self.temp() ##None until a case is taken
+		self.emit(f'{value} = None')
+		cases = [(condition, expr, should_return_null) for condition, expr, should_return_null in node.cases]
+		if node.else_case:
+			cases.append((None,) + tuple(node.else_case))
+		for i, (condition, expr, should_return_null) in enumerate(cases):
+			def case(condition=condition, expr=expr, should_return_null=should_return_null):
+				if condition is not None:
+					self.emit(f'if {self.gen_condition(condition)}:')
+				def take():
+					case_value = self.gen(expr)
+					self.emit(f'{value} = Number.null' if should_return_null else f'{value} = {case_value}')
+				if condition is not None:
+					self.block(take)
+				else:
+					take()
+			if i == 0:
+				case()
+			else:
+				self.emit(f'if {value} is None:')
+				self.block(case)
+		self.emit(f'if {value} is None: {value} = Number.null')
+		return value
+
+	def loop_body(self, node, elements):
+		self.loops.append('body')
+		self.emit('try:')
+		def body():
+			value = self.gen(node.body_node)
+			if not node.should_return_null: ##the list is thrown away otherwise
+				self.emit(f'{elements}.append({value})')
+		self.block(body)
+		self.emit('except ContinueLoop: continue')
+		self.emit('except BreakLoop: break')
+		self.loops.pop()
+
+	def loop_value(self, node, elements):
+		if node.should_return_null:
+			return 'Number.null'
+		value = self.temp()
+		self.emit(f'{value} = List({elements}).set_context(context).set_span({self.node(node)})')
+		return value
+
+	def gen_ForNode(self, node):
+		start = self.gen(node.start_value_node)
+		end = self.gen(node.end_value_node)
+		step = self.gen(node.step_value_node) if node.step_value_node else None
+		elements = self.temp()
+		self.emit(f'{elements} = []')
+		self.emit(f'for _ in for_loop(table, {node.var_name_tok.value!r}, {start}, {end}, {step or "Number(1)"}):')
+		self.block(lambda: self.loop_body(node, elements))
+		return self.loop_value(node, elements)
+
+	def gen_WhileNode(self, node):
+		elements = self.temp()
+		self.emit(f'{elements} = []')
+		self.emit('while True:')
+		def iteration():
+			self.loops.append('condition') ##a BREAK in the condition is for the loop around this one
+			condition = self.gen_condition(node.condition_node)
+			self.loops.pop()
+			self.emit(f'if not {condition}: break')
+			self.loop_body(node, elements)
+		self.block(iteration)
+		return self.loop_value(node, elements)
+
+	def gen_FuncDefNode(self, node):
+		self.pending.append(node)
+		value = self.temp()
+		func_name = node.var_name_tok.value if node.var_name_tok else None
+		arg_names = [arg_name.value for arg_name in node.arg_name_toks]
+		span = self.node(node)
+		self.emit(f'{value} = PyFunction({func_name!r}, {span}.body_node, {arg_names!r}, {node.should_auto_return!r}, {span}.scope, body_{self.index[node]}).set_context(context).set_span({span})')
+		if func_name:
+			self.emit(f'table.set({func_name!r}, {value})')
+		return value
+
+	def gen_CallNode(self, node):
+		callee = self.gen(node.node_to_call)
+		span = self.node(node)
+		self.emit(f'{callee} = {callee}.copy(); {callee}.span = {span}')
+		args = [self.gen(arg_node) for arg_node in node.arg_nodes]
+		value = self.temp()
+		if node.tail and self.function: ##the value goes straight to the return, PyFunction.call makes the call
+			self.emit(f'if type({callee}) is PyFunction: {value} = TailCall({callee}, [{", ".join(args)}])')
+			self.emit('else:')
+			self.block(lambda: self.emit_call(callee, args, value, span))
+			return value
+		self.emit_call(callee, args, value, span)
+		return value
+
+	def emit_call(self, callee, args, value, span): ##the call made here, its value copied onto the call node
+		self.emit(f'if type({callee}) is PyFunction: {value} = {callee}.call([{", ".join(args)}])')
+		self.emit(f'elif type({callee}) is BuiltInFunction: {value} = {callee}.call([{", ".join(args)}])')
+		self.emit(f'else: {value} = raise_signal({callee}.execute([{", ".join(args)}])) ##other engines\' functions, values that can not be called')
+		self.emit(f'{value} = {value}.located({span}, context)')
+
+	def gen_ReturnNode(self, node):
+		value = self.gen(node.node_to_return) if node.node_to_return else 'Number.null'
+		self.emit(f'return {value}' if self.function else 'return None') ##a RETURN outside a function ends the program
+		return 'Number.null'
+
+	def gen_ContinueNode(self, node):
+		self.emit('continue' if self.loops and self.loops[-1] == 'body' else 'raise ContinueLoop()')
+		return 'Number.null'
+
+	def gen_BreakNode(self, node):
+		self.emit('break' if self.loops and self.loops[-1] == 'body' else 'raise BreakLoop()')
+		return 'Number.null'
+
+########################################################
+##	CODE CACHE
+########################################################
+
+def tree_nodes(node): ##every node in the tree parents first, its shape (for the cache key) and how deep it goes
+	nodes = []
+	shape = []
+	depth = 0
+	stack = [(node, 1)]
+	while stack: ##without recursion, trees can be nested far deeper than Python's stack
+		current, level = stack.pop()
+		nodes.append(current)
+		depth = max(depth, level)
+		if isinstance(current, (VarAccessNode, VarAssignNode)):
+			shape.append((type(current), current.depth, current.slot))
+		elif isinstance(current, ListNode):
+			shape.append((ListNode, current.effect_only))
+		elif isinstance(current, (ForNode, WhileNode)):
+			shape.append((type(current), current.should_return_null))
+		else:
+			shape.append(type(current))
+		for name in type(current).__slots__:
+			collect(getattr(current, name), level + 1, stack)
+	return nodes, tuple(shape), depth
+
+def collect(value, level, stack): ##child nodes in a slot, IF cases and the else case are tuples inside lists
+	if isinstance(value, Node):
+		stack.append((value, level))
+	elif type(value) in (list, tuple):
+		for item in value:
+			collect(item, level, stack)
+
+def compile_tree(node, nodes, depth):
+	if depth > MAX_NESTING:
+		return None
+	try:
+		source, lines = Transpiler().transpile(node, nodes)
+		tree = ast.parse(source)
+	except (RecursionError, MemoryError, SyntaxError):
+		return None
+	for python_node in ast.walk(tree): ##generated line -> the BASIC line it came from
+		if hasattr(python_node, 'lineno'):
+			python_node.lineno = lines[python_node.lineno - 1]
+			python_node.end_lineno = lines[python_node.end_lineno - 1] if python_node.end_lineno else python_node.lineno
+			if python_node.end_lineno < python_node.lineno:
+				python_node.end_lineno = python_node.lineno
+	try:
+		return compile(tree, node.source.fn, 'exec')
+	except (RecursionError, MemoryError, SyntaxError, ValueError):
+		return None
+
+def load(node): ##the program's def from the cache or newly compiled, None when Python can not compile the tree
+	nodes, shape, depth = tree_nodes(node)
+	key = (node.source.fn, node.source.base, hashlib.sha1(node.source.ftxt.encode(errors='surrogatepass')).digest(), shape)
+	if key in CODE_CACHE:
+		code = CODE_CACHE[key]
+	else:
+		code = compile_tree(node, nodes, depth)
+		if len(CODE_CACHE) >= MAX_CACHED:
+			del CODE_CACHE[next(iter(CODE_CACHE))]
+		CODE_CACHE[key] = code
+	if code is None:
+		return None
+	namespace = dict(RUNTIME, N=nodes)
+	exec(code, namespace)
+	return namespace['program']
+
+def run_transpiled(node, context): ##transpile the tree and run it, gives the RTResult Interpreter.visit would
+	program = load(node)
+	if program is None: ##nested too deep for Python's compiler
+		return run_compiled(node, context)
+	try:
+		return RTResult().success(program(context))
+	except (RTFailure, ReturnValue, BreakLoop, ContinueLoop) as signal:
+		return RTResult().from_signal(signal)
+	except RecursionError: ##nested deeper than Python's stack outside any function
+		return RTResult().failure(recursion_error(node, context))
+
+def transpile(node): ##the Python source run_transpiled runs for the tree, for reading
+	nodes, shape, depth = tree_nodes(node)
+	return Transpiler().transpile(node, nodes)[0]
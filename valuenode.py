@@ -2,6 +2,7 @@ from strings_with_arrows import *
 import string
 import os
 import math
+import inspect
 import constants
 from error import *
 from position import *
@@ -14,17 +15,35 @@ from rtresult import *
 ########################################################
 
 ##for storing numbers and operating on them with other numbers. 
+##a Value is a handle: the payload (a number, a string's text, a list's elements) is never changed in place by an
+##operator and is shared between handles, the span and context say where this handle was read or made. reading a
+##variable gives a new handle through located instead of copying the value and setting its span and context after
+
+new_value = object.__new__
 
 class Value:
+	__slots__ = ('span', 'context')
+
 	def __init__(self):
 		self.set_pos()
 		self.set_context()
 
 	def set_pos(self, pos_start = None, pos_end = None): ## if we face an error we need to know where the error is in 
-		self.pos_start = pos_start
-		self.pos_end = pos_end
+		self.span = Span(pos_start, pos_end) if pos_start else None
+		return self
+
+	def set_span(self, span): ##usually the node the value came from, its Positions are only made if an error asks for them
+		self.span = span
 		return self
 
+	@property
+	def pos_start(self):
+		return self.span.pos_start if self.span else None
+
+	@property
+	def pos_end(self):
+		return self.span.pos_end if self.span else None
+
 	def set_context(self, context=None):##Context for error handling 
 		self.context = context
 		return self
@@ -77,6 +96,9 @@ class Value:
 	def copy(self):
 		raise Exception('No copy method defined')
 
+	def located(self, span, context): ##the value as read at span in context
+		return self.copy().set_span(span).set_context(context)
+
 	def is_true(self):
 		return False
 
@@ -86,6 +108,8 @@ class Value:
 		return RTError(self.pos_start, other.pos_end,'Illegal operation',self.context)
 
 class String(Value):
+	__slots__ = ('value',)
+
 	def __init__(self, value):
 		super().__init__()
 		self.value = value
@@ -106,10 +130,14 @@ class String(Value):
 		return len(self.value) > 0
 
 	def copy(self):
-		copy = String(self.value)
-		copy.set_pos(self.pos_start, self.pos_end)
-		copy.set_context(self.context)
-		return copy
+		return self.located(self.span, self.context)
+
+	def located(self, span, context):
+		handle = new_value(String)
+		handle.value = self.value
+		handle.span = span
+		handle.context = context
+		return handle
 
 	def __str__(self):
 		return self.value
@@ -118,10 +146,12 @@ class String(Value):
 		return f'"{self.value}"'
 
 class Number(Value):
+	__slots__ = ('value',)
+
 	def __init__(self,value):
 		self.value = value
-		self.set_pos()
-		self.set_context()
+		self.span = None
+		self.context = None
 
 	def added_to(self,other):
 		if isinstance(other, Number): ##check if the value that we are operating on is a number
@@ -213,10 +243,14 @@ class Number(Value):
 		return self.value != 0
 
 	def copy(self):
-		copy = Number(self.value)
-		copy.set_pos(self.set_pos,self.pos_end)
-		copy.set_context(self.context)
-		return copy
+		return self.located(self.span, self.context)
+
+	def located(self, span, context):
+		handle = new_value(Number)
+		handle.value = self.value
+		handle.span = span
+		handle.context = context
+		return handle
 
 	def __repr__(self):
 		return str(self.value)
@@ -227,13 +261,15 @@ Number.false = Number(0)
 Number.math_PI = Number(math.pi)
 
 class BaseFunction(Value):
+	__slots__ = ('name',)
+
 	def __init__(self, name):
 		super().__init__()
 		self.name = name or "<anonymous>" ##anonymous if it doesnt have a name 
 
-	def generate_new_context(self): ##new context for new function 
+	def generate_new_context(self, scope=None): ##new context for new function 
 		new_context = Context(self.name, self.context, self.pos_start)
-		new_context.symbol_table = SymbolTable(new_context.parent.symbol_table)
+		new_context.symbol_table = SymbolTable(new_context.parent.symbol_table, scope)
 		return new_context
 
 	def check_args(self, arg_names, args): ##check if there are the correct numbr of arguments 
@@ -263,249 +299,380 @@ class BaseFunction(Value):
 		return res.success(None)
 
 class Function(BaseFunction):
-	def __init__(self, name, body_node, arg_names, should_auto_return):
+	__slots__ = ('body_node', 'arg_names', 'should_auto_return', 'scope')
+
+	def __init__(self, name, body_node, arg_names, should_auto_return, scope=None):
 		super().__init__(name)
 		self.body_node = body_node
 		self.arg_names = arg_names
 		self.should_auto_return = should_auto_return
+		self.scope = scope ##Scope the Resolver made for the body, None if it was not resolved
 
 	def execute(self, args): ##execute functions 
 		res = RTResult()
-		interpreter = Interpreter()
-		exec_ctx = self.generate_new_context()
-
-		res.register(self.check_and_populate_args(self.arg_names, args, exec_ctx))
-		if res.error: 
-			return res
-
-		value = res.register(interpreter.visit(self.body_node, exec_ctx))
-		if res.should_return() and res.func_return_value == None: return res
-
-		ret_value = (value if self.should_auto_return else None) or res.func_return_value or Number.null
-
-		return res.success(ret_value)
+		function = self
+		while True: ##a call in tail position comes back as a TailCall and runs here, in the same Python frame
+			exec_ctx, error = frame_pool.enter(function, args) ##a CallFrame, see symboltable.py
+			if error: 
+				return res.failure(error)
+
+			try:
+				value = res.register(self.interpreter.visit(function.body_node, exec_ctx))
+			except RecursionError: ##a call that does not fit on Python's stack fails where it was made
+				return res.failure(recursion_error(function, function.context))
+			if res.should_return() and res.func_return_value == None: return res
+
+			ret_value = (value if function.should_auto_return else None) or res.func_return_value or Number.null
+			if type(ret_value) is not TailCall:
+				frame_pool.leave(exec_ctx, ret_value)
+				return res.success(ret_value)
+			function, args = frame_pool.tail(exec_ctx, ret_value.function, ret_value.args) or ret_value.function, ret_value.args ##a frame that stays is left to the garbage collector
 
 	def copy(self):
-		copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return)
+		copy = Function(self.name, self.body_node, self.arg_names, self.should_auto_return, self.scope)
 		copy.set_context(self.context)
-		copy.set_pos(self.pos_start, self.pos_end)
+		copy.set_span(self.span)
 		return copy
 
 	def __repr__(self):
 		return f"<function {self.name}>"
 
+class TailCall: ##a call in tail position (CallNode.tail) the running function makes itself instead of its caller
+	__slots__ = ('function', 'args')
+
+	def __init__(self, function, args):
+		self.function = function ##the copy the call node made, its context is the caller's frame
+		self.args = args
+
 class BuiltInFunction(BaseFunction):
-  def __init__(self, name):
+  __slots__ = ('implementation', 'arg_names')
+
+  ##a builtin is a plain Python function(function, *args) giving (result, error) like an operator implementation,
+  ##function is the handle the call was made on (its span and context say where the call is) and the arguments come
+  ##as they were passed. no Context or SymbolTable is made for a call, only an error makes the Context the call would
+  ##have run in so its traceback stays the same. see register_builtin below
+
+  def __init__(self, name, implementation=None, arg_names=()):
     super().__init__(name)
+    self.implementation = implementation
+    self.arg_names = arg_names ##names of the implementation's arguments after function, a call must pass that many
 
   def execute(self, args):
-    res = RTResult()
-    exec_ctx = self.generate_new_context() ##create new exec context 
-
-    method_name = f'execute_{self.name}' ##create seperate function for every 
-    method = getattr(self, method_name, self.no_visit_method) 
+    if len(args) != len(self.arg_names):
+      return self.check_args(self.arg_names, args)
+    result, error = self.implementation(self, *args)
+    if error:
+      return RTResult().failure(error)
+    return RTResult().success(result)
 
-    res.register(self.check_and_populate_args(method.arg_names, args, exec_ctx))
-    if res.should_return(): 
-    	return res
+  def call(self, args): ##execute giving the Value, for the engines that raise RTFailure instead of handing back an RTResult
+    if len(args) != len(self.arg_names):
+      raise RTFailure(self.check_args(self.arg_names, args).error)
+    result, error = self.implementation(self, *args)
+    if error:
+      raise RTFailure(error)
+    return result
 
-    return_value = res.register(method(exec_ctx))
-    if res.should_return(): 
-    	return res
-    return res.success(return_value)
-  
-  def no_visit_method(self, node, context): ## if method ist defined
-    raise Exception(f'No execute_{self.name} method defined')
+  def error(self, message): ##RTError of a call that failed, in the Context the call would have run in
+    return RTError(self.pos_start, self.pos_end, message, self.generate_new_context())
 
   def copy(self):
-    copy = BuiltInFunction(self.name)
-    copy.set_context(self.context)
-    copy.set_pos(self.pos_start, self.pos_end)
-    return copy
+    return self.located(self.span, self.context)
+
+  def located(self, span, context):
+    handle = new_value(BuiltInFunction)
+    handle.name = self.name
+    handle.implementation = self.implementation
+    handle.arg_names = self.arg_names
+    handle.span = span
+    handle.context = context
+    return handle
 
   def __repr__(self):
     return f"<built-in function {self.name}>"
 
-  #####################################
+########################################################
+##	BUILT IN FUNCTIONS
+########################################################
 
-  def execute_print(self, exec_ctx):
-    print(str(exec_ctx.symbol_table.get('value'))) ##print from symbol table 
-    return RTResult().success(Number.null)
-  execute_print.arg_names = ['value'] ## we get the arg_name methods from the method
-  
-  def execute_print_ret(self, exec_ctx):
-    return RTResult().success(String(str(exec_ctx.symbol_table.get('value')))) ##return value that should be printed 
-  execute_print_ret.arg_names = ['value']
-  
-  def execute_input(self, exec_ctx): ##take inpute 
+##the number of arguments a builtin takes is read off its implementation when it is registered, an implementation
+##has to take function and then a fixed number of positional arguments. new builtins go in the same way:
+##  @register_builtin('sum')
+##  def builtin_sum(function, list_): ... return Number(total), None
+##basic.py gives the ones below their names in the global symbol table
+
+BUILTINS = {} ##name of a builtin -> its BuiltInFunction
+
+def register_builtin(name, implementation=None): ##can be used as a decorator, returns the implementation
+  if implementation is None:
+    return lambda implementation: register_builtin(name, implementation)
+  parameters = list(inspect.signature(implementation).parameters.values())
+  positional = (inspect.Parameter.POSITIONAL_ONLY, inspect.Parameter.POSITIONAL_OR_KEYWORD)
+  if not parameters or any(parameter.kind not in positional or parameter.default is not parameter.empty for parameter in parameters):
+    raise TypeError(f'builtin {name} must take function and a fixed number of positional arguments')
+  BUILTINS[name] = BuiltInFunction(name, implementation, tuple(parameter.name for parameter in parameters[1:]))
+  return implementation
+
+@register_builtin('print')
+def builtin_print(function, value):
+  print(str(value))
+  return Number.null, None
+
+@register_builtin('print_ret')
+def builtin_print_ret(function, value): ##the text print would show
+  return String(str(value)), None
+
+@register_builtin('input')
+def builtin_input(function):
+  text = input()
+  return String(text), None
+
+@register_builtin('input_int')
+def builtin_input_int(function):
+  while True:
     text = input()
-    return RTResult().success(String(text))
-  execute_input.arg_names = []
-
-  def execute_input_int(self, exec_ctx):
-    while True:
-      text = input()
-      try:
-        number = int(text)
-        break
-      except ValueError:
-        print(f"'{text}' must be an integer. Try again!")
-    return RTResult().success(Number(number))
-  execute_input_int.arg_names = []
-
-  def execute_clear(self, exec_ctx):
-    os.system('cls' if os.name == 'nt' else 'cls') ##clear the terminal
-    return RTResult().success(Number.null)
-  execute_clear.arg_names = []
-
-  def execute_is_number(self, exec_ctx):
-    is_number = isinstance(exec_ctx.symbol_table.get("value"), Number)
-    return RTResult().success(Number.true if is_number else Number.false)
-  execute_is_number.arg_names = ["value"]
-
-  def execute_is_string(self, exec_ctx):
-    is_number = isinstance(exec_ctx.symbol_table.get("value"), String)
-    return RTResult().success(Number.true if is_number else Number.false)
-  execute_is_string.arg_names = ["value"]
-
-  def execute_is_list(self, exec_ctx):
-    is_number = isinstance(exec_ctx.symbol_table.get("value"), List)
-    return RTResult().success(Number.true if is_number else Number.false)
-  execute_is_list.arg_names = ["value"]
-
-  def execute_is_function(self, exec_ctx):
-    is_number = isinstance(exec_ctx.symbol_table.get("value"), BaseFunction)
-    return RTResult().success(Number.true if is_number else Number.false)
-  execute_is_function.arg_names = ["value"]
-
-  def execute_append(self, exec_ctx):
-    list_ = exec_ctx.symbol_table.get("list")
-    value = exec_ctx.symbol_table.get("value")
-
-    if not isinstance(list_, List):
-      return RTResult().failure(RTError(self.pos_start, self.pos_end,"First argument must be list",exec_ctx))
-
-    list_.elements.append(value)
-    return RTResult().success(Number.null)
-  execute_append.arg_names = ["list", "value"]
-
-  def execute_pop(self, exec_ctx):
-    list_ = exec_ctx.symbol_table.get("list")
-    index = exec_ctx.symbol_table.get("index")
-
-    if not isinstance(list_, List):
-      return RTResult().failure(RTError(
-        self.pos_start, self.pos_end,
-        "First argument must be list",
-        exec_ctx
-      ))
-
-    if not isinstance(index, Number):
-      return RTResult().failure(RTError(
-        self.pos_start, self.pos_end,
-        "Second argument must be number",
-        exec_ctx
-      ))
-
     try:
-      element = list_.elements.pop(index.value)
-    except:
-      return RTResult().failure(RTError(
-        self.pos_start, self.pos_end,
-        'Element at this index could not be removed from list because index is out of bounds',
-        exec_ctx
-      ))
-    return RTResult().success(element)
-  execute_pop.arg_names = ["list", "index"]
-
-  def execute_extend(self, exec_ctx):
-    listA = exec_ctx.symbol_table.get("listA")
-    listB = exec_ctx.symbol_table.get("listB")
-
-    if not isinstance(listA, List):
-      return RTResult().failure(RTError(
-        self.pos_start, self.pos_end,
-        "First argument must be list",
-        exec_ctx
-      ))
-
-    if not isinstance(listB, List):
-      return RTResult().failure(RTError(
-        self.pos_start, self.pos_end,
-        "Second argument must be list",
-        exec_ctx
-      ))
-
-    listA.elements.extend(listB.elements)
-    return RTResult().success(Number.null)
-  execute_extend.arg_names = ["listA", "listB"]
-
-  def execute_len(self, exec_ctx): ##length of a list 
-    list_ = exec_ctx.symbol_table.get("list")
-
-    if not isinstance(list_, List):
-      return RTResult().failure(RTError(
-        self.pos_start, self.pos_end,
-        "Argument must be list",
-        exec_ctx
-      ))
-
-    return RTResult().success(Number(len(list_.elements)))
-  execute_len.arg_names = ["list"]
-
-  def execute_run(self, exec_ctx):
-    fn = exec_ctx.symbol_table.get("fn") ##get file name from symbol table
-
-    if not isinstance(fn, String):##raise error if it isnt a string 
-      return RTResult().failure(RTError(self.pos_start, self.pos_end,"Second argument must be string",exec_ctx))
-
-    fn = fn.value
+      number = int(text)
+      break
+    except ValueError:
+      print(f"'{text}' must be an integer. Try again!")
+  return Number(number), None
+
+@register_builtin('clear')
+def builtin_clear(function):
+  os.system('cls' if os.name == 'nt' else 'cls') ##clear the terminal
+  return Number.null, None
+
+@register_builtin('is_number')
+def builtin_is_number(function, value):
+  return Number.true if isinstance(value, Number) else Number.false, None
+
+@register_builtin('is_string')
+def builtin_is_string(function, value):
+  return Number.true if isinstance(value, String) else Number.false, None
+
+@register_builtin('is_list')
+def builtin_is_list(function, value):
+  return Number.true if isinstance(value, List) else Number.false, None
+
+@register_builtin('is_function')
+def builtin_is_function(function, value):
+  return Number.true if isinstance(value, BaseFunction) else Number.false, None
+
+@register_builtin('append')
+def builtin_append(function, list_, value):
+  if not isinstance(list_, List):
+    return None, function.error("First argument must be list")
+  list_.elements.append(value)
+  if type(value.context) is CallFrame: ##kept in the list, see capture (symboltable.py)
+    capture(value)
+  return Number.null, None
+
+@register_builtin('pop')
+def builtin_pop(function, list_, index):
+  if not isinstance(list_, List):
+    return None, function.error("First argument must be list")
+  if not isinstance(index, Number):
+    return None, function.error("Second argument must be number")
+  try:
+    element = list_.elements.pop(index.value)
+  except:
+    return None, function.error('Element at this index could not be removed from list because index is out of bounds')
+  return element, None
+
+@register_builtin('extend')
+def builtin_extend(function, listA, listB):
+  if not isinstance(listA, List):
+    return None, function.error("First argument must be list")
+  if not isinstance(listB, List):
+    return None, function.error("Second argument must be list")
+  listA.elements.extend(listB.elements)
+  return Number.null, None
+
+@register_builtin('len')
+def builtin_len(function, list_): ##length of a list
+  if not isinstance(list_, List):
+    return None, function.error("Argument must be list")
+  return Number(len(list_.elements)), None
+
+@register_builtin('run')
+def builtin_run(function, fn):
+  if not isinstance(fn, String): ##raise error if it isnt a string
+    return None, function.error("Second argument must be string")
+
+  fn = fn.value
+
+  try:
+    with open(fn, "r") as f: ##open file in readmode and assign it to variable f
+      script = f.read() ##script content of faile
+  except Exception as e:
+    return None, function.error(f"Failed to load script \"{fn}\"\n" + str(e))
+
+  from basic import run ##imported here because basic imports this module
+  _, error = run(fn, script, values=False) ##the script's values are never shown
+
+  if error:
+    return None, function.error(f"Failed to finish executing script \"{fn}\"\n" + error.as_string())
+
+  return Number.null, None
 
-    try:
-      with open(fn, "r") as f: ##open file in readmode and assign it to variable f
-        script = f.read() ##script content of faile
-    except Exception as e:
-      return RTResult().failure(RTError(self.pos_start, self.pos_end,f"Failed to load script \"{fn}\"\n" + str(e),exec_ctx))
 
-    _, error = run(fn, script)
-    
-    if error:
-       return RTResult().failure(RTError(self.pos_start, self.pos_end,f"Failed to finish executing script \"{fn}\"\n" +error.as_string(),exec_ctx))
+########################################################
+##	MEMOIZED FUNCTIONS
+########################################################
 
-    return RTResult().success(Number.null)
-  execute_run.arg_names = ["fn"]
+##MEMO(f) gives a handle that calls f through a MemoCache, for functions whose value only depends on their arguments
+##the arguments are the key: Numbers and Strings by value and Lists by their elements, a call with any other argument
+##(a function, a list that holds itself) is made every time. a call that fails, BREAKs or CONTINUEs is not kept
+##the handle is a BaseFunction every engine calls through execute, so it works the same whichever made f
+##VAR fib = MEMO(FUN (n) -> ...fib(n - 1)...) also memoizes the recursive calls, the body finds fib by name
+
+def memo_key(value, lists=()): ##hashable key for an argument's value, None if it has none
+  kind = type(value)
+  if kind is Number:
+    return (Number, type(value.value), value.value) ##1 and 1.0 show differently
+  if kind is String:
+    return (String, value.value)
+  if kind is List and id(value.elements) not in lists:
+    lists += (id(value.elements),)
+    key = []
+    for element in value.elements:
+      element_key = memo_key(element, lists)
+      if element_key is None:
+        return None
+      key.append(element_key)
+    return (List, tuple(key))
+  return None
+
+def memo_copy(value, copies=None): ##value with every List in it given elements of its own, so a caller that changes
+  ##a list a memoized function gave it does not change what the cache gives the next caller
+  if type(value) is not List:
+    return value
+  if copies is None:
+    copies = {}
+  elements = copies.get(id(value.elements))
+  if elements is None: ##a list that holds itself is copied once
+    elements = copies[id(value.elements)] = []
+    elements.extend(memo_copy(element, copies) for element in value.elements)
+  return List(elements).set_context(value.context).set_span(value.span)
+
+class MemoCache:
+  default_size = 1024 ##size of the cache MEMO makes
+
+  def __init__(self, size=None):
+    self.size = MemoCache.default_size if size is None else size ##most values kept, the least recently used goes first
+    self.entries = {} ##key -> value, in order of use (a dict keeps insertion order)
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key):
+    value = self.entries.pop(key, None)
+    if value is None:
+      self.misses += 1
+      return None
+    self.entries[key] = value ##now the most recently used
+    self.hits += 1
+    return value
+
+  def put(self, key, value):
+    self.entries[key] = value
+    self.resize(self.size)
+
+  def resize(self, size):
+    self.size = size
+    while len(self.entries) > size:
+      del self.entries[next(iter(self.entries))]
+
+  def report(self):
+    calls = self.hits + self.misses
+    return f'memo: {self.hits} hits, {self.misses} misses, {self.hits / calls if calls else 0:.1%} hit rate, {len(self.entries)}/{self.size} kept'
+
+class MemoizedFunction(BaseFunction):
+  __slots__ = ('function', 'cache')
+
+  def __init__(self, function, cache):
+    super().__init__(function.name)
+    self.function = function ##the function MEMO was given
+    self.cache = cache ##shared by every handle of it, the host reads cache.hits, cache.misses and cache.report()
+
+  def lookup(self, args): ##(key the result for args goes under or None if it has none, the result kept for it or None)
+    key = tuple(memo_key(arg) for arg in args)
+    if None in key:
+      self.cache.misses += 1
+      return None, None
+    return key, self.cache.get(key)
 
+  def execute(self, args):
+    key, value = self.lookup(args)
+    if value is not None:
+      return RTResult().success(memo_copy(value))
+    res = self.function.located(self.span, self.context).execute(args) ##called from where this handle was, like f itself
+    if key is not None and not (res.error or res.loop_should_break or res.loop_should_continue):
+      self.cache.put(key, memo_copy(res.value))
+    return res
 
+  def copy(self):
+    return self.located(self.span, self.context)
 
-BuiltInFunction.print       = BuiltInFunction("print")
-BuiltInFunction.print_ret   = BuiltInFunction("print_ret")
-BuiltInFunction.input       = BuiltInFunction("input")
-BuiltInFunction.input_int   = BuiltInFunction("input_int")
-BuiltInFunction.clear       = BuiltInFunction("clear")
-BuiltInFunction.is_number   = BuiltInFunction("is_number")
-BuiltInFunction.is_string   = BuiltInFunction("is_string")
-BuiltInFunction.is_list     = BuiltInFunction("is_list")
-BuiltInFunction.is_function = BuiltInFunction("is_function")
-BuiltInFunction.append      = BuiltInFunction("append")
-BuiltInFunction.pop         = BuiltInFunction("pop")
-BuiltInFunction.extend      = BuiltInFunction("extend")
-BuiltInFunction.len			= BuiltInFunction("len")
-BuiltInFunction.run			= BuiltInFunction("run")
+  def located(self, span, context):
+    handle = new_value(MemoizedFunction)
+    handle.name = self.name
+    handle.function = self.function
+    handle.cache = self.cache
+    handle.span = span
+    handle.context = context
+    return handle
+
+  def __repr__(self):
+    return f"<memoized function {self.name}>"
+
+@register_builtin('memo')
+def builtin_memo(function, value):
+  if not isinstance(value, BaseFunction):
+    return None, function.error("Argument must be function")
+  return MemoizedFunction(value, MemoCache()), None
+
+@register_builtin('memo_resize')
+def builtin_memo_resize(function, memoized, size):
+  if not isinstance(memoized, MemoizedFunction):
+    return None, function.error("First argument must be memoized function")
+  if not isinstance(size, Number) or size.value != int(size.value) or size.value < 0:
+    return None, function.error("Second argument must be a whole number of at least 0")
+  memoized.cache.resize(int(size.value))
+  return Number.null, None
+
+@register_builtin('memo_stats')
+def builtin_memo_stats(function, memoized): ##[hits, misses, values kept, size]
+  if not isinstance(memoized, MemoizedFunction):
+    return None, function.error("Argument must be memoized function")
+  cache = memoized.cache
+  return List([Number(cache.hits), Number(cache.misses), Number(len(cache.entries)), Number(cache.size)]), None
 
 
 class List(Value):
+  __slots__ = ('elements',)
+
+  ##the handles of one list share its elements, APPEND, POP and EXTEND change them for every handle
+  ##+ and - give a new list and leave the elements of the one they were given alone
+
   def __init__(self, elements):
     super().__init__()
     self.elements = elements
+    for element in elements: ##kept for as long as the list is, a call's frame it came from must stay as it is
+      if type(element.context) is CallFrame:
+        capture(element)
 
   def added_to(self, other):
     new_list = self.copy()
-    new_list.elements.append(other)
+    new_list.elements = self.elements + [other]
+    if type(other.context) is CallFrame:
+      capture(other)
     return new_list, None
 
   def subbed_by(self, other):
     if isinstance(other, Number):
       new_list = self.copy()
+      new_list.elements = list(self.elements)
       try: ##if the element doesnt exist
         new_list.elements.pop(other.value)
         return new_list, None
@@ -525,10 +692,20 @@ class List(Value):
       return None, Value.illegal_operation(self, other)
   
   def copy(self):
-    copy = List(self.elements)
-    copy.set_pos(self.pos_start, self.pos_end)
-    copy.set_context(self.context)
-    return copy
+    return self.located(self.span, self.context)
+
+  def located(self, span, context):
+    handle = new_value(List)
+    handle.elements = self.elements
+    handle.span = span
+    handle.context = context
+    return handle
 
   def __repr__(self):
     return f'[{", ".join([str(x) for x in self.elements])}]'
+
+
+##these modules import the value classes above so they are pulled in once the classes exist
+from context import *
+from symboltable import *
+from interpreter import *